@@ -0,0 +1,46 @@
+"""
+DatabaseHandler benchmarks - Insert and query throughput on SQLite
+"""
+import os
+import tempfile
+from typing import Dict
+from common import measure
+from database.db_handler import DatabaseHandler
+
+def _position(i: int):
+    return {
+        'id': f"bench-{i}",
+        'exchange': f"alias{i % 8}",
+        'symbol': 'BTC/USDT',
+        'side': 'buy',
+        'amount': 0.01,
+        'price': 60000.0
+    }
+
+def run(quick: bool = False) -> Dict[str, Dict[str, float]]:
+    rows = 1_000 if quick else 10_000
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Fájl alapú adatbázisnál minden insert commitol, ezért kisebb mintával mérünk
+        for label, path_factory, count, repeat in (
+            ('memory', lambda n: ':memory:', rows, 3),
+            ('file', lambda n: os.path.join(tmp, f"bench_{n}.db"), rows // 10, 1)
+        ):
+            runs = iter(range(1_000_000))
+            handler = None
+
+            def insert_all():
+                nonlocal handler
+                if handler:
+                    handler.conn.close()
+                handler = DatabaseHandler(path_factory(next(runs)))
+                for i in range(count):
+                    handler.add_position(_position(i))
+
+            results[f"database.insert.{label}[{count}]"] = measure(insert_all, repeat=repeat, ops=count)
+            results[f"database.query_all.{label}[{count}]"] = measure(handler.get_positions, repeat=5)
+            results[f"database.query_alias.{label}[{count}]"] = measure(
+                lambda: handler.get_positions('alias0'), repeat=5
+            )
+            handler.conn.close()
+    return results
@@ -0,0 +1,25 @@
+"""
+MessageHandler benchmarks - Localized message lookup and rendering
+"""
+from typing import Dict
+from common import measure
+from utils.message_handler import MessageHandler
+
+def run(quick: bool = False) -> Dict[str, Dict[str, float]]:
+    handler = MessageHandler('en')
+    number = 2_000 if quick else 20_000
+    return {
+        'message_handler.get_message.plain': measure(
+            lambda: handler.get_message('ping_response'), number=number
+        ),
+        'message_handler.get_message.formatted': measure(
+            lambda: handler.get_message(
+                'position_opened', exchange='sim', symbol='BTC/USDT',
+                side='buy', amount=0.01, price='market'
+            ),
+            number=number
+        ),
+        'message_handler.get_message.help_text': measure(
+            lambda: handler.get_message('help_text'), number=number
+        )
+    }
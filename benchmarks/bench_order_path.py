@@ -0,0 +1,59 @@
+"""
+Order path benchmarks - Command-to-order handling against the simulator exchange
+"""
+import asyncio
+from typing import Dict
+from common import measure_async
+from exchange_manager import ExchangeManager
+from trade_manager import TradeManager
+
+BENCH_CONFIG = {
+    'telegram': {'api_key': '123456:BENCHMARK-TOKEN', 'allowed_users': [1]},
+    'settings': {'default_language': 'en', 'default_exchange': '', 'default_mode': 'spot'},
+    'logging': {'level': 'WARNING'}
+}
+
+SIMULATOR_CONFIG = {
+    'exchange': 'simulator',
+    'apiKey': '',
+    'secret': '',
+    'options': {
+        'seed': 1,
+        'prices': {'BTC/USDT': 60000.0},
+        'balances': {'USDT': 1e12, 'BTC': 1e6}
+    }
+}
+
+async def _run(quick: bool) -> Dict[str, Dict[str, float]]:
+    number = 200 if quick else 2_000
+    results = {}
+
+    exchange_manager = ExchangeManager(BENCH_CONFIG)
+    exchange_manager._initialize_exchange('bench', SIMULATOR_CONFIG)
+    trade_manager = TradeManager(exchange_manager)
+    results['order_path.trade_manager.open_position'] = await measure_async(
+        lambda: trade_manager.open_position('bench', 'BTC/USDT', 'buy', 0.001),
+        number=number
+    )
+
+    try:
+        from telegram_bot import TelegramBot
+        from simulator.replay import ReplayHarness
+    except ImportError:
+        return results
+
+    bot = TelegramBot(BENCH_CONFIG)
+    bot.exchange_manager._initialize_exchange('bench', SIMULATOR_CONFIG)
+    harness = ReplayHarness(bot, default_user_id=1)
+    update_ids = iter(range(1, 10_000_000))
+    results['order_path.telegram_bot.buy'] = await measure_async(
+        lambda: harness.dispatch({
+            'update_id': next(update_ids),
+            'message': {'text': '/buy bench BTC/USDT 0.001'}
+        }),
+        number=number
+    )
+    return results
+
+def run(quick: bool = False) -> Dict[str, Dict[str, float]]:
+    return asyncio.run(_run(quick))
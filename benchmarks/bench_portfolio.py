@@ -0,0 +1,36 @@
+"""
+Portfolio benchmarks - Cross-exchange valuation with hundreds of assets
+"""
+import asyncio
+from typing import Dict
+from common import measure_async
+from bench_order_path import BENCH_CONFIG
+from exchange_manager import ExchangeManager
+from market_data import TickerCache
+from position_manager import PositionManager
+from portfolio import PortfolioValuator
+
+ASSETS = 300
+ALIASES = 4
+
+async def _run(quick: bool) -> Dict[str, Dict[str, float]]:
+    number = 50 if quick else 500
+    exchange_manager = ExchangeManager(BENCH_CONFIG)
+    for n in range(ALIASES):
+        exchange_manager._initialize_exchange(f"bench{n}", {
+            'exchange': 'simulator',
+            'apiKey': '',
+            'secret': '',
+            'options': {
+                'seed': n,
+                'prices': {f"A{i}/USDT": 1.0 + i for i in range(ASSETS)},
+                'balances': {f"A{i}": 10.0 for i in range(ASSETS)}
+            }
+        })
+    valuator = PortfolioValuator(exchange_manager, TickerCache(exchange_manager), PositionManager())
+    return {
+        'portfolio.snapshot': await measure_async(valuator.snapshot, number=number)
+    }
+
+def run(quick: bool = False) -> Dict[str, Dict[str, float]]:
+    return asyncio.run(_run(quick))
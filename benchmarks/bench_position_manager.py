@@ -0,0 +1,47 @@
+"""
+PositionManager benchmarks - add/remove/get at 10k-1M positions
+"""
+from typing import Dict
+from common import measure
+from position_manager import PositionManager
+
+def _orders(count: int):
+    return [{'id': str(i), 'symbol': 'BTC/USDT', 'side': 'buy', 'amount': 0.01} for i in range(count)]
+
+def run(quick: bool = False) -> Dict[str, Dict[str, float]]:
+    sizes = [10_000] if quick else [10_000, 100_000, 1_000_000]
+    results = {}
+    for size in sizes:
+        orders = _orders(size)
+        aliases = [f"alias{i % 8}" for i in range(size)]
+        repeat = 3 if size >= 1_000_000 else 5
+
+        def add_all():
+            manager = PositionManager()
+            for alias, order in zip(aliases, orders):
+                manager.add_position(alias, order)
+            return manager
+
+        results[f"position_manager.add[{size}]"] = measure(add_all, repeat=repeat, ops=size)
+
+        manager = add_all()
+        results[f"position_manager.get_all[{size}]"] = measure(manager.get_positions, repeat=repeat)
+        results[f"position_manager.get_alias[{size}]"] = measure(
+            lambda: manager.get_positions('alias0'), repeat=repeat
+        )
+
+        def remove_all():
+            target = add_all()
+            for alias, order in zip(aliases, orders):
+                target.remove_position(alias, order['id'])
+
+        # A remove mérés tartalmazza a feltöltést is, ezért az add idejét levonjuk
+        removed = measure(remove_all, repeat=repeat, ops=size)
+        added = results[f"position_manager.add[{size}]"]
+        remove_us = max(removed['mean_us'] - added['mean_us'], 0.0)
+        results[f"position_manager.remove[{size}]"] = {
+            'mean_us': round(remove_us, 4),
+            'min_us': round(max(removed['min_us'] - added['min_us'], 0.0), 4),
+            'ops_per_s': round(1e6 / remove_us, 2) if remove_us else 0.0
+        }
+    return results
@@ -0,0 +1,27 @@
+"""
+Startup benchmark - Import time of main.py in a fresh interpreter
+"""
+import subprocess
+import sys
+import time
+from typing import Dict
+from common import SRC_DIR
+
+def run(quick: bool = False) -> Dict[str, Dict[str, float]]:
+    repeat = 3 if quick else 10
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, '-c', 'import main'],
+            cwd=SRC_DIR, check=True, capture_output=True
+        )
+        timings.append(time.perf_counter() - started)
+    mean = sum(timings) / len(timings)
+    return {
+        'startup.import_main': {
+            'mean_us': round(mean * 1e6, 4),
+            'min_us': round(min(timings) * 1e6, 4),
+            'ops_per_s': round(1 / mean, 2)
+        }
+    }
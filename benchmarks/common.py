@@ -0,0 +1,45 @@
+"""
+Benchmark helpers - Timing primitives shared by the benchmark modules
+"""
+import os
+import sys
+import time
+from typing import Callable, Dict, Any
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+def measure(fn: Callable[[], Any], number: int = 1, repeat: int = 5, ops: int = 1) -> Dict[str, float]:
+    """Runs fn number*repeat times and reports the best and mean time per operation
+
+    ops is the number of logical operations performed by a single fn call,
+    so batch benchmarks report per-item figures.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - started) / (number * ops))
+    mean = sum(timings) / len(timings)
+    return {
+        'mean_us': round(mean * 1e6, 4),
+        'min_us': round(min(timings) * 1e6, 4),
+        'ops_per_s': round(1 / mean, 2) if mean else 0.0
+    }
+
+async def measure_async(fn: Callable[[], Any], number: int = 1, repeat: int = 5, ops: int = 1) -> Dict[str, float]:
+    """Async counterpart of measure for coroutine functions"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            await fn()
+        timings.append((time.perf_counter() - started) / (number * ops))
+    mean = sum(timings) / len(timings)
+    return {
+        'mean_us': round(mean * 1e6, 4),
+        'min_us': round(min(timings) * 1e6, 4),
+        'ops_per_s': round(1 / mean, 2) if mean else 0.0
+    }
@@ -0,0 +1,123 @@
+"""
+Benchmark runner - Runs the hot path benchmarks and tracks regressions
+
+Usage:
+    python benchmarks/run_benchmarks.py [--quick] [--only position_manager]
+                                        [--baseline benchmarks/baseline.json]
+                                        [--threshold 0.25] [--save-baseline]
+
+Results are written as JSON to benchmarks/results/. When a baseline exists,
+every benchmark whose mean time per operation grew by more than the
+threshold is reported and the process exits with status 1.
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from typing import Dict, Any, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+import common  # noqa: E402  (src/ hozzáadása a sys.path-hoz)
+
+MODULES = [
+    'bench_position_manager',
+    'bench_message_handler',
+    'bench_database',
+    'bench_order_path',
+    'bench_portfolio',
+    'bench_startup'
+]
+
+def run_all(quick: bool, only: List[str] = None) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    skipped: Dict[str, str] = {}
+    for module_name in MODULES:
+        if only and not any(name in module_name for name in only):
+            continue
+        try:
+            module = importlib.import_module(module_name)
+            started = time.perf_counter()
+            results.update(module.run(quick))
+            print(f"{module_name}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        except Exception as e:
+            # Hiányzó opcionális függőség vagy hibás környezet: a többi mérés fusson le
+            skipped[module_name] = f"{type(e).__name__}: {str(e)}"
+            print(f"{module_name}: skipped ({skipped[module_name]})", file=sys.stderr)
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'quick': quick,
+        'results': results,
+        'skipped': skipped
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Returns a description for every benchmark slower than baseline by more than threshold"""
+    regressions = []
+    for name, metrics in current['results'].items():
+        reference = baseline.get('results', {}).get(name)
+        if not reference or not reference.get('mean_us'):
+            continue
+        ratio = metrics['mean_us'] / reference['mean_us']
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {reference['mean_us']:.3f}us -> {metrics['mean_us']:.3f}us ({ratio:.2f}x)"
+            )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run TelEX hot path benchmarks")
+    parser.add_argument('--quick', action='store_true', help="Smaller sizes for a fast sanity run")
+    parser.add_argument('--only', nargs='*', help="Run only modules whose name contains one of these")
+    parser.add_argument('--baseline', default=os.path.join(BENCH_DIR, 'baseline.json'))
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed relative slowdown before a result counts as a regression")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Store this run as the new baseline")
+    parser.add_argument('--output', default=None, help="Result file (default: benchmarks/results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report = run_all(args.quick, args.only)
+
+    output = args.output or os.path.join(
+        BENCH_DIR, 'results', f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+    for name, metrics in sorted(report['results'].items()):
+        print(f"{name:60s} {metrics['mean_us']:14.3f} us/op {metrics['ops_per_s']:16.1f} ops/s")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('quick') != report['quick']:
+            print("Baseline was recorded with a different --quick setting, skipping comparison",
+                  file=sys.stderr)
+            return
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print("Performance regressions detected:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print("No regressions against baseline", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Alert Manager - Price and percentage-move alerts
+Alerts are persisted in SQLite and evaluated against the shared ticker cache
+"""
+import asyncio
+import logging
+from typing import Dict, Any, List, Callable, Tuple
+from utils.trigger_index import TriggerIndex, ABOVE, BELOW
+
+logger = logging.getLogger(__name__)
+
+PRICE = 'price'
+PERCENT = 'percent'
+
+class AlertManager:
+    def __init__(self, db_handler, ticker_cache, exchange_manager, recorder=None):
+        self.db = db_handler
+        # TradeRecorder: a kiváltott riasztások deaktiválása a háttérszálas, kötegelt íróval megy
+        self.recorder = recorder
+        self.ticker_cache = ticker_cache
+        self.exchange_manager = exchange_manager
+        self.indices: Dict[Tuple[str, str], TriggerIndex] = {}
+        self.alerts: Dict[int, Dict[str, Any]] = {}
+        self.listeners: List[Callable] = []
+        self._tasks = set()
+
+    def add_listener(self, callback: Callable):
+        """Registers callback(alert, price), called when an alert fires"""
+        self.listeners.append(callback)
+
+    def load(self) -> int:
+        """Registers every active alert stored in the database"""
+        alerts = self.db.get_alerts()
+        for alert in alerts:
+            self._register(alert)
+        logger.info("Loaded %s active alerts", len(alerts))
+        return len(alerts)
+
+    def _register(self, alert: Dict[str, Any]):
+        key = (alert['exchange'], alert['symbol'])
+        index = self.indices.get(key)
+        if index is None:
+            index = self.indices[key] = TriggerIndex()
+            self.ticker_cache.subscribe(alert['exchange'], alert['symbol'], self.on_ticker)
+
+        self.alerts[alert['id']] = alert
+        if alert['kind'] == PERCENT:
+            # Két szint a referenciaár körül; bármelyik teljesül, a másik törlődik
+            move = alert['reference_price'] * alert['percent'] / 100
+            index.add((alert['id'], ABOVE), ABOVE, alert['reference_price'] + move, alert['id'])
+            index.add((alert['id'], BELOW), BELOW, alert['reference_price'] - move, alert['id'])
+        else:
+            index.add((alert['id'], alert['direction']), alert['direction'], alert['price'], alert['id'])
+
+    def _unregister(self, alert: Dict[str, Any]):
+        self.alerts.pop(alert['id'], None)
+        key = (alert['exchange'], alert['symbol'])
+        index = self.indices.get(key)
+        if index is None:
+            return
+        for direction in (ABOVE, BELOW):
+            index.remove((alert['id'], direction))
+        if not index:
+            del self.indices[key]
+            self.ticker_cache.unsubscribe(alert['exchange'], alert['symbol'], self.on_ticker)
+
+    def _check_exchange(self, exchange_name: str):
+        """An alert on an unknown alias would poll a ticker that can never be fetched"""
+        if not self.exchange_manager.get_exchange(exchange_name):
+            raise ValueError(self.exchange_manager.message_handler.get_message(
+                'exchange_not_found', name=exchange_name
+            ))
+
+    def add_price_alert(self, chat_id: int, exchange_name: str, symbol: str, direction: str,
+                        price: float) -> Dict[str, Any]:
+        if direction not in (ABOVE, BELOW):
+            raise ValueError(f"Invalid alert direction: {direction}")
+        self._check_exchange(exchange_name)
+        alert = {
+            'chat_id': chat_id,
+            'exchange': exchange_name,
+            'symbol': symbol,
+            'kind': PRICE,
+            'direction': direction,
+            'price': price
+        }
+        alert['id'] = self.db.add_alert(alert)
+        self._register(alert)
+        return alert
+
+    async def add_percent_alert(self, chat_id: int, exchange_name: str, symbol: str,
+                                percent: float) -> Dict[str, Any]:
+        """Alert on a move of percent in either direction from the current price"""
+        if percent <= 0:
+            raise ValueError(f"Invalid percentage: {percent}")
+        self._check_exchange(exchange_name)
+        # last, ennek hiányában close vagy a bid/ask közép
+        reference_price = await self.ticker_cache.fetch_price(exchange_name, symbol)
+        if not reference_price:
+            raise ValueError(self.exchange_manager.message_handler.get_message(
+                'alert_no_price', exchange=exchange_name, symbol=symbol
+            ))
+
+        alert = {
+            'chat_id': chat_id,
+            'exchange': exchange_name,
+            'symbol': symbol,
+            'kind': PERCENT,
+            'percent': percent,
+            'reference_price': reference_price
+        }
+        alert['id'] = self.db.add_alert(alert)
+        self._register(alert)
+        return alert
+
+    def remove_alert(self, alert_id: int, chat_id: int = None) -> bool:
+        alert = self.alerts.get(alert_id)
+        if not alert or (chat_id is not None and alert['chat_id'] != chat_id):
+            return False
+        self._unregister(alert)
+        return self.db.deactivate_alert(alert_id)
+
+    def get_alerts(self, chat_id: int = None) -> List[Dict[str, Any]]:
+        return [a for a in self.alerts.values() if chat_id is None or a['chat_id'] == chat_id]
+
+    def on_ticker(self, exchange_name: str, symbol: str, ticker: Dict[str, Any]):
+        """Ticker cache subscriber; ticks between the nearest levels cost two comparisons"""
+        price = ticker.get('last')
+        index = self.indices.get((exchange_name, symbol))
+        if price is None or index is None:
+            return
+        lowest_above, highest_below = index.nearest()
+        if highest_below < price < lowest_above:
+            return
+
+        for alert_id in set(index.cross(price)):
+            alert = self.alerts.get(alert_id)
+            if not alert:
+                continue
+            self._unregister(alert)
+            if self.recorder is not None:
+                self.recorder.record_alert_triggered(alert_id)
+            else:
+                self.db.deactivate_alert(alert_id, triggered=True)
+            logger.info("Alert %s triggered at %s", alert_id, price)
+            for callback in self.listeners:
+                try:
+                    result = callback(alert, price)
+                    if asyncio.iscoroutine(result):
+                        task = asyncio.create_task(result)
+                        self._tasks.add(task)
+                        task.add_done_callback(self._tasks.discard)
+                except Exception as e:
+                    logger.error("Alert listener error: %s", e, exc_info=True)
@@ -0,0 +1,408 @@
+"""
+Conditional Orders - Brackets, OCO pairs and price-triggered orders
+Triggers are kept per (exchange, symbol) in a sorted index and checked on each ticker
+"""
+import asyncio
+import itertools
+import logging
+import ccxt.async_support as ccxt
+from typing import Dict, Any, List, Callable, Tuple
+from order_tracker import TrackedOrder, FILLED
+from risk_manager import RiskLimitExceeded
+from utils.trigger_index import TriggerIndex, ABOVE, BELOW
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+NATIVE = 'native'
+TRIGGERED = 'triggered'
+CANCELED = 'canceled'
+REARMED = 'rearmed'
+
+class ConditionalOrder:
+    __slots__ = ('id', 'exchange_name', 'symbol', 'direction', 'trigger_price', 'side', 'amount', 'price',
+                 'client_order_id', 'chat_id', 'kind', 'group', 'status', 'order_id')
+
+    def __init__(self, condition_id: str, exchange_name: str, symbol: str, direction: str, trigger_price: float,
+                 side: str, amount: float, price: float = None, client_order_id: str = None,
+                 chat_id: int = None, kind: str = 'when', group: str = None):
+        self.id = condition_id
+        self.exchange_name = exchange_name
+        self.symbol = symbol
+        self.direction = direction
+        self.trigger_price = trigger_price
+        self.side = side
+        self.amount = amount
+        self.price = price
+        self.client_order_id = client_order_id
+        self.chat_id = chat_id
+        self.kind = kind
+        self.group = group
+        self.status = PENDING
+        self.order_id = None
+
+class ConditionalOrderManager:
+    def __init__(self, trade_manager, ticker_cache, risk_manager=None):
+        self.trade_manager = trade_manager
+        self.exchange_manager = trade_manager.exchange_manager
+        self.ticker_cache = ticker_cache
+        self.risk_manager = risk_manager
+        self.indices: Dict[Tuple[str, str], TriggerIndex] = {}
+        self.conditions: Dict[str, ConditionalOrder] = {}
+        self.groups: Dict[str, List[str]] = {}  # {OCO csoport: [condition_id, ...]}
+        self.pending_brackets: Dict[Tuple[str, str], Dict[str, Any]] = {}  # {(exchange, entry_order_id): exits}
+        self.native_orders: Dict[Tuple[str, str], str] = {}  # {(exchange, order_id): condition_id}
+        self.listeners: List[Callable] = []
+        self._ids = itertools.count(1)
+        self._group_ids = itertools.count(1)
+        self._executing = set()  # OCO csoportok, amelyek egyik tagja éppen beküldés alatt áll
+        self._tasks = set()
+        trade_manager.order_tracker.add_listener(self._on_order_update)
+
+    def add_listener(self, callback: Callable):
+        """Registers callback(condition, event, detail) for triggered/rearmed/failed/rejected events"""
+        self.listeners.append(callback)
+
+    def _emit(self, condition: ConditionalOrder, event: str, detail: str = ''):
+        for callback in self.listeners:
+            try:
+                result = callback(condition, event, detail)
+                if asyncio.iscoroutine(result):
+                    self._spawn(result)
+            except Exception as e:
+                logger.error("Conditional order listener error: %s", e, exc_info=True)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def add_condition(self, exchange_name: str, symbol: str, direction: str, trigger_price: float, side: str,
+                      amount: float, price: float = None, client_order_id: str = None, chat_id: int = None,
+                      kind: str = 'when', group: str = None) -> ConditionalOrder:
+        """Registers a locally evaluated trigger: place the order once the price crosses trigger_price"""
+        condition = ConditionalOrder(
+            f"c{next(self._ids)}", exchange_name, symbol, direction, trigger_price, side, amount,
+            price, client_order_id, chat_id, kind, group
+        )
+        self.conditions[condition.id] = condition
+        if group:
+            self.groups.setdefault(group, []).append(condition.id)
+        self._arm(condition)
+        logger.info("Condition %s added: %s %s %s %s -> %s %s",
+                    condition.id, exchange_name, symbol, direction, trigger_price, side, amount)
+        return condition
+
+    async def place_when(self, exchange_name: str, symbol: str, direction: str, trigger_price: float, side: str,
+                         amount: float, price: float = None, client_order_id: str = None,
+                         chat_id: int = None) -> ConditionalOrder:
+        """'If price crosses X then place Y'; uses a native trigger order where the exchange has one"""
+        exchange = self.exchange_manager.get_exchange(exchange_name)
+        if exchange and exchange.has.get('createTriggerOrder'):
+            condition = ConditionalOrder(
+                f"c{next(self._ids)}", exchange_name, symbol, direction, trigger_price, side, amount,
+                price, client_order_id, chat_id
+            )
+            params = {'triggerPrice': trigger_price, 'triggerDirection': direction}
+            # A tőzsdei trigger order azonnal a könyvbe kerül, ezért már most foglal (RiskLimitExceeded a hívóé)
+            reservation = None
+            if self.risk_manager:
+                reservation = await self.risk_manager.check(
+                    exchange_name, symbol, side, amount, price or trigger_price
+                )
+            try:
+                order = await self.trade_manager.place_order(
+                    exchange_name, symbol, side, amount, price, params=params,
+                    client_order_id=client_order_id, chat_id=chat_id
+                )
+            except Exception:
+                if self.risk_manager:
+                    self.risk_manager.release(reservation)
+                raise
+            if self.risk_manager:
+                self.risk_manager.attach(reservation, exchange_name, order)
+            condition.status = NATIVE
+            condition.order_id = order['id']
+            self.conditions[condition.id] = condition
+            self.native_orders[(exchange_name, order['id'])] = condition.id
+            return condition
+        return self.add_condition(exchange_name, symbol, direction, trigger_price, side, amount, price,
+                                  client_order_id, chat_id)
+
+    def add_oco(self, exchange_name: str, symbol: str, side: str, amount: float, take_profit: float,
+                stop_loss: float, client_order_id: str = None, chat_id: int = None) -> List[ConditionalOrder]:
+        """One-cancels-other exit pair; side is the exit side (sell closes a long)"""
+        group = f"g{next(self._group_ids)}"
+        tp_direction, sl_direction = (ABOVE, BELOW) if side == 'sell' else (BELOW, ABOVE)
+        return [
+            self.add_condition(exchange_name, symbol, tp_direction, take_profit, side, amount,
+                               client_order_id=f"{client_order_id}tp" if client_order_id else None,
+                               chat_id=chat_id, kind='take_profit', group=group),
+            self.add_condition(exchange_name, symbol, sl_direction, stop_loss, side, amount,
+                               client_order_id=f"{client_order_id}sl" if client_order_id else None,
+                               chat_id=chat_id, kind='stop_loss', group=group)
+        ]
+
+    async def place_bracket(self, exchange_name: str, symbol: str, side: str, amount: float, take_profit: float,
+                            stop_loss: float, price: float = None, client_order_id: str = None,
+                            chat_id: int = None) -> Dict[str, Any]:
+        """Entry order with take-profit/stop-loss exits armed once the entry fills"""
+        exchange = self.exchange_manager.get_exchange(exchange_name)
+        if exchange and exchange.has.get('createOrderWithTakeProfitAndStopLoss'):
+            # Tőzsdei bracket: a TP/SL a belépő orderhez csatolva, szerver oldalon fut
+            params = {'takeProfit': {'triggerPrice': take_profit}, 'stopLoss': {'triggerPrice': stop_loss}}
+            return await self.trade_manager.open_position(
+                exchange_name, symbol, side, amount, price, params=params,
+                client_order_id=client_order_id, chat_id=chat_id
+            )
+
+        order = await self.trade_manager.open_position(
+            exchange_name, symbol, side, amount, price, client_order_id=client_order_id, chat_id=chat_id
+        )
+        exits = {
+            'symbol': symbol,
+            'side': 'sell' if side == 'buy' else 'buy',
+            'take_profit': take_profit,
+            'stop_loss': stop_loss,
+            'client_order_id': client_order_id,
+            'chat_id': chat_id
+        }
+        tracked = self.trade_manager.order_tracker.get(exchange_name, order['id'])
+        if tracked and tracked.is_terminal:
+            self._arm_bracket(exchange_name, tracked.order, exits)
+        else:
+            self.pending_brackets[(exchange_name, order['id'])] = exits
+        return order
+
+    def _arm_bracket(self, exchange_name: str, entry: Dict[str, Any], exits: Dict[str, Any]):
+        filled = entry.get('filled') or 0
+        if not filled:
+            logger.info("Bracket entry %s on %s closed unfilled, exits dropped", entry.get('id'), exchange_name)
+            return
+        self.add_oco(exchange_name, exits['symbol'], exits['side'], filled, exits['take_profit'],
+                     exits['stop_loss'], exits['client_order_id'], exits['chat_id'])
+
+    def _on_order_update(self, tracked: TrackedOrder, previous_state: str):
+        if not tracked.is_terminal:
+            return
+        key = (tracked.exchange_name, tracked.order_id)
+        exits = self.pending_brackets.pop(key, None)
+        if exits:
+            self._arm_bracket(tracked.exchange_name, tracked.order, exits)
+        condition_id = self.native_orders.pop(key, None)
+        if condition_id:
+            condition = self.conditions.pop(condition_id, None)
+            if condition and tracked.state == FILLED:
+                condition.status = TRIGGERED
+                self._emit(condition, TRIGGERED)
+
+    def _arm(self, condition: ConditionalOrder):
+        """Puts a condition into its market's trigger index, subscribing to the ticker if needed"""
+        key = (condition.exchange_name, condition.symbol)
+        index = self.indices.get(key)
+        if index is None:
+            index = self.indices[key] = TriggerIndex()
+            self.ticker_cache.subscribe(condition.exchange_name, condition.symbol, self.on_ticker)
+        index.add(condition.id, condition.direction, condition.trigger_price, condition)
+
+    def _disarm(self, condition: ConditionalOrder):
+        key = (condition.exchange_name, condition.symbol)
+        index = self.indices.get(key)
+        if index is None:
+            return
+        index.remove(condition.id)
+        if not index:
+            del self.indices[key]
+            self.ticker_cache.unsubscribe(condition.exchange_name, condition.symbol, self.on_ticker)
+
+    def _siblings(self, condition: ConditionalOrder) -> List[ConditionalOrder]:
+        if not condition.group:
+            return []
+        return [
+            self.conditions[sibling_id] for sibling_id in self.groups.get(condition.group, [])
+            if sibling_id != condition.id and sibling_id in self.conditions
+        ]
+
+    def on_ticker(self, exchange_name: str, symbol: str, ticker: Dict[str, Any]):
+        """Fires every trigger crossed by the new price"""
+        price = ticker.get('last')
+        key = (exchange_name, symbol)
+        index = self.indices.get(key)
+        if price is None or index is None:
+            return
+        lowest_above, highest_below = index.nearest()
+        if highest_below < price < lowest_above:
+            return
+
+        for condition in index.cross(price):
+            # Egy OCO csoportból egyszerre csak egy tag kerül beküldésre;
+            # a kimaradt tagot a sikertelen beküldés újra élesíti
+            if condition.status != PENDING or condition.group in self._executing:
+                continue
+            condition.status = TRIGGERED
+            if condition.group:
+                self._executing.add(condition.group)
+                for sibling in self._siblings(condition):
+                    self._disarm(sibling)
+            self._spawn(self._execute(condition, price))
+
+        if not index and self.indices.get(key) is index:
+            del self.indices[key]
+            self.ticker_cache.unsubscribe(exchange_name, symbol, self.on_ticker)
+
+    def _cancel_siblings(self, condition: ConditionalOrder):
+        for sibling in self._siblings(condition):
+            self.conditions.pop(sibling.id, None)
+            sibling.status = CANCELED
+            self._disarm(sibling)
+        if condition.group:
+            self.groups.pop(condition.group, None)
+            self._executing.discard(condition.group)
+
+    def _rearm(self, condition: ConditionalOrder, retry: bool):
+        """Puts the OCO siblings of a failed condition back, and the condition itself if retry is set"""
+        self._executing.discard(condition.group)
+        if retry and self.conditions.get(condition.id) is condition:
+            condition.status = PENDING
+            self._arm(condition)
+        else:
+            self.conditions.pop(condition.id, None)
+            if condition.group in self.groups:
+                self.groups[condition.group].remove(condition.id)
+        for sibling in self._siblings(condition):
+            if sibling.status == PENDING:
+                self._arm(sibling)
+
+    async def _execute(self, condition: ConditionalOrder, price: float):
+        logger.info("Condition %s triggered at %s", condition.id, price)
+        reservation = None
+        try:
+            if self.risk_manager:
+                reservation = self.risk_manager.check_order(
+                    condition.exchange_name, condition.symbol, condition.side, condition.amount,
+                    condition.price or price
+                )
+            order = await self.trade_manager.place_order(
+                condition.exchange_name, condition.symbol, condition.side, condition.amount, condition.price,
+                client_order_id=condition.client_order_id, chat_id=condition.chat_id
+            )
+        except RiskLimitExceeded as e:
+            logger.warning("Condition %s rejected by risk check: %s", condition.id, e)
+            self._rearm(condition, retry=False)
+            self._emit(condition, 'rejected', str(e))
+            return
+        except (ccxt.NetworkError, asyncio.TimeoutError) as e:
+            # Átmeneti hiba: a feltétel újra élesedik, az ismételt beküldés ugyanazzal a client order id-vel megy
+            if self.risk_manager:
+                self.risk_manager.release(reservation)
+            logger.warning("Condition %s order failed, re-armed: %s", condition.id, e)
+            self._rearm(condition, retry=True)
+            self._emit(condition, REARMED, str(e))
+            return
+        except Exception as e:
+            if self.risk_manager:
+                self.risk_manager.release(reservation)
+            logger.error("Condition %s order failed: %s", condition.id, e, exc_info=True)
+            self._rearm(condition, retry=False)
+            self._emit(condition, 'failed', str(e))
+            return
+
+        if self.risk_manager:
+            self.risk_manager.attach(reservation, condition.exchange_name, order)
+        condition.order_id = order['id']
+        if condition.status == CANCELED:
+            # A cancel() a beküldés közben futott: a még nyitott ordert visszavonjuk
+            tracked = self.trade_manager.order_tracker.get(condition.exchange_name, order['id'])
+            if not (tracked and tracked.is_terminal):
+                await self._cancel_late_order(condition)
+                return
+            logger.warning("Condition %s was canceled after its order %s had filled", condition.id, order['id'])
+        self.conditions.pop(condition.id, None)
+        self._cancel_siblings(condition)
+        self._emit(condition, TRIGGERED, str(order.get('average') or order.get('price') or price))
+
+    async def _cancel_late_order(self, condition: ConditionalOrder):
+        exchange = self.exchange_manager.get_exchange(condition.exchange_name)
+        try:
+            order = await exchange.cancel_order(condition.order_id, condition.symbol)
+        except Exception as e:
+            logger.error("Could not cancel order %s of canceled condition %s: %s", condition.order_id, condition.id, e)
+            self._emit(condition, 'failed', f"order {condition.order_id} placed while canceling, still open: {e}")
+            return
+        if order:
+            self.trade_manager.order_tracker.on_order_update(condition.exchange_name, order)
+        logger.info("Condition %s canceled while placing, order %s canceled", condition.id, condition.order_id)
+
+    async def cancel(self, condition_id: str) -> bool:
+        """Cancels a condition together with its OCO siblings; a failed exchange cancel keeps it"""
+        condition = self.conditions.get(condition_id)
+        if not condition:
+            return False
+        if condition.order_id:
+            exchange = self.exchange_manager.get_exchange(condition.exchange_name)
+            order = await exchange.cancel_order(condition.order_id, condition.symbol)
+            self.conditions.pop(condition_id, None)
+            self.native_orders.pop((condition.exchange_name, condition.order_id), None)
+            condition.status = CANCELED
+            if order:
+                self.trade_manager.order_tracker.on_order_update(condition.exchange_name, order)
+            return True
+
+        self.conditions.pop(condition_id, None)
+        condition.status = CANCELED
+        self._disarm(condition)
+        self._cancel_siblings(condition)
+        return True
+
+    def export_state(self) -> Dict[str, Any]:
+        """Armed conditions, native trigger orders and bracket exits still waiting for their entry"""
+        return {
+            'conditions': [
+                {slot: getattr(condition, slot) for slot in ConditionalOrder.__slots__}
+                for condition in self.conditions.values() if condition.status in (PENDING, NATIVE)
+            ],
+            'pending_brackets': [
+                {'exchange': exchange_name, 'order_id': order_id, 'exits': exits}
+                for (exchange_name, order_id), exits in self.pending_brackets.items()
+            ],
+            'native_orders': [
+                {'exchange': exchange_name, 'order_id': order_id, 'condition_id': condition_id}
+                for (exchange_name, order_id), condition_id in self.native_orders.items()
+            ]
+        }
+
+    def restore_state(self, state: Dict[str, Any]):
+        """Re-arms a snapshot written by export_state(); needs a running loop for the ticker subscriptions"""
+        for entry in state.get('conditions', []):
+            if not self.exchange_manager.get_exchange(entry['exchange_name']):
+                continue
+            condition = ConditionalOrder(
+                entry['id'], entry['exchange_name'], entry['symbol'], entry['direction'], entry['trigger_price'],
+                entry['side'], entry['amount'], entry.get('price'), entry.get('client_order_id'),
+                entry.get('chat_id'), entry.get('kind', 'when'), entry.get('group')
+            )
+            condition.status = entry.get('status', PENDING)
+            condition.order_id = entry.get('order_id')
+            self.conditions[condition.id] = condition
+            if condition.status != PENDING:
+                continue
+            if condition.group:
+                self.groups.setdefault(condition.group, []).append(condition.id)
+            self._arm(condition)
+
+        for entry in state.get('native_orders', []):
+            if entry['condition_id'] in self.conditions:
+                self.native_orders[(entry['exchange'], entry['order_id'])] = entry['condition_id']
+        for entry in state.get('pending_brackets', []):
+            if self.exchange_manager.get_exchange(entry['exchange']):
+                self.pending_brackets[(entry['exchange'], entry['order_id'])] = entry['exits']
+
+        # Az új azonosítók ne ütközzenek a visszatöltöttekkel
+        self._ids = itertools.count(max([int(c[1:]) for c in self.conditions if c[1:].isdigit()] + [0]) + 1)
+        self._group_ids = itertools.count(max([int(g[1:]) for g in self.groups if g[1:].isdigit()] + [0]) + 1)
+        logger.info("Restored %s conditions and %s pending brackets",
+                    len(self.conditions), len(self.pending_brackets))
+
+    def get_conditions(self, exchange_name: str = None) -> List[ConditionalOrder]:
+        return [c for c in self.conditions.values() if exchange_name is None or c.exchange_name == exchange_name]
@@ -3,11 +3,18 @@ Database Handler - Manages local SQLite database
 Stores position history and trade data
 """
 import sqlite3
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+
+_INSERT_TRADE = '''
+    INSERT INTO trades (exchange, symbol, order_id, client_order_id, side, amount, price, cost, fee,
+                        fee_currency, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
 
 class DatabaseHandler:
-    def __init__(self, db_path: str = 'positions.db'):
-        self.conn = sqlite3.connect(db_path)
+    def __init__(self, db_path: str = 'positions.db', check_same_thread: bool = True):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
         self._create_tables()
 
     def _create_tables(self):
@@ -24,6 +31,48 @@ class DatabaseHandler:
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER NOT NULL,
+                exchange TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                direction TEXT,
+                price REAL,
+                percent REAL,
+                reference_price REAL,
+                active INTEGER NOT NULL DEFAULT 1,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                triggered_at DATETIME
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_active ON alerts (active, exchange, symbol)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS trades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                exchange TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                order_id TEXT NOT NULL,
+                client_order_id TEXT,
+                side TEXT NOT NULL,
+                amount REAL NOT NULL,
+                price REAL,
+                cost REAL,
+                fee REAL,
+                fee_currency TEXT,
+                timestamp DATETIME NOT NULL
+            )
+        ''')
+        # Az export dátum- és alias-szűrői ezeken az indexeken futnak
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades (timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_trades_exchange ON trades (exchange, timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_trades_order ON trades (exchange, order_id)')
+        # Pozíció előzmény: a lezárt pozíció sora megmarad, closed_at jelöli a zárást
+        if 'closed_at' not in [row[1] for row in cursor.execute('PRAGMA table_info(positions)')]:
+            cursor.execute('ALTER TABLE positions ADD COLUMN closed_at DATETIME')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_positions_timestamp ON positions (timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_positions_exchange ON positions (exchange, timestamp)')
         self.conn.commit()
 
     def add_position(self, position: Dict[str, Any]):
@@ -42,6 +91,22 @@ class DatabaseHandler:
         ))
         self.conn.commit()
 
+    def upsert_positions(self, positions: List[Dict[str, Any]]):
+        """Inserts or updates a batch of position history rows in one transaction"""
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO positions (id, exchange, symbol, side, amount, entry_price, current_price, timestamp,
+                                       closed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET amount = excluded.amount, entry_price = excluded.entry_price,
+                    current_price = excluded.current_price, closed_at = excluded.closed_at
+            ''', [
+                (position['id'], position['exchange'], position['symbol'], position['side'], position['amount'],
+                 position.get('entry_price'), position.get('current_price'), position['timestamp'],
+                 position.get('closed_at'))
+                for position in positions
+            ])
+
     def remove_position(self, position_id: str):
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM positions WHERE id = ?', (position_id,))
@@ -54,4 +119,91 @@ class DatabaseHandler:
         else:
             cursor.execute('SELECT * FROM positions')
         columns = [column[0] for column in cursor.description]
-        return [dict(zip(columns, row)) for row in cursor.fetchall()]
\ No newline at end of file
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _trade_row(trade: Dict[str, Any]) -> Tuple:
+        return (
+            trade['exchange'],
+            trade['symbol'],
+            trade['order_id'],
+            trade.get('client_order_id'),
+            trade['side'],
+            trade['amount'],
+            trade.get('price'),
+            trade.get('cost'),
+            trade.get('fee'),
+            trade.get('fee_currency'),
+            trade['timestamp']
+        )
+
+    def add_trade(self, trade: Dict[str, Any]) -> int:
+        cursor = self.conn.cursor()
+        cursor.execute(_INSERT_TRADE, self._trade_row(trade))
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def add_trades(self, trades: List[Dict[str, Any]]):
+        """Inserts a batch of trades in one transaction"""
+        with self.conn:
+            self.conn.executemany(_INSERT_TRADE, [self._trade_row(trade) for trade in trades])
+
+    def get_order_fill_totals(self, exchange: str, order_id: str) -> Tuple[float, float, float]:
+        """Amount, cost and fee already recorded for an order"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            'SELECT COALESCE(SUM(amount), 0), COALESCE(SUM(cost), 0), COALESCE(SUM(fee), 0) '
+            'FROM trades WHERE exchange = ? AND order_id = ?',
+            (exchange, order_id)
+        )
+        return cursor.fetchone()
+
+    def add_alert(self, alert: Dict[str, Any]) -> int:
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT INTO alerts (chat_id, exchange, symbol, kind, direction, price, percent, reference_price)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            alert['chat_id'],
+            alert['exchange'],
+            alert['symbol'],
+            alert['kind'],
+            alert.get('direction'),
+            alert.get('price'),
+            alert.get('percent'),
+            alert.get('reference_price')
+        ))
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def deactivate_alert(self, alert_id: int, triggered: bool = False) -> bool:
+        cursor = self.conn.cursor()
+        cursor.execute(
+            'UPDATE alerts SET active = 0, triggered_at = CASE WHEN ? THEN CURRENT_TIMESTAMP END '
+            'WHERE id = ? AND active = 1',
+            (triggered, alert_id)
+        )
+        self.conn.commit()
+        return cursor.rowcount > 0
+
+    def deactivate_alerts(self, alert_ids: List[int], triggered: bool = False):
+        """Deactivates a batch of alerts in one transaction"""
+        with self.conn:
+            self.conn.executemany(
+                'UPDATE alerts SET active = 0, triggered_at = CASE WHEN ? THEN CURRENT_TIMESTAMP END '
+                'WHERE id = ? AND active = 1',
+                [(triggered, alert_id) for alert_id in alert_ids]
+            )
+
+    def get_alerts(self, chat_id: int = None) -> List[Dict[str, Any]]:
+        cursor = self.conn.cursor()
+        if chat_id is not None:
+            cursor.execute('SELECT * FROM alerts WHERE active = 1 AND chat_id = ? ORDER BY id', (chat_id,))
+        else:
+            cursor.execute('SELECT * FROM alerts WHERE active = 1 ORDER BY id')
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,205 @@
+"""
+Endpoint Prober - Background latency probing of alternative API hosts
+Measures round-trip time, error rate and clock offset per candidate host and
+points each alias at its fastest healthy host without a restart
+"""
+import asyncio
+import json
+import logging
+import statistics
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+class HostStats:
+    """Sliding window of probe results for one candidate host"""
+    __slots__ = ('host', 'rtts', 'offsets')
+
+    def __init__(self, host: str, window: int):
+        self.host = host
+        self.rtts = deque(maxlen=window)  # másodperc, None = sikertelen próba
+        self.offsets = deque(maxlen=window)  # ms, szerver idő - helyi idő
+
+    def record(self, rtt: Optional[float], offset: Optional[float] = None):
+        self.rtts.append(rtt)
+        if offset is not None:
+            self.offsets.append(offset)
+
+    @property
+    def rtt(self) -> Optional[float]:
+        samples = [rtt for rtt in self.rtts if rtt is not None]
+        return statistics.median(samples) if samples else None
+
+    @property
+    def error_rate(self) -> float:
+        if not self.rtts:
+            return 0.0
+        return sum(1 for rtt in self.rtts if rtt is None) / len(self.rtts)
+
+    @property
+    def offset(self) -> Optional[float]:
+        return statistics.median(self.offsets) if self.offsets else None
+
+class EndpointProber:
+    """Probes the "probe" hosts of every alias and switches each alias to the fastest healthy one
+
+    An alias opts in with a block in exchange_configs.json:
+        "probe": {"hosts": ["https://api.binance.com", "https://api1.binance.com"],
+                  "path": "/api/v3/time", "time_key": "serverTime"}
+    The clock offset comes from time_key in the JSON body, or from the Date header
+    (second resolution) when no key is given.
+    """
+
+    def __init__(self, exchange_manager, interval: float = 60.0, timeout: float = 2.0, window: int = 10,
+                 max_error_rate: float = 0.2, switch_margin: float = 0.2,
+                 fetch: Callable = None):
+        self.exchange_manager = exchange_manager
+        self.interval = interval
+        self.timeout = timeout
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.switch_margin = switch_margin
+        # fetch(url) -> (status, headers, body); tesztekben helyi szerver vagy stub helyettesítheti
+        self._fetch = fetch or self._http_get
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.stats: Dict[str, Dict[str, HostStats]] = {}  # {alias: {host: stats}}
+        self.is_active = False
+        self._wakeup = asyncio.Event()
+
+    def _targets(self) -> Dict[str, Dict[str, Any]]:
+        targets = {}
+        for alias, config in self.exchange_manager.exchange_configs.items():
+            probe = config.get('probe') or {}
+            if probe.get('hosts') and alias in self.exchange_manager.exchanges:
+                targets[alias] = probe
+        return targets
+
+    async def _http_get(self, url: str) -> Tuple[int, Dict[str, str], bytes]:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        async with self._session.get(url, allow_redirects=False) as response:
+            return response.status, dict(response.headers), await response.read()
+
+    async def _probe(self, alias: str, host: str, probe: Dict[str, Any]):
+        stats = self.stats[alias][host]
+        url = host.rstrip('/') + probe.get('path', '/')
+        loop = asyncio.get_running_loop()
+        sent_at = time.time()
+        started = loop.time()
+        try:
+            status, headers, body = await asyncio.wait_for(self._fetch(url), self.timeout)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            logger.debug("Probe of %s for %s failed: %s", url, alias, str(e) or type(e).__name__)
+            stats.record(None)
+            return
+        rtt = loop.time() - started
+        if status >= 400:
+            logger.debug("Probe of %s for %s returned HTTP %s", url, alias, status)
+            stats.record(None)
+            return
+
+        server_ms = None
+        try:
+            if probe.get('time_key'):
+                server_ms = float(json.loads(body)[probe['time_key']])
+            elif headers.get('Date'):
+                server_ms = parsedate_to_datetime(headers['Date']).timestamp() * 1000
+        except (ValueError, KeyError, TypeError) as e:
+            logger.debug("No server time in probe response of %s: %s", url, e)
+        # NTP-szerű becslés: a szerver a kérés és a válasz közötti idő felénél olvasta az óráját
+        offset = server_ms - (sent_at + rtt / 2) * 1000 if server_ms is not None else None
+        stats.record(rtt, offset)
+
+    async def probe_once(self):
+        """Probes every candidate host once, concurrently, then re-selects hosts"""
+        targets = self._targets()
+        for alias in list(self.stats):
+            if alias not in targets:
+                del self.stats[alias]
+
+        probes = []
+        for alias, probe in targets.items():
+            hosts = self.stats.setdefault(alias, {})
+            for host in probe['hosts']:
+                if host not in hosts:
+                    hosts[host] = HostStats(host, self.window)
+                probes.append(self._probe(alias, host, probe))
+        if probes:
+            await asyncio.gather(*probes)
+        for alias in targets:
+            self._select(alias)
+
+    def _healthy(self, stats: HostStats) -> bool:
+        return stats.rtt is not None and stats.error_rate <= self.max_error_rate
+
+    def _select(self, alias: str):
+        """Switches to the fastest healthy host once it beats the current one by switch_margin"""
+        hosts = self.stats[alias]
+        healthy = [stats for stats in hosts.values() if self._healthy(stats)]
+        current = hosts.get(self.exchange_manager.api_hosts.get(alias))
+        if not healthy:
+            logger.warning("No healthy API host for %s", alias)
+            return
+
+        best = min(healthy, key=lambda stats: stats.rtt)
+        # Hiszterézis: kis különbségnél nem váltunk, hogy a kliens ne ugráljon a hostok között
+        if current is None or not self._healthy(current) or best.rtt < current.rtt * (1 - self.switch_margin):
+            if best is not current:
+                logger.info("Switching %s API host to %s (%.0f ms, previous %s)",
+                            alias, best.host, best.rtt * 1000, current.host if current else 'default')
+                self.exchange_manager.set_api_host(alias, best.host)
+            current = best
+
+        if current.offset is not None:
+            # ccxt timeDifference: helyi idő - szerver idő, az aláírt kérések időbélyegéhez
+            self.exchange_manager.set_time_difference(alias, int(round(-current.offset)))
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """Measured latency of the active host of each probed alias"""
+        status = {}
+        for alias, hosts in self.stats.items():
+            stats = hosts.get(self.exchange_manager.api_hosts.get(alias))
+            if stats is None:
+                continue
+            status[alias] = {
+                'host': stats.host,
+                'rtt_ms': stats.rtt * 1000 if stats.rtt is not None else None,
+                'error_rate': stats.error_rate,
+                'offset_ms': stats.offset,
+                'hosts': {
+                    host: {'rtt_ms': s.rtt * 1000 if s.rtt is not None else None, 'error_rate': s.error_rate}
+                    for host, s in hosts.items()
+                }
+            }
+        return status
+
+    async def start(self):
+        """Probes periodically until stopped"""
+        self.is_active = True
+        logger.info("Endpoint prober started")
+        try:
+            while self.is_active:
+                self._wakeup.clear()
+                try:
+                    await self.probe_once()
+                except Exception as e:
+                    logger.error("Endpoint probe error: %s", e, exc_info=True)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            logger.info("Endpoint prober stop requested")
+        finally:
+            self.is_active = False
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+
+    def stop(self):
+        self.is_active = False
+        self._wakeup.set()
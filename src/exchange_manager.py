@@ -2,20 +2,65 @@
 Exchange Manager - Handles all exchange connections
 Manages dynamic addition/removal of exchanges
 """
-import ccxt
+import asyncio
+import ccxt.async_support as ccxt
 import json
 import logging
 import os
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit
 from utils.config_loader import get_config_path
 from utils.message_handler import MessageHandler
+from utils.ttl_cache import TTLCache
+from simulator.fake_exchange import FakeExchange
+
+# Offline exchange id-k, amelyek a ccxt előtt kerülnek feloldásra
+SIMULATED_EXCHANGES = {FakeExchange.id: FakeExchange}
+
+# Kereskedési módok aliasonként; a ccxt defaultType értéke aliasonként a "mode_types" kulccsal felülírható
+MODES = ('spot', 'margin', 'futures')
+DEFAULT_MODE_TYPES = {'spot': 'spot', 'margin': 'margin', 'futures': 'swap'}
+TYPE_MODES = {'spot': 'spot', 'margin': 'margin', 'swap': 'futures', 'future': 'futures', 'delivery': 'futures'}
+
+# Jelzi, hogy a beküldés eredménye ismeretlen (hálózati hiba után), újrapróbáláskor előbb keresni kell
+_UNCONFIRMED = object()
+
+class UnconfirmedOrderError(ccxt.ExchangeError):
+    """The lookup after an ambiguous submission failed, so it is unknown whether the order exists"""
+
+def make_client_order_id(update_id: int, leg: str = '') -> str:
+    """Deterministic client order id derived from a Telegram update id
+
+    Alphanumeric only and at most 32 characters, which satisfies the
+    clientOrderId rules of the exchanges supported by ccxt.
+    """
+    return f"telex{update_id}{leg}"[:32]
 
 class ExchangeManager:
     def __init__(self, config):
         self.config = config
-        self.exchanges: Dict[str, Any] = {}
+        self.exchanges: Dict[str, Any] = {}  # {alias: alapértelmezett módú kliens}
+        self.exchange_configs: Dict[str, Dict[str, Any]] = {}
+        self.base_modes: Dict[str, str] = {}
+        self.mode_clients: Dict[Tuple[str, str], Any] = {}  # {(alias, mode): lustán létrehozott kliens}
+        self.api_hosts: Dict[str, str] = {}  # {alias: az endpoint prober által választott host}
+        self.time_differences: Dict[str, int] = {}  # {alias: helyi - szerver idő ms-ban}
         self.message_handler = MessageHandler(config['settings']['default_language'])
         self.exchange_config_path = os.path.join(get_config_path(), 'exchange_configs.json')
+
+        settings = config.get('settings', {})
+        self.default_mode = settings.get('default_mode') or 'spot'
+        self.order_timeout = settings.get('order_timeout', 5.0)
+        self.order_retries = settings.get('order_retries', 2)
+        self.order_retry_backoff = settings.get('order_retry_backoff', 0.2)
+        # {(exchange_name, client_order_id): order | _UNCONFIRMED}
+        self.submissions = TTLCache(
+            maxsize=settings.get('order_dedup_size', 10000),
+            ttl=settings.get('order_dedup_ttl', 900)
+        )
+        # A folyamatban lévő beküldések külön, hogy a gyorsítótár méretkorlátja ne dobhassa ki őket
+        self.inflight_submissions: Dict[Tuple[str, str], asyncio.Future] = {}
         self.load_exchanges()
 
     def load_exchanges(self):
@@ -27,21 +72,123 @@ class ExchangeManager:
         except (FileNotFoundError, json.JSONDecodeError):
             logging.info("No exchange configs found, starting with empty config")
 
+    @staticmethod
+    def _get_exchange_class(exchange_id: str):
+        """Resolves an exchange id to the simulator or the matching ccxt class"""
+        if exchange_id in SIMULATED_EXCHANGES:
+            return SIMULATED_EXCHANGES[exchange_id]
+        return getattr(ccxt, exchange_id)
+
     def _initialize_exchange(self, name: str, config: Dict[str, Any]):
         try:
-            exchange_class = getattr(ccxt, config['exchange'])
-            self.exchanges[name] = exchange_class({
-                'apiKey': config['apiKey'],
-                'secret': config['secret'],
-                'enableRateLimit': config.get('enableRateLimit', True),
-                'options': config.get('options', {})
-            })
-            logging.info(f"Exchange connection created: {name}")
+            default_type = config.get('options', {}).get('defaultType')
+            mode = config.get('mode') or TYPE_MODES.get(default_type) or self.default_mode
+            if mode not in MODES:
+                raise ValueError(f"Unknown mode: {mode}")
+            self.exchange_configs[name] = config
+            self.base_modes[name] = mode
+            self.exchanges[name] = self._build_client(config, mode, override_type='mode' in config)
+            logging.info("Exchange connection created: %s (%s)", name, mode)
             return True
         except Exception as e:
-            logging.error(f"Error initializing exchange {name}: {str(e)}")
+            logging.error("Error initializing exchange %s: %s", name, e)
             return False
 
+    def _build_client(self, config: Dict[str, Any], mode: str, override_type: bool = True, shared=None):
+        """Creates a ccxt client for one mode of an alias, reusing the session and markets of shared"""
+        options = dict(config.get('options', {}))
+        mode_type = {**DEFAULT_MODE_TYPES, **config.get('mode_types', {})}[mode]
+        if override_type or 'defaultType' not in options:
+            options['defaultType'] = mode_type
+        client_config = {
+            'apiKey': config['apiKey'],
+            'secret': config['secret'],
+            'enableRateLimit': config.get('enableRateLimit', True),
+            'options': options
+        }
+        if shared is not None and getattr(shared, 'session', None) is not None:
+            # Közös aiohttp session: egy connection pool aliasonként, a lezárás az alap kliens dolga
+            client_config['session'] = shared.session
+        client = self._get_exchange_class(config['exchange'])(client_config)
+
+        if shared is not None:
+            if getattr(shared, 'throttler', None) is not None:
+                # Egy számla, egy rate limit: a módok közös token bucketet használnak
+                client.throttler = shared.throttler
+            if getattr(shared, 'markets', None):
+                client.set_markets(shared.markets)
+        return client
+
+    def get_exchange(self, name: str, mode: str = None) -> Optional[Any]:
+        """Client of an alias; 'alias:mode' or the mode argument selects a lazily created mode client"""
+        alias, _, name_mode = name.partition(':')
+        mode = mode or name_mode or None
+        base = self.exchanges.get(alias)
+        if base is None or mode is None or mode == self.base_modes.get(alias):
+            return base
+        if mode not in MODES:
+            return None
+
+        client = self.mode_clients.get((alias, mode))
+        if client is None:
+            if getattr(base, 'session', None) is None and hasattr(base, 'open'):
+                try:
+                    base.open()
+                except RuntimeError:
+                    pass  # nincs futó eseményhurok, a kliens saját sessiont nyit
+            client = self._build_client(self.exchange_configs[alias], mode, shared=base)
+            self._apply_endpoint(alias, client)
+            self.mode_clients[(alias, mode)] = client
+            logging.info("Exchange connection created: %s (%s)", alias, mode)
+        return client
+
+    def _alias_clients(self, alias: str) -> List[Any]:
+        clients = [self.exchanges[alias]] if alias in self.exchanges else []
+        return clients + [client for (name, _), client in self.mode_clients.items() if name == alias]
+
+    @staticmethod
+    def _rewrite_urls(urls, netlocs, host: str):
+        """Points every URL on one of netlocs at host, leaving other hosts (e.g. futures APIs) untouched"""
+        if isinstance(urls, dict):
+            return {key: ExchangeManager._rewrite_urls(value, netlocs, host) for key, value in urls.items()}
+        if isinstance(urls, str):
+            parts = urlsplit(urls)
+            if parts.netloc in netlocs:
+                target = urlsplit(host)
+                return parts._replace(scheme=target.scheme, netloc=target.netloc).geturl()
+        return urls
+
+    def _apply_endpoint(self, alias: str, client):
+        host = self.api_hosts.get(alias)
+        if host is not None:
+            candidates = self.exchange_configs.get(alias, {}).get('probe', {}).get('hosts', [])
+            netlocs = {urlsplit(candidate).netloc for candidate in candidates + [host]}
+            client.urls['api'] = self._rewrite_urls(client.urls['api'], netlocs, host)
+        if alias in self.time_differences:
+            client.options['timeDifference'] = self.time_differences[alias]
+
+    def set_api_host(self, alias: str, host: str):
+        """Switches every client of an alias to host; URLs on any of its probe hosts are rewritten"""
+        self.api_hosts[alias] = host
+        for client in self._alias_clients(alias):
+            self._apply_endpoint(alias, client)
+
+    def set_time_difference(self, alias: str, time_difference: int):
+        """Sets ccxt's timeDifference (local minus server clock, ms) used for signed request timestamps"""
+        self.time_differences[alias] = time_difference
+        for client in self._alias_clients(alias):
+            client.options['timeDifference'] = time_difference
+
+    def canonical_name(self, name: str, mode: str = None) -> Optional[str]:
+        """Normalised 'alias' or 'alias:mode' key, None for unknown aliases or modes"""
+        alias, _, name_mode = name.partition(':')
+        mode = mode or name_mode or None
+        if alias not in self.exchanges or (mode is not None and mode not in MODES):
+            return None
+        if mode is None or mode == self.base_modes[alias]:
+            return alias
+        return f"{alias}:{mode}"
+
     async def add_exchange(self, name: str, config: Dict[str, Any]) -> bool:
         if name in self.exchanges:
             return False
@@ -49,15 +196,16 @@ class ExchangeManager:
         # Validate the exchange connection before saving
         test_exchange = None
         try:
-            exchange_class = getattr(ccxt, config['exchange'])
+            exchange_class = self._get_exchange_class(config['exchange'])
             test_exchange = exchange_class({
                 'apiKey': config['apiKey'],
                 'secret': config['secret'],
-                'enableRateLimit': config.get('enableRateLimit', True)
+                'enableRateLimit': config.get('enableRateLimit', True),
+                'options': config.get('options', {})
             })
             await test_exchange.fetch_balance()  # Test connection
         except Exception as e:
-            logging.error(f"Exchange validation failed: {str(e)}")
+            logging.error("Exchange validation failed: %s", e)
             return False
         finally:
             if test_exchange:
@@ -81,8 +229,16 @@ class ExchangeManager:
             return False
 
         # Remove from active connections
+        for mode in MODES:
+            client = self.mode_clients.pop((name, mode), None)
+            if client:
+                await client.close()
         await self.exchanges[name].close()
         del self.exchanges[name]
+        self.exchange_configs.pop(name, None)
+        self.base_modes.pop(name, None)
+        self.api_hosts.pop(name, None)
+        self.time_differences.pop(name, None)
 
         # Update config file
         exchange_configs = {}
@@ -97,46 +253,144 @@ class ExchangeManager:
         
         return True
 
-    def get_exchange(self, name: str) -> Optional[Any]:
-        return self.exchanges.get(name)
+    async def close_all(self):
+        """Closes every exchange session concurrently; mode clients first, as they share the base session"""
+        for clients in (dict(self.mode_clients), dict(self.exchanges)):
+            names = list(clients)
+            results = await asyncio.gather(*(clients[name].close() for name in names), return_exceptions=True)
+            for name, result in zip(names, results):
+                if isinstance(result, Exception):
+                    logging.warning("Failed to close %s: %s", name, result)
+        self.mode_clients.clear()
 
     def get_available_exchanges(self) -> Dict[str, str]:
         return {name: str(exchange) for name, exchange in self.exchanges.items()}
 
     async def test_exchange_connection(self, config: Dict[str, Any]) -> bool:
         try:
-            exchange_class = getattr(ccxt, config['exchange'])
+            exchange_class = self._get_exchange_class(config['exchange'])
             exchange = exchange_class({
                 'apiKey': config['apiKey'],
                 'secret': config['secret'],
-                'enableRateLimit': config.get('enableRateLimit', True)
+                'enableRateLimit': config.get('enableRateLimit', True),
+                'options': config.get('options', {})
             })
             await exchange.fetch_balance()
             await exchange.close()
             return True
         except Exception as e:
-            logging.error(f"Connection test failed: {str(e)}")
+            logging.error("Connection test failed: %s", e)
             return False
 
-    async def create_order(self, exchange_name: str, symbol: str, side: str, amount: float, price: float = None, params: Dict = None):
+    async def create_order(self, exchange_name: str, symbol: str, side: str, amount: float, price: float = None,
+                           params: Dict = None, client_order_id: str = None):
         exchange = self.get_exchange(exchange_name)
         if not exchange:
             raise ValueError(self.message_handler.get_message('exchange_not_found', name=exchange_name))
-        
+
         order_type = 'limit' if price else 'market'
-        
+        params = dict(params or {})
+        if not client_order_id:
+            # Azonosító nélkül az újrapróbálás nem biztonságos
+            try:
+                return await asyncio.wait_for(
+                    exchange.create_order(symbol=symbol, type=order_type, side=side,
+                                          amount=amount, price=price, params=params),
+                    timeout=self.order_timeout
+                )
+            except Exception as e:
+                logging.error("Order error: %s", e)
+                raise
+
+        params['clientOrderId'] = client_order_id
+        key = (exchange_name, client_order_id)
+        inflight = self.inflight_submissions.get(key)
+        if inflight is not None:
+            logging.info("Duplicate submission of %s on %s, awaiting in-flight order", client_order_id, exchange_name)
+            return await asyncio.shield(inflight)
+        previous = self.submissions.get(key)
+        if previous is not None and previous is not _UNCONFIRMED:
+            logging.info("Duplicate submission of %s on %s, returning cached order", client_order_id, exchange_name)
+            return previous
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight_submissions[key] = future
         try:
-            return await exchange.create_order(
-                symbol=symbol,
-                type=order_type,
-                side=side,
-                amount=amount,
-                price=price,
-                params=params or {}
+            order = await self._submit_with_retry(
+                exchange, symbol, order_type, side, amount, price, params,
+                lookup_first=previous is _UNCONFIRMED
             )
         except Exception as e:
-            logging.error(f"Order error: {str(e)}")
+            logging.error("Order error: %s", e)
+            ambiguous = isinstance(e, (ccxt.NetworkError, asyncio.TimeoutError, UnconfirmedOrderError))
+            if ambiguous:
+                self.submissions[key] = _UNCONFIRMED
+            else:
+                self.submissions.pop(key)
+            future.set_exception(e)
+            # Lekérdezzük, hogy várakozó duplikátum nélkül se legyen "never retrieved" figyelmeztetés
+            future.exception()
             raise
+        finally:
+            del self.inflight_submissions[key]
+
+        self.submissions[key] = order
+        future.set_result(order)
+        return order
+
+    async def _submit_with_retry(self, exchange, symbol: str, order_type: str, side: str, amount: float,
+                                 price: Optional[float], params: Dict, lookup_first: bool = False):
+        """Submits an order, retrying network failures only after checking it was not placed"""
+        client_order_id = params['clientOrderId']
+        attempts = self.order_retries + 1
+        for attempt in range(attempts):
+            try:
+                if attempt or lookup_first:
+                    try:
+                        existing = await self._find_order_by_client_id(exchange, symbol, client_order_id)
+                    except (ccxt.NetworkError, asyncio.TimeoutError):
+                        raise
+                    except Exception as e:
+                        # A korábbi próbálkozás eredménye ismeretlen; a hibás lekérdezés nem zárja ki az ordert
+                        raise UnconfirmedOrderError(
+                            f"Could not check whether order {client_order_id} was placed: {e}"
+                        ) from e
+                    if existing:
+                        logging.info("Order %s already placed as %s, not resubmitting", client_order_id, existing['id'])
+                        return existing
+                return await asyncio.wait_for(
+                    exchange.create_order(symbol=symbol, type=order_type, side=side,
+                                          amount=amount, price=price, params=params),
+                    timeout=self.order_timeout
+                )
+            except (ccxt.NetworkError, asyncio.TimeoutError) as e:
+                if attempt == attempts - 1:
+                    raise
+                delay = self.order_retry_backoff * 2 ** attempt
+                logging.warning(
+                    "Network error submitting %s (attempt %d/%d): %s, retrying in %.2fs",
+                    client_order_id, attempt + 1, attempts, str(e) or type(e).__name__, delay
+                )
+                await asyncio.sleep(delay)
+
+    async def _find_order_by_client_id(self, exchange, symbol: str, client_order_id: str) -> Optional[Dict[str, Any]]:
+        """Looks up a recent order by client order id using the cheapest supported query"""
+        since = int(time.time() * 1000) - 3600 * 1000
+        if exchange.has.get('fetchOrders'):
+            orders = await asyncio.wait_for(exchange.fetch_orders(symbol, since), timeout=self.order_timeout)
+        else:
+            open_orders, closed_orders = await asyncio.wait_for(
+                asyncio.gather(
+                    exchange.fetch_open_orders(symbol, since),
+                    exchange.fetch_closed_orders(symbol, since)
+                ),
+                timeout=self.order_timeout
+            )
+            orders = open_orders + closed_orders
+        for order in orders:
+            if order.get('clientOrderId') == client_order_id:
+                return order
+        return None
 
     async def get_balance(self, exchange_name: str):
         exchange = self.get_exchange(exchange_name)
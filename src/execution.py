@@ -0,0 +1,367 @@
+"""
+Execution Algorithms - TWAP, iceberg and scaled orders
+A parent order is worked as a series of child orders; every child is scheduled
+on one shared timer heap and paced by a per-exchange request budget
+"""
+import asyncio
+import itertools
+import logging
+import time
+import ccxt.async_support as ccxt
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from order_tracker import TrackedOrder, FILLED, CANCELED as ORDER_CANCELED, REJECTED
+from risk_manager import RiskLimitExceeded
+from utils.timer_scheduler import TimerScheduler, TimerHandle
+
+logger = logging.getLogger(__name__)
+
+TWAP = 'twap'
+ICEBERG = 'iceberg'
+SCALED = 'scaled'
+
+RUNNING = 'running'
+DONE = 'done'
+CANCELED = 'canceled'
+FAILED = 'failed'
+
+class RateBudget:
+    """Token bucket for one exchange; reserve() returns the wait until a request slot"""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class ParentOrder:
+    __slots__ = ('id', 'kind', 'exchange_name', 'symbol', 'side', 'amount', 'price', 'slices', 'interval',
+                 'visible', 'levels', 'client_order_id', 'chat_id', 'status', 'filled', 'children', 'issued',
+                 'open_children', 'timer', 'error')
+
+    def __init__(self, parent_id: str, kind: str, exchange_name: str, symbol: str, side: str, amount: float,
+                 price: float = None, client_order_id: str = None, chat_id: int = None):
+        self.id = parent_id
+        self.kind = kind
+        self.exchange_name = exchange_name
+        self.symbol = symbol
+        self.side = side
+        self.amount = amount
+        self.price = price
+        self.slices = 0
+        self.interval = 0.0
+        self.visible = 0.0
+        self.levels: List[Tuple[float, float]] = []
+        self.client_order_id = client_order_id
+        self.chat_id = chat_id
+        self.status = RUNNING
+        self.filled = 0.0
+        self.children: Dict[str, float] = {}  # {order_id: filled}
+        self.issued = 0
+        self.open_children = set()
+        self.timer: Optional[TimerHandle] = None
+        self.error = ''
+
+    @property
+    def remaining(self) -> float:
+        return max(0.0, self.amount - self.filled)
+
+class ExecutionManager:
+    def __init__(self, trade_manager, risk_manager=None, rate_share: float = 0.5, default_rate: float = 5.0,
+                 retry_delay: float = 1.0):
+        self.trade_manager = trade_manager
+        self.exchange_manager = trade_manager.exchange_manager
+        self.risk_manager = risk_manager
+        self.rate_share = rate_share
+        self.default_rate = default_rate
+        self.retry_delay = retry_delay
+        self.scheduler = TimerScheduler()
+        self.parents: Dict[str, ParentOrder] = {}
+        self.child_parents: Dict[Tuple[str, str], ParentOrder] = {}  # {(exchange, order_id): parent}
+        self.budgets: Dict[str, RateBudget] = {}
+        self.listeners: List[Callable] = []
+        self._ids = itertools.count(1)
+        self._tasks = set()
+        trade_manager.order_tracker.add_listener(self._on_order_update)
+
+    def add_listener(self, callback: Callable):
+        """Registers callback(parent, event); progress is emitted as each child order closes"""
+        self.listeners.append(callback)
+
+    def _emit(self, parent: ParentOrder, event: str):
+        for callback in self.listeners:
+            try:
+                result = callback(parent, event)
+                if asyncio.iscoroutine(result):
+                    task = asyncio.create_task(result)
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+            except Exception as e:
+                logger.error("Execution listener error: %s", e, exc_info=True)
+
+    def _budget(self, exchange_name: str) -> RateBudget:
+        """The share of the exchange rate limit that child orders may use"""
+        budget = self.budgets.get(exchange_name)
+        if budget is None:
+            exchange = self.exchange_manager.get_exchange(exchange_name)
+            rate_limit = getattr(exchange, 'rateLimit', 0) if exchange else 0
+            rate = self.rate_share * 1000 / rate_limit if rate_limit else self.default_rate
+            budget = self.budgets[exchange_name] = RateBudget(rate)
+        return budget
+
+    def _new(self, kind: str, exchange_name: str, symbol: str, side: str, amount: float, price: float,
+             client_order_id: str, chat_id: int) -> ParentOrder:
+        if not self.exchange_manager.get_exchange(exchange_name):
+            raise ValueError(self.exchange_manager.message_handler.get_message(
+                'exchange_not_found', name=exchange_name
+            ))
+        if side not in ('buy', 'sell') or amount <= 0:
+            raise ValueError(f"Invalid order: {side} {amount}")
+        parent = ParentOrder(f"a{next(self._ids)}", kind, exchange_name, symbol, side, amount, price,
+                             client_order_id, chat_id)
+        self.parents[parent.id] = parent
+        return parent
+
+    def start_twap(self, exchange_name: str, symbol: str, side: str, amount: float, duration: float,
+                   slices: int, price: float = None, client_order_id: str = None,
+                   chat_id: int = None) -> ParentOrder:
+        """Equal time slices over duration seconds; each slice also covers what earlier ones missed"""
+        if slices < 1 or duration < 0:
+            raise ValueError(f"Invalid TWAP schedule: {slices} slices over {duration}s")
+        parent = self._new(TWAP, exchange_name, symbol, side, amount, price, client_order_id, chat_id)
+        parent.slices = slices
+        parent.interval = duration / slices
+        self._schedule(parent, 0)
+        logger.info("TWAP %s started: %s %s %s in %s slices every %.1fs",
+                    parent.id, side, amount, symbol, slices, parent.interval)
+        return parent
+
+    def start_iceberg(self, exchange_name: str, symbol: str, side: str, amount: float, price: float,
+                      visible: float, client_order_id: str = None, chat_id: int = None) -> ParentOrder:
+        """Limit order shown visible at a time; the next clip goes out when the previous one closes"""
+        if visible <= 0:
+            raise ValueError(f"Invalid visible amount: {visible}")
+        parent = self._new(ICEBERG, exchange_name, symbol, side, amount, price, client_order_id, chat_id)
+        parent.visible = visible
+        self._schedule(parent, 0)
+        logger.info("Iceberg %s started: %s %s %s @ %s, visible %s",
+                    parent.id, side, amount, symbol, price, visible)
+        return parent
+
+    def start_scaled(self, exchange_name: str, symbol: str, side: str, amount: float, low: float, high: float,
+                     count: int, client_order_id: str = None, chat_id: int = None) -> ParentOrder:
+        """count equal limit orders spread evenly between low and high"""
+        if count < 1 or low <= 0 or high < low:
+            raise ValueError(f"Invalid price ladder: {count} orders between {low} and {high}")
+        parent = self._new(SCALED, exchange_name, symbol, side, amount, None, client_order_id, chat_id)
+        step = (high - low) / (count - 1) if count > 1 else 0.0
+        parent.levels = [(low + step * i, amount / count) for i in range(count)]
+        self._schedule(parent, 0)
+        logger.info("Scaled order %s started: %s %s %s in %s orders between %s and %s",
+                    parent.id, side, amount, symbol, count, low, high)
+        return parent
+
+    def _schedule(self, parent: ParentOrder, delay: float):
+        if parent.timer:
+            parent.timer.cancel()
+        parent.timer = self.scheduler.call_later(delay, self._step, parent)
+
+    async def _step(self, parent: ParentOrder):
+        parent.timer = None
+        if parent.status != RUNNING:
+            return
+        wait = self._budget(parent.exchange_name).reserve()
+        if wait:
+            self._schedule(parent, wait)
+            return
+
+        if parent.kind == TWAP:
+            # A lejárt, nem teljesült szelet maradékát a következő szelet viszi tovább
+            for order_id in list(parent.open_children):
+                await self._cancel_child(parent, order_id)
+            remaining_slices = parent.slices - parent.issued
+            if remaining_slices <= 0 or parent.remaining <= 0:
+                self._finish_if_done(parent)
+                return
+            if not await self._submit(parent, parent.remaining / remaining_slices, parent.price):
+                return
+            if parent.status == RUNNING and (parent.issued < parent.slices or parent.price is not None):
+                # Az utolsó limit szelet is kap egy intervallumot a teljesülésre
+                self._schedule(parent, parent.interval)
+
+        elif parent.kind == ICEBERG:
+            if parent.open_children or parent.remaining <= 0:
+                return
+            await self._submit(parent, min(parent.visible, parent.remaining), parent.price)
+
+        elif parent.kind == SCALED:
+            price, amount = parent.levels[parent.issued]
+            if not await self._submit(parent, amount, price):
+                return
+            if parent.issued < len(parent.levels) and parent.status == RUNNING:
+                self._schedule(parent, 0)
+
+    async def _submit(self, parent: ParentOrder, amount: float, price: float = None) -> bool:
+        """Places one child order; False if it was not placed (retry scheduled or parent failed)"""
+        client_order_id = (
+            f"{parent.client_order_id}{parent.id}n{parent.issued}"[:32] if parent.client_order_id else None
+        )
+        parent.issued += 1
+        reservation = None
+        try:
+            if self.risk_manager:
+                reservation = await self.risk_manager.check(
+                    parent.exchange_name, parent.symbol, parent.side, amount, price
+                )
+            order = await self.trade_manager.place_order(
+                parent.exchange_name, parent.symbol, parent.side, amount, price,
+                client_order_id=client_order_id, chat_id=parent.chat_id
+            )
+        except RiskLimitExceeded as e:
+            logger.warning("Execution %s child rejected by risk check: %s", parent.id, e)
+            self._fail(parent, str(e))
+            return False
+        except (ccxt.NetworkError, asyncio.TimeoutError) as e:
+            # Átmeneti hiba: ugyanazzal a client order id-vel próbáljuk újra, így nem lesz duplikátum
+            if self.risk_manager:
+                self.risk_manager.release(reservation)
+            parent.issued -= 1
+            logger.warning("Execution %s child order failed, retrying in %.1fs: %s", parent.id, self.retry_delay, e)
+            self._schedule(parent, self.retry_delay)
+            return False
+        except Exception as e:
+            if self.risk_manager:
+                self.risk_manager.release(reservation)
+            logger.error("Execution %s child order failed: %s", parent.id, e, exc_info=True)
+            self._fail(parent, str(e))
+            return False
+
+        if self.risk_manager:
+            self.risk_manager.attach(reservation, parent.exchange_name, order)
+        parent.children[order['id']] = 0.0
+        parent.open_children.add(order['id'])
+        self.child_parents[(parent.exchange_name, order['id'])] = parent
+
+        # A track() értesítése a gyerek regisztrálása előtt fut le, így a már lezárt ordert itt könyveljük
+        tracked = self.trade_manager.order_tracker.get(parent.exchange_name, order['id'])
+        if tracked and tracked.is_terminal:
+            self._on_order_update(tracked, None)
+        elif parent.status != RUNNING:
+            # A szülőt a beküldés közben leállították: az új gyerek ne maradjon nyitva
+            logger.info("Execution %s stopped while child %s was placed, canceling it", parent.id, order['id'])
+            await self._cancel_child(parent, order['id'])
+            return False
+        return True
+
+    async def _cancel_child(self, parent: ParentOrder, order_id: str):
+        exchange = self.exchange_manager.get_exchange(parent.exchange_name)
+        try:
+            order = await exchange.cancel_order(order_id, parent.symbol)
+            if order:
+                self.trade_manager.order_tracker.on_order_update(parent.exchange_name, order)
+        except Exception as e:
+            logger.warning("Could not cancel child %s of %s: %s", order_id, parent.id, e)
+        parent.open_children.discard(order_id)
+
+    def _on_order_update(self, tracked: TrackedOrder, previous_state: Optional[str]):
+        parent = self.child_parents.get((tracked.exchange_name, tracked.order_id))
+        if not parent:
+            return
+        parent.children[tracked.order_id] = tracked.order.get('filled') or 0.0
+        parent.filled = sum(parent.children.values())
+        if not tracked.is_terminal:
+            return
+
+        del self.child_parents[(tracked.exchange_name, tracked.order_id)]
+        parent.open_children.discard(tracked.order_id)
+        if tracked.state == REJECTED and parent.status == RUNNING:
+            self._fail(parent, f"order {tracked.order_id} rejected")
+            return
+        if parent.status != RUNNING:
+            return
+        self._emit(parent, 'progress')
+        if parent.kind == ICEBERG and parent.remaining > 0 and tracked.state in (FILLED, ORDER_CANCELED):
+            self._schedule(parent, 0)
+        self._finish_if_done(parent)
+
+    def _finish_if_done(self, parent: ParentOrder):
+        if parent.status != RUNNING or parent.open_children:
+            return
+        complete = parent.remaining <= parent.amount * 1e-9
+        if parent.kind == TWAP:
+            complete = complete or (parent.issued >= parent.slices and parent.timer is None)
+        elif parent.kind == SCALED:
+            complete = complete or parent.issued >= len(parent.levels)
+        if complete:
+            parent.status = DONE
+            if parent.timer:
+                parent.timer.cancel()
+                parent.timer = None
+            logger.info("Execution %s done: %s of %s filled", parent.id, parent.filled, parent.amount)
+            self._emit(parent, DONE)
+
+    def _fail(self, parent: ParentOrder, error: str):
+        if parent.status != RUNNING:
+            return
+        parent.status = FAILED
+        parent.error = error
+        if parent.timer:
+            parent.timer.cancel()
+            parent.timer = None
+        self._emit(parent, FAILED)
+
+    async def cancel(self, parent_id: str) -> bool:
+        """Stops a parent order and cancels its open child orders"""
+        parent = self.parents.get(parent_id)
+        if not parent or parent.status != RUNNING:
+            return False
+        parent.status = CANCELED
+        if parent.timer:
+            parent.timer.cancel()
+            parent.timer = None
+        await asyncio.gather(*(self._cancel_child(parent, order_id) for order_id in list(parent.open_children)))
+        self._emit(parent, CANCELED)
+        return True
+
+    def export_state(self) -> List[Dict[str, Any]]:
+        """Running parent orders; the timer is not saved, a restored parent steps again right away"""
+        return [
+            {**{slot: getattr(parent, slot) for slot in ParentOrder.__slots__ if slot != 'timer'},
+             'open_children': sorted(parent.open_children)}
+            for parent in self.parents.values() if parent.status == RUNNING
+        ]
+
+    def restore_state(self, state: List[Dict[str, Any]]):
+        """Resumes parents saved by export_state(); their open children must already be tracked"""
+        for entry in state:
+            if not self.exchange_manager.get_exchange(entry['exchange_name']):
+                continue
+            parent = ParentOrder(entry['id'], entry['kind'], entry['exchange_name'], entry['symbol'], entry['side'],
+                                 entry['amount'], entry.get('price'), entry.get('client_order_id'),
+                                 entry.get('chat_id'))
+            for slot in ('slices', 'interval', 'visible', 'filled', 'children', 'issued', 'error'):
+                if slot in entry:
+                    setattr(parent, slot, entry[slot])
+            parent.levels = [tuple(level) for level in entry.get('levels', [])]
+            parent.open_children = set(entry.get('open_children', []))
+            self.parents[parent.id] = parent
+            for order_id in parent.open_children:
+                self.child_parents[(parent.exchange_name, order_id)] = parent
+            self._schedule(parent, 0)
+        self._ids = itertools.count(max([int(p[1:]) for p in self.parents if p[1:].isdigit()] + [0]) + 1)
+        if state:
+            logger.info("Restored %s running execution orders", len(state))
+
+    def get_parents(self, active_only: bool = True) -> List[ParentOrder]:
+        return [p for p in self.parents.values() if not active_only or p.status == RUNNING]
+
+    async def stop(self):
+        await self.scheduler.stop()
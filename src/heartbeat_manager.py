@@ -5,7 +5,7 @@ Heartbeat Manager - Periodikus életjel és indítási értesítések
 import time
 import asyncio
 import logging
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List
 from version import __version__
 
 if TYPE_CHECKING:
@@ -53,39 +53,38 @@ class HeartbeatManager:
                 logging.error(f"Missing key in startup message: {str(e)}")
                 message = "✅ Bot szolgáltatás elindult"  # Alapértelmezett üzenet
 
-            # Üzenet küldése
-            for user_id in self.bot.allowed_users:
-                try:
-                    await self.bot.app.bot.send_message(
-                        chat_id=user_id,
-                        text=message,
-                        parse_mode='Markdown'
-                    )
-                    logging.info(f"Startup notification successfully sent to {user_id}")
-                except Exception as e:
-                    logging.error(f"Failed to send to {user_id}: {str(e)}")
-                    
+            # Üzenet küldése minden felhasználónak párhuzamosan
+            await self.broadcast(message, parse_mode='Markdown')
+
         except Exception as e:
             logging.error(f"Unexpected error in startup notification: {str(e)}", exc_info=True)
 
     async def send_shutdown_notification(self):
         """Shutdown értesítés küldése minden engedélyezett felhasználónak"""
         try:
-            self.logger.info("Sending shutdown notifications...")
-            for user_id in self.bot.allowed_users:
-                try:
-                    await self.bot.app.bot.send_message(
-                        chat_id=user_id,
-                        text=self.bot.message_handler.get_message('shutdown_notification')
-                    )
-                    self.logger.debug(f"Shutdown notification sent to {user_id}")
-                except Exception as e:
-                    self.logger.error(f"Failed to send shutdown message to {user_id}: {str(e)}")
+            logger.info("Sending shutdown notifications...")
+            await self.broadcast(self.bot.message_handler.get_message('shutdown_notification'))
             return True
         except Exception as e:
-            self.logger.error(f"Error sending shutdown messages: {str(e)}")
+            logger.error("Error sending shutdown messages: %s", e)
             return False
 
+    async def broadcast(self, text: str, **kwargs) -> int:
+        """Üzenet küldése minden engedélyezett felhasználónak párhuzamosan, a sikeres küldések számával"""
+        users = list(self.bot.allowed_users)
+        results = await asyncio.gather(
+            *(self.bot.app.bot.send_message(chat_id=user_id, text=text, **kwargs) for user_id in users),
+            return_exceptions=True
+        )
+        sent = 0
+        for user_id, result in zip(users, results):
+            if isinstance(result, Exception):
+                logger.error("Failed to send to %s: %s", user_id, result)
+            else:
+                sent += 1
+                logger.debug("Message sent to %s", user_id)
+        return sent
+
     async def start(self):
         """Elindítja az életjel figyelést"""
         self.is_active = True
@@ -116,26 +115,32 @@ class HeartbeatManager:
             logger.info("Életjel üzenetek küldése")
             message = self.bot.message_handler.get_message('heartbeat').format(
                 last_activity=time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.last_activity)))
-            
-            for user_id in self.bot.allowed_users:
-                try:
-                    await self.bot.app.bot.send_message(
-                        chat_id=user_id,
-                        text=message
-                    )
-                    logger.debug(f"Életjel elküldve a felhasználónak: {user_id}")
-                except Exception as e:
-                    logger.error(f"Életjel küldés sikertelen a felhasználónak {user_id}: {str(e)}")
+            await self.broadcast("\n".join([message] + self.endpoint_lines()))
         except Exception as e:
             logger.error(f"Életjel küldési hiba: {str(e)}", exc_info=True)
 
+    def endpoint_lines(self) -> List[str]:
+        """Mért API késleltetések aliasonként az aktív hostra"""
+        lines = []
+        for alias, status in self.bot.endpoint_prober.get_status().items():
+            lines.append(self.bot.message_handler.get_message(
+                'endpoint_latency',
+                alias=alias,
+                host=status['host'],
+                rtt=f"{status['rtt_ms']:.0f}" if status['rtt_ms'] is not None else '-',
+                error_rate=status['error_rate'] * 100,
+                offset=f"{status['offset_ms']:+.0f}" if status['offset_ms'] is not None else '-'
+            ))
+        return lines
+
     def update_activity(self):
         """Frissíti az utolsó tevékenység idejét"""
         self.last_activity = time.time()
         logger.debug(f"Tevékenység frissítve: {self.last_activity}")
 
-    async def stop(self):
+    async def stop(self, notify: bool = True):
         """Szabályosan leállítja az életjel szolgáltatást"""
-        self.is_running = False
-        await self.send_shutdown_notification()
-        self.logger.info("Heartbeat stopped")
\ No newline at end of file
+        self.is_active = False
+        if notify:
+            await self.send_shutdown_notification()
+        logger.info("Heartbeat stopped")
@@ -4,28 +4,29 @@ Fő belépési pont az alkalmazás számára
 
 import asyncio
 import logging
+import signal
 from telegram_bot import TelegramBot
 from utils.config_loader import load_config
-
-# Alap logging konfiguráció
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('bot.log')
-    ]
-)
+from utils.logger import setup_logging, stop_logging
 
 async def main():
     """Fő aszinkron függvény a bot indításához"""
     try:
-        logging.info("Konfiguráció betöltése...")
         config = load_config()
+        # Nem blokkoló, sor alapú naplózás a config.json "logging" szekciója alapján
+        setup_logging(config)
+        logging.info("Konfiguráció betöltve")
         
         logging.info("Bot példányosítása...")
         bot = TelegramBot(config)
         
+        # SIGTERM (deploy, systemd, docker stop) ugyanazt a szabályos leállítást indítja, mint a Ctrl+C
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass
+
         logging.info("Bot indítása...")
         await bot.run()
         
@@ -39,4 +40,6 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         logging.info("Bot leállítás a felhasználó kérésére")
     except Exception as e:
-        logging.error(f"Futás közbeni hiba: {str(e)}", exc_info=True)
\ No newline at end of file
+        logging.error(f"Futás közbeni hiba: {str(e)}", exc_info=True)
+    finally:
+        stop_logging()
\ No newline at end of file
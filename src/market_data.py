@@ -0,0 +1,102 @@
+"""
+Market Data - Shared ticker cache
+Runs one upstream subscription per (exchange, symbol), shared by every consumer
+"""
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+class TickerCache:
+    def __init__(self, exchange_manager, poll_interval: float = 2.0):
+        self.exchange_manager = exchange_manager
+        self.poll_interval = poll_interval
+        self.tickers: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.subscribers: Dict[Tuple[str, str], List[Callable]] = {}
+        self.listeners: List[Callable] = []
+        self.tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    def add_listener(self, callback: Callable):
+        """Registers callback(exchange_name, symbol, ticker) for every ticker update"""
+        self.listeners.append(callback)
+
+    def get(self, exchange_name: str, symbol: str) -> Optional[Dict[str, Any]]:
+        return self.tickers.get((exchange_name, symbol))
+
+    def get_price(self, exchange_name: str, symbol: str) -> Optional[float]:
+        ticker = self.tickers.get((exchange_name, symbol))
+        return ticker.get('last') if ticker else None
+
+    async def fetch_price(self, exchange_name: str, symbol: str) -> Optional[float]:
+        """Cached last price, or a one-off ticker request when the market is not cached"""
+        price = self.get_price(exchange_name, symbol)
+        if price:
+            return price
+        exchange = self.exchange_manager.get_exchange(exchange_name)
+        if not exchange:
+            return None
+        ticker = await exchange.fetch_ticker(symbol)
+        self.update(exchange_name, symbol, ticker)
+        bid, ask = ticker.get('bid'), ticker.get('ask')
+        return ticker.get('last') or ticker.get('close') or ((bid + ask) / 2 if bid and ask else None)
+
+    def subscribe(self, exchange_name: str, symbol: str, callback: Callable):
+        """Adds a subscriber and starts the upstream loop for the market if needed"""
+        key = (exchange_name, symbol)
+        self.subscribers.setdefault(key, []).append(callback)
+        task = self.tasks.get(key)
+        if task is None or task.done():
+            self.tasks[key] = asyncio.create_task(self._run(exchange_name, symbol))
+            logger.debug("Ticker subscription started for %s on %s", symbol, exchange_name)
+
+    def unsubscribe(self, exchange_name: str, symbol: str, callback: Callable):
+        """Removes a subscriber; the upstream loop stops with the last one"""
+        key = (exchange_name, symbol)
+        callbacks = self.subscribers.get(key, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if not callbacks:
+            self.subscribers.pop(key, None)
+            task = self.tasks.pop(key, None)
+            if task:
+                task.cancel()
+            logger.debug("Ticker subscription stopped for %s on %s", symbol, exchange_name)
+
+    def update(self, exchange_name: str, symbol: str, ticker: Dict[str, Any]):
+        """Stores a ticker and fans it out to listeners and subscribers"""
+        key = (exchange_name, symbol)
+        self.tickers[key] = ticker
+        for callback in self.listeners + self.subscribers.get(key, []):
+            try:
+                callback(exchange_name, symbol, ticker)
+            except Exception as e:
+                logger.error("Ticker callback error for %s on %s: %s", symbol, exchange_name, e, exc_info=True)
+
+    async def _run(self, exchange_name: str, symbol: str):
+        """Polls the ticker every poll_interval seconds
+
+        ExchangeManager builds ccxt.async_support clients, which have no ticker
+        streams; the poll is shared by every subscriber of the market.
+        """
+        exchange = self.exchange_manager.get_exchange(exchange_name)
+        if not exchange:
+            logger.warning("Ticker subscription for unknown exchange %s", exchange_name)
+            return
+
+        while True:
+            try:
+                ticker = await exchange.fetch_ticker(symbol)
+                self.update(exchange_name, symbol, ticker)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Ticker poll failed for %s on %s: %s", symbol, exchange_name, e)
+            await asyncio.sleep(self.poll_interval)
+
+    async def stop(self):
+        tasks = list(self.tasks.values())
+        self.tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
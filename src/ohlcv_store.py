@@ -0,0 +1,258 @@
+"""
+OHLCV Store - Candle ring buffers per (exchange, symbol, timeframe)
+History is backfilled once, then kept current from the shared ticker cache.
+Buffers are backed by memory-mapped .npy files, so a restart only fetches the gap;
+the least recently used series are evicted beyond max_series
+"""
+import asyncio
+import logging
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Oszlopok a ccxt fetch_ohlcv sorrendjében
+TIMESTAMP, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+class OHLCVBuffer:
+    """Fixed-size ring buffer of candles stored in a (capacity, 6) float64 array
+
+    The backing array may be a memmap; rows with a zero timestamp are empty.
+    """
+
+    def __init__(self, timeframe_ms: int, capacity: int = 1000, data: np.ndarray = None):
+        self.timeframe_ms = timeframe_ms
+        if data is None:
+            data = np.zeros((capacity, 6), dtype=np.float64)
+        self.data = data
+        self.capacity = len(data)
+        # Fej és darabszám visszaállítása egy meglévő (pl. memmap) tömbből
+        filled = data[:, TIMESTAMP] > 0
+        self.count = int(filled.sum())
+        self.head = (int(np.argmax(data[:, TIMESTAMP])) + 1) % self.capacity if self.count else 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        if not self.count:
+            return None
+        return int(self.data[(self.head - 1) % self.capacity, TIMESTAMP])
+
+    def append(self, candle: List[float]):
+        """Adds a closed or forming candle; a candle with the last timestamp replaces it"""
+        last = self.last_timestamp
+        if last is not None and candle[TIMESTAMP] < last:
+            return
+        if last is not None and candle[TIMESTAMP] == last:
+            self.data[(self.head - 1) % self.capacity] = candle
+            return
+        self.data[self.head] = candle
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def clear(self):
+        self.data[:] = 0
+        self.head = 0
+        self.count = 0
+
+    def extend(self, candles: List[List[float]]):
+        for candle in candles:
+            self.append(candle)
+
+    def update_price(self, timestamp: int, price: float, volume: float = 0.0):
+        """Folds a trade or ticker price into the candle of its period"""
+        bucket = timestamp - timestamp % self.timeframe_ms
+        last = self.last_timestamp
+        if last is not None and bucket < last:
+            return
+        if last == bucket:
+            row = self.data[(self.head - 1) % self.capacity]
+            row[HIGH] = max(row[HIGH], price)
+            row[LOW] = min(row[LOW], price)
+            row[CLOSE] = price
+            row[VOLUME] += volume
+        else:
+            self.append([bucket, price, price, price, price, volume])
+
+    def array(self) -> np.ndarray:
+        """Candles in chronological order (a view when the buffer has not wrapped)"""
+        if self.count < self.capacity:
+            return self.data[:self.count]
+        return np.concatenate((self.data[self.head:], self.data[:self.head]))
+
+    def sma(self, period: int) -> Optional[float]:
+        close = self.array()[:, CLOSE]
+        if len(close) < period:
+            return None
+        return float(close[-period:].mean())
+
+    def ema(self, period: int) -> Optional[float]:
+        close = self.array()[:, CLOSE]
+        if len(close) < period:
+            return None
+        return _ewm_last(close, 2 / (period + 1))
+
+    def atr(self, period: int) -> Optional[float]:
+        """Average true range with Wilder smoothing"""
+        candles = self.array()
+        if len(candles) <= period:
+            return None
+        high, low, close = candles[1:, HIGH], candles[1:, LOW], candles[:-1, CLOSE]
+        true_range = np.maximum(high - low, np.maximum(np.abs(high - close), np.abs(low - close)))
+        return _ewm_last(true_range, 1 / period)
+
+    def flush(self):
+        if isinstance(self.data, np.memmap):
+            self.data.flush()
+
+def _ewm_last(values: np.ndarray, alpha: float) -> float:
+    """Last value of an exponentially weighted mean, computed as one weighted sum
+
+    Weights older than the window are below 1e-9 and are dropped, which also
+    keeps the powers of (1 - alpha) inside float range.
+    """
+    decay = 1 - alpha
+    window = len(values) if decay <= 0 else min(len(values), int(np.log(1e-9) / np.log(decay)) + 1)
+    weights = decay ** np.arange(window - 1, -1, -1, dtype=np.float64)
+    recent = values[-window:]
+    return float(np.dot(weights, recent) / weights.sum())
+
+class OHLCVStore:
+    def __init__(self, exchange_manager, ticker_cache, data_dir: str = 'data', capacity: int = 1000,
+                 max_series: int = 64):
+        self.exchange_manager = exchange_manager
+        self.ticker_cache = ticker_cache
+        self.data_dir = Path(data_dir) / 'ohlcv'
+        self.capacity = capacity
+        self.max_series = max_series
+        # LRU sorrend: a legrégebben használt sorozat áll elöl
+        self.buffers: Dict[Tuple[str, str, str], OHLCVBuffer] = OrderedDict()
+        self._loading: Dict[Tuple[str, str, str], asyncio.Task] = {}
+
+    def _snapshot_path(self, exchange_name: str, symbol: str, timeframe: str) -> Path:
+        safe_symbol = re.sub(r'[^A-Za-z0-9]+', '_', symbol)
+        return self.data_dir / f"{exchange_name}_{safe_symbol}_{timeframe}.npy"
+
+    def _open_buffer(self, exchange_name: str, symbol: str, timeframe: str, timeframe_ms: int) -> OHLCVBuffer:
+        path = self._snapshot_path(exchange_name, symbol, timeframe)
+        try:
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+            if path.exists():
+                data = np.load(path, mmap_mode='r+')
+                if data.shape == (self.capacity, 6):
+                    return OHLCVBuffer(timeframe_ms, data=data)
+                logger.info("Snapshot %s has a different capacity, rebuilding", path)
+                del data
+            data = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(self.capacity, 6))
+            return OHLCVBuffer(timeframe_ms, data=data)
+        except OSError as e:
+            logger.warning("Cannot use snapshot %s, keeping candles in memory: %s", path, e)
+            return OHLCVBuffer(timeframe_ms, self.capacity)
+
+    async def get_buffer(self, exchange_name: str, symbol: str, timeframe: str) -> OHLCVBuffer:
+        """Returns the buffer of a market, backfilling it on first use"""
+        key = (exchange_name, symbol, timeframe)
+        buffer = self.buffers.get(key)
+        if buffer is not None:
+            self.buffers.move_to_end(key)
+            return buffer
+
+        # Párhuzamos kérések ugyanarra a piacra egyetlen letöltésen osztoznak
+        task = self._loading.get(key)
+        if task is None:
+            task = self._loading[key] = asyncio.create_task(self._load(exchange_name, symbol, timeframe))
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._loading.pop(key, None)
+
+    async def _load(self, exchange_name: str, symbol: str, timeframe: str) -> OHLCVBuffer:
+        exchange = self.exchange_manager.get_exchange(exchange_name)
+        if not exchange:
+            raise ValueError(self.exchange_manager.message_handler.get_message(
+                'exchange_not_found', name=exchange_name
+            ))
+        timeframe_ms = exchange.parse_timeframe(timeframe) * 1000
+        buffer = self._open_buffer(exchange_name, symbol, timeframe, timeframe_ms)
+
+        # Csak a snapshot óta hiányzó gyertyák letöltése; a buffernél régebbi snapshot nem ér semmit
+        now = exchange.milliseconds()
+        current = now - now % timeframe_ms
+        since = buffer.last_timestamp
+        if since is not None and (current - since) // timeframe_ms >= self.capacity:
+            logger.info("OHLCV snapshot of %s %s %s is older than the buffer, refetching",
+                        exchange_name, symbol, timeframe)
+            buffer.clear()
+            since = None
+        if since is None:
+            since = current - (self.capacity - 1) * timeframe_ms
+
+        # A tőzsdék kérésenként korlátozzák a gyertyák számát, ezért lapozunk az aktuális gyertyáig
+        loaded = 0
+        while True:
+            limit = int(max(1, min(self.capacity, (current - since) // timeframe_ms + 1)))
+            candles = [c for c in await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+                       if c[TIMESTAMP] >= since]
+            if not candles:
+                break
+            buffer.extend(candles)
+            loaded += len(candles)
+            if candles[-1][TIMESTAMP] >= current:
+                break
+            since = int(candles[-1][TIMESTAMP]) + timeframe_ms
+        buffer.flush()
+        logger.info("OHLCV %s %s %s: %s candles loaded, %s in buffer",
+                    exchange_name, symbol, timeframe, loaded, len(buffer))
+
+        self.buffers[(exchange_name, symbol, timeframe)] = buffer
+        if not any(k[:2] == (exchange_name, symbol) for k in self.buffers if k[2] != timeframe):
+            self.ticker_cache.subscribe(exchange_name, symbol, self.on_ticker)
+        while len(self.buffers) > self.max_series:
+            self._evict(next(iter(self.buffers)))
+        return buffer
+
+    def _evict(self, key: Tuple[str, str, str]):
+        """Drops a series; its snapshot stays on disk and the ticker stops with the market's last series"""
+        buffer = self.buffers.pop(key)
+        buffer.flush()
+        exchange_name, symbol, timeframe = key
+        if not any(k[:2] == (exchange_name, symbol) for k in self.buffers):
+            self.ticker_cache.unsubscribe(exchange_name, symbol, self.on_ticker)
+        logger.debug("OHLCV series %s %s %s evicted", exchange_name, symbol, timeframe)
+
+    def on_ticker(self, exchange_name: str, symbol: str, ticker: Dict[str, Any]):
+        """Keeps the forming candle of every timeframe current
+
+        Ticker volume is a rolling 24h figure, so it is not folded into candles.
+        """
+        price = ticker.get('last')
+        timestamp = ticker.get('timestamp')
+        if price is None or timestamp is None:
+            return
+        for (buffer_exchange, buffer_symbol, _), buffer in self.buffers.items():
+            if buffer_exchange == exchange_name and buffer_symbol == symbol:
+                buffer.update_price(timestamp, price)
+
+    async def indicator(self, exchange_name: str, symbol: str, timeframe: str, name: str,
+                        period: int) -> Optional[float]:
+        """Computes sma, ema or atr over the buffered candles"""
+        if name not in ('sma', 'ema', 'atr'):
+            raise ValueError(f"Unknown indicator: {name}")
+        buffer = await self.get_buffer(exchange_name, symbol, timeframe)
+        return getattr(buffer, name)(period)
+
+    def flush(self):
+        """Writes every memory-mapped buffer back to disk"""
+        for buffer in self.buffers.values():
+            buffer.flush()
+
+    def stop(self):
+        for exchange_name, symbol in {key[:2] for key in self.buffers}:
+            self.ticker_cache.unsubscribe(exchange_name, symbol, self.on_ticker)
+        self.flush()
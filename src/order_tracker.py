@@ -0,0 +1,232 @@
+"""
+Order Tracker - Order lifecycle state machine
+Follows orders by batched polling, one request per alias where the exchange allows it
+"""
+import asyncio
+import logging
+import time
+import ccxt.async_support as ccxt
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+NEW = 'new'
+PARTIALLY_FILLED = 'partially_filled'
+FILLED = 'filled'
+CANCELED = 'canceled'
+REJECTED = 'rejected'
+
+TERMINAL_STATES = (FILLED, CANCELED, REJECTED)
+
+class OrderNotFilledError(Exception):
+    """Raised by wait_for_fill when an order ends canceled or rejected"""
+
+    def __init__(self, tracked: 'TrackedOrder'):
+        super().__init__(f"Order {tracked.order_id} on {tracked.exchange_name} ended as {tracked.state}")
+        self.tracked = tracked
+
+def order_state(order: Dict[str, Any]) -> str:
+    """Maps a unified ccxt order to a lifecycle state"""
+    status = order.get('status')
+    filled = order.get('filled') or 0
+    if status == 'closed':
+        return FILLED
+    if status in ('canceled', 'expired'):
+        return CANCELED
+    if status == 'rejected':
+        return REJECTED
+    return PARTIALLY_FILLED if filled > 0 else NEW
+
+class TrackedOrder:
+    __slots__ = ('exchange_name', 'order', 'state', 'tags', 'waiters')
+
+    def __init__(self, exchange_name: str, order: Dict[str, Any], tags: Dict[str, Any]):
+        self.exchange_name = exchange_name
+        self.order = order
+        self.state = order_state(order)
+        self.tags = tags
+        self.waiters: List[asyncio.Future] = []
+
+    @property
+    def order_id(self) -> str:
+        return self.order['id']
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.state in TERMINAL_STATES
+
+class OrderTracker:
+    def __init__(self, exchange_manager, poll_interval: float = 2.0):
+        self.exchange_manager = exchange_manager
+        self.poll_interval = poll_interval
+        self.orders: Dict[Tuple[str, str], TrackedOrder] = {}
+        self.open_orders: Dict[str, Dict[str, TrackedOrder]] = {}  # {exchange_name: {order_id: tracked}}
+        self.listeners: List[Callable] = []
+        self.symbol_required = set()  # aliasok, ahol a lekérdezéshez kötelező a symbol
+        self.is_active = False
+        self._wakeup = asyncio.Event()
+        self._listener_tasks = set()
+
+    def add_listener(self, callback: Callable):
+        """Registers callback(tracked, previous_state), called on every state transition"""
+        self.listeners.append(callback)
+
+    def track(self, exchange_name: str, order: Dict[str, Any], notify: bool = True, **tags) -> TrackedOrder:
+        """Starts following an order returned by create_order
+
+        An order that is already (partially) filled or closed when placed, such as
+        an immediate market fill, is reported to listeners as a transition from new.
+        notify=False skips that, e.g. for orders restored from a snapshot.
+        """
+        key = (exchange_name, order['id'])
+        tracked = self.orders.get(key)
+        if tracked:
+            tracked.tags.update(tags)
+            self.on_order_update(exchange_name, order)
+            return tracked
+
+        tracked = TrackedOrder(exchange_name, order, tags)
+        self.orders[key] = tracked
+        if not tracked.is_terminal:
+            self.open_orders.setdefault(exchange_name, {})[tracked.order_id] = tracked
+            self._wakeup.set()
+        logger.debug("Tracking order %s on %s (%s)", tracked.order_id, exchange_name, tracked.state)
+        if notify and tracked.state != NEW:
+            self._notify(tracked, NEW)
+        return tracked
+
+    def get(self, exchange_name: str, order_id: str) -> Optional[TrackedOrder]:
+        return self.orders.get((exchange_name, order_id))
+
+    def on_order_update(self, exchange_name: str, order: Dict[str, Any]):
+        """Applies an order snapshot from a poll result or an exchange response"""
+        tracked = self.orders.get((exchange_name, order.get('id')))
+        if not tracked or tracked.is_terminal:
+            return
+
+        previous_state = tracked.state
+        previous_filled = tracked.order.get('filled') or 0
+        tracked.order = order
+        tracked.state = order_state(order)
+        if tracked.state == previous_state and (order.get('filled') or 0) == previous_filled:
+            return
+
+        logger.info("Order %s on %s: %s -> %s", tracked.order_id, exchange_name, previous_state, tracked.state)
+        if tracked.is_terminal:
+            self.open_orders.get(exchange_name, {}).pop(tracked.order_id, None)
+            for waiter in tracked.waiters:
+                if not waiter.done():
+                    waiter.set_result(tracked)
+            tracked.waiters.clear()
+        self._notify(tracked, previous_state)
+
+    def _notify(self, tracked: TrackedOrder, previous_state: str):
+        for callback in self.listeners:
+            try:
+                result = callback(tracked, previous_state)
+                if asyncio.iscoroutine(result):
+                    task = asyncio.create_task(result)
+                    self._listener_tasks.add(task)
+                    task.add_done_callback(self._listener_tasks.discard)
+            except Exception as e:
+                logger.error("Order listener error: %s", e, exc_info=True)
+
+    async def wait_for(self, exchange_name: str, order_id: str, timeout: float = None) -> TrackedOrder:
+        """Waits until the order reaches a terminal state; raises asyncio.TimeoutError on timeout"""
+        tracked = self.orders.get((exchange_name, order_id))
+        if not tracked:
+            raise KeyError(f"Order {order_id} on {exchange_name} is not tracked")
+        if tracked.is_terminal:
+            return tracked
+
+        waiter = asyncio.get_running_loop().create_future()
+        tracked.waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        finally:
+            if waiter in tracked.waiters:
+                tracked.waiters.remove(waiter)
+
+    async def wait_for_fill(self, exchange_name: str, order_id: str, timeout: float = None) -> Dict[str, Any]:
+        """Returns the filled order, raises OrderNotFilledError if it was canceled or rejected"""
+        tracked = await self.wait_for(exchange_name, order_id, timeout)
+        if tracked.state != FILLED:
+            raise OrderNotFilledError(tracked)
+        return tracked.order
+
+    async def start(self):
+        """Follows open orders until stopped"""
+        self.is_active = True
+        logger.info("Order tracker started")
+        try:
+            while self.is_active:
+                self._wakeup.clear()
+                try:
+                    await self.poll_once()
+                except Exception as e:
+                    logger.error("Order tracker poll error: %s", e, exc_info=True)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            logger.info("Order tracker stop requested")
+        finally:
+            self.is_active = False
+
+    def stop(self):
+        self.is_active = False
+        self._wakeup.set()
+
+    async def poll_once(self):
+        """Polls every alias with open orders
+
+        ExchangeManager builds ccxt.async_support clients, which have no order
+        streams, so polling is the only update source.
+        """
+        polls = []
+        for exchange_name, open_orders in list(self.open_orders.items()):
+            if not open_orders:
+                continue
+            exchange = self.exchange_manager.get_exchange(exchange_name)
+            if not exchange:
+                continue
+            polls.append(self._poll_exchange(exchange_name, exchange, list(open_orders.values())))
+        if polls:
+            await asyncio.gather(*polls)
+
+    async def _poll_exchange(self, exchange_name: str, exchange, tracked_orders: List[TrackedOrder]):
+        since = min(t.order.get('timestamp') or int(time.time() * 1000) for t in tracked_orders)
+        symbols = sorted({t.order['symbol'] for t in tracked_orders})
+        try:
+            fetch_all = bool(exchange.has.get('fetchOrders'))
+            orders = await self._fetch_batch(exchange_name, exchange, fetch_all, since, symbols)
+        except Exception as e:
+            logger.warning("Order poll failed for %s: %s", exchange_name, e)
+            return
+
+        seen = set()
+        for order in orders:
+            seen.add(order.get('id'))
+            self.on_order_update(exchange_name, order)
+
+        # Ami eltűnt a nyitott listából, azt egyenként kérdezzük le a végállapotért
+        missing = [t for t in tracked_orders if t.order_id not in seen and not t.is_terminal]
+        for tracked in missing:
+            try:
+                order = await exchange.fetch_order(tracked.order_id, tracked.order['symbol'])
+                self.on_order_update(exchange_name, order)
+            except Exception as e:
+                logger.warning("Could not refresh order %s on %s: %s", tracked.order_id, exchange_name, e)
+
+    async def _fetch_batch(self, exchange_name: str, exchange, fetch_all: bool, since: int,
+                           symbols: List[str]) -> List[Dict[str, Any]]:
+        """One request per alias, or one per symbol where the exchange insists on a symbol"""
+        method = exchange.fetch_orders if fetch_all else exchange.fetch_open_orders
+        if exchange_name not in self.symbol_required:
+            try:
+                return await method(None, since)
+            except ccxt.ArgumentsRequired:
+                self.symbol_required.add(exchange_name)
+        batches = await asyncio.gather(*(method(symbol, since) for symbol in symbols))
+        return [order for batch in batches for order in batch]
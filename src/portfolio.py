@@ -0,0 +1,136 @@
+"""
+Portfolio - Cross-exchange valuation
+Balances and tickers of every alias are fetched concurrently; the valuation
+itself is a handful of NumPy operations regardless of the number of assets
+"""
+import asyncio
+import logging
+from typing import Dict, Any, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class PortfolioValuator:
+    def __init__(self, exchange_manager, ticker_cache, position_manager, quote_currency: str = 'USDT'):
+        self.exchange_manager = exchange_manager
+        self.ticker_cache = ticker_cache
+        self.position_manager = position_manager
+        self.quote_currency = quote_currency
+
+    async def _fetch_alias(self, exchange_name: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Balance and tickers of one alias, requested in parallel"""
+        exchange = self.exchange_manager.get_exchange(exchange_name)
+        cached = {
+            symbol: ticker for (name, symbol), ticker in self.ticker_cache.tickers.items()
+            if name == exchange_name
+        }
+        if exchange.has.get('fetchTickers'):
+            # Egyetlen fetch_tickers kérés, a balance lekéréssel párhuzamosan
+            balance, tickers = await asyncio.gather(exchange.fetch_balance(), exchange.fetch_tickers())
+            cached.update(tickers)
+        else:
+            balance = await exchange.fetch_balance()
+        return balance, cached
+
+    async def snapshot(self) -> Dict[str, Any]:
+        """Totals, per-alias and per-asset breakdowns and unrealized PnL in the quote currency"""
+        aliases = list(self.exchange_manager.exchanges.keys()) + [
+            f"{alias}:{mode}" for alias, mode in self.exchange_manager.mode_clients
+        ]
+        results = await asyncio.gather(*(self._fetch_alias(name) for name in aliases), return_exceptions=True)
+
+        alias_idx, assets, amounts, prices = [], [], [], []
+        errors = {}
+        price_maps = {}
+        for i, (exchange_name, result) in enumerate(zip(aliases, results)):
+            if isinstance(result, BaseException):
+                logger.warning("Portfolio: %s unavailable: %s", exchange_name, result)
+                errors[exchange_name] = str(result)
+                continue
+            balance, tickers = result
+            price_maps[exchange_name] = price_map = self._price_map(tickers)
+            for asset, amount in (balance.get('total') or {}).items():
+                if not amount:
+                    continue
+                alias_idx.append(i)
+                assets.append(asset)
+                amounts.append(amount)
+                prices.append(price_map.get(asset, np.nan))
+
+        alias_idx = np.asarray(alias_idx, dtype=np.intp)
+        values = np.asarray(amounts, dtype=np.float64) * np.asarray(prices, dtype=np.float64)
+        priced = ~np.isnan(values)
+        values = np.where(priced, values, 0.0)
+
+        alias_totals = np.bincount(alias_idx, weights=values, minlength=len(aliases))
+        asset_names, asset_idx = np.unique(np.asarray(assets, dtype=object).astype(str), return_inverse=True)
+        asset_totals = np.bincount(asset_idx, weights=values, minlength=len(asset_names))
+        asset_amounts = np.bincount(asset_idx, weights=np.asarray(amounts, dtype=np.float64),
+                                    minlength=len(asset_names))
+        order = np.argsort(-asset_totals)
+
+        return {
+            'quote': self.quote_currency,
+            'total': float(values.sum()),
+            'aliases': {
+                name: float(alias_totals[i]) for i, name in enumerate(aliases) if name not in errors
+            },
+            'assets': [
+                {'asset': str(asset_names[j]), 'amount': float(asset_amounts[j]), 'value': float(asset_totals[j])}
+                for j in order
+            ],
+            'unpriced': sorted({assets[k] for k in np.flatnonzero(~priced)}),
+            'unrealized_pnl': self._unrealized_pnl(price_maps),
+            'errors': errors
+        }
+
+    def _price_map(self, tickers: Dict[str, Any]) -> Dict[str, float]:
+        """Asset -> price in the quote currency from direct, inverse or one-hop cross pairs"""
+        quote = self.quote_currency
+        prices = {quote: 1.0}
+        pairs = []
+        for symbol, ticker in tickers.items():
+            last = ticker.get('last') if ticker else None
+            if not last or '/' not in symbol:
+                continue
+            base, symbol_quote = symbol.split('/')
+            pairs.append((base, symbol_quote.split(':')[0], last))
+
+        for base, symbol_quote, last in pairs:
+            if symbol_quote == quote:
+                prices.setdefault(base, last)
+            elif base == quote:
+                prices.setdefault(symbol_quote, 1 / last)
+        # Kereszt árfolyam egy közvetítő eszközön át (pl. ETH/BTC * BTC/USDT)
+        for base, symbol_quote, last in pairs:
+            if base not in prices and symbol_quote in prices:
+                prices[base] = last * prices[symbol_quote]
+        return prices
+
+    def _unrealized_pnl(self, price_maps: Dict[str, Dict[str, float]]) -> float:
+        """Mark-to-market PnL of the tracked positions, converted to the quote currency"""
+        entries, marks, quantities, conversions = [], [], [], []
+        for exchange_name, positions in self.position_manager.positions.items():
+            price_map = price_maps.get(exchange_name)
+            if not price_map:
+                continue
+            for position in positions.values():
+                symbol = position.get('symbol') or ''
+                if '/' not in symbol:
+                    continue
+                base, symbol_quote = symbol.split('/')
+                symbol_quote = symbol_quote.split(':')[0]
+                base_price = price_map.get(base)
+                quote_price = price_map.get(symbol_quote)
+                entry = position.get('average') or position.get('price')
+                quantity = position.get('filled') or 0
+                if not (base_price and quote_price and entry and quantity):
+                    continue
+                entries.append(entry)
+                marks.append(base_price / quote_price)
+                quantities.append(quantity if position.get('side') == 'buy' else -quantity)
+                conversions.append(quote_price)
+        if not entries:
+            return 0.0
+        entries, marks = np.asarray(entries), np.asarray(marks)
+        return float(np.sum((marks - entries) * np.asarray(quantities) * np.asarray(conversions)))
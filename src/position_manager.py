@@ -2,21 +2,45 @@
 Position Manager - Tracks open positions
 Manages both regular and trailing stop positions
 """
-from typing import List, Dict, Any, Optional
+import logging
+from typing import List, Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
 
 class PositionManager:
     def __init__(self):
         self.positions = {}  # {exchange_name: {order_id: order}}
         self.trailing_stops = {}  # {exchange_name: {order_id: trail_percent}}
+        self.listeners: List[Callable] = []
+
+    def add_listener(self, callback: Callable):
+        """Registers callback(exchange_name, order, closed) for every opened, updated and closed position"""
+        self.listeners.append(callback)
+
+    def _notify(self, exchange_name: str, order: Dict[str, Any], closed: bool = False):
+        for callback in self.listeners:
+            try:
+                callback(exchange_name, order, closed)
+            except Exception as e:
+                logger.error("Position listener error: %s", e, exc_info=True)
 
-    def add_position(self, exchange_name: str, order: Dict[str, Any]):
+    def add_position(self, exchange_name: str, order: Dict[str, Any], notify: bool = True):
+        """Stores a position; notify=False skips the listeners, e.g. for positions restored from a snapshot"""
         if exchange_name not in self.positions:
             self.positions[exchange_name] = {}
         self.positions[exchange_name][order['id']] = order
+        if notify:
+            self._notify(exchange_name, order)
+
+    def update_position(self, exchange_name: str, order: Dict[str, Any]):
+        if exchange_name in self.positions and order['id'] in self.positions[exchange_name]:
+            self.positions[exchange_name][order['id']] = order
+            self._notify(exchange_name, order)
 
     def remove_position(self, exchange_name: str, order_id: str):
         if exchange_name in self.positions and order_id in self.positions[exchange_name]:
-            del self.positions[exchange_name][order_id]
+            order = self.positions[exchange_name].pop(order_id)
+            self._notify(exchange_name, order, closed=True)
         if exchange_name in self.trailing_stops and order_id in self.trailing_stops[exchange_name]:
             del self.trailing_stops[exchange_name][order_id]
 
@@ -25,6 +49,22 @@ class PositionManager:
             return list(self.positions.get(exchange_name, {}).values())
         return [pos for exchange in self.positions.values() for pos in exchange.values()]
 
+    def get_summaries(self, exchange_name: str = None) -> List[Dict[str, Any]]:
+        """Slim position records for display, without the raw exchange payload"""
+        names = [exchange_name] if exchange_name else list(self.positions)
+        return [
+            {
+                'exchange': name,
+                'id': order['id'],
+                'symbol': order.get('symbol'),
+                'side': order.get('side'),
+                'amount': order.get('filled') or order.get('amount'),
+                'entry': order.get('average') or order.get('price'),
+                'status': order.get('status')
+            }
+            for name in names for order in self.positions.get(name, {}).values()
+        ]
+
     def set_trailing_stop(self, exchange_name: str, position_id: str, trailing_percent: float):
         if exchange_name not in self.trailing_stops:
             self.trailing_stops[exchange_name] = {}
@@ -0,0 +1,265 @@
+"""
+Risk Manager - Pre-trade risk checks
+Checks orders in memory against incrementally maintained exposure and loss limits
+"""
+import logging
+import time
+from typing import Dict, Any, Awaitable, Callable, Optional, Set, Tuple
+from order_tracker import TrackedOrder, TERMINAL_STATES
+
+logger = logging.getLogger(__name__)
+
+class RiskLimitExceeded(ValueError):
+    """Raised when an order would breach a configured risk limit"""
+
+    def __init__(self, limit: str, value: float, maximum: float):
+        super().__init__(f"{limit}: {value:.2f} > {maximum:.2f}")
+        self.limit = limit
+        self.value = value
+        self.maximum = maximum
+
+class Reservation:
+    """Exposure reserved for an order between the risk check and its submission"""
+    __slots__ = ('key', 'side', 'amount', 'filled')
+
+    def __init__(self, key: Tuple[str, str], side: str, amount: float):
+        self.key = key
+        self.side = side
+        self.amount = amount
+        self.filled = 0.0
+
+class RiskManager:
+    def __init__(self, config: Dict[str, Any] = None,
+                 price_source: Callable[[str, str], Awaitable[Optional[float]]] = None):
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.max_order_notional = config.get('max_order_notional')
+        self.max_symbol_exposure = config.get('max_symbol_exposure')
+        self.max_alias_exposure = config.get('max_alias_exposure')
+        self.max_daily_loss = config.get('max_daily_loss')
+        self.allow_unpriced_orders = config.get('allow_unpriced_orders', False)
+        # price_source(exchange_name, symbol): referenciaár market orderekhez, ha nincs gyorsítótárazott ár
+        self.price_source = price_source
+
+        # Minden állapot (alias, symbol) kulcson, a fill-ekből inkrementálisan frissítve
+        self.net_qty: Dict[Tuple[str, str], float] = {}
+        self.avg_price: Dict[Tuple[str, str], float] = {}
+        self.pending_buy: Dict[Tuple[str, str], float] = {}
+        self.pending_sell: Dict[Tuple[str, str], float] = {}
+        self.last_price: Dict[Tuple[str, str], float] = {}
+        self.symbol_exposure: Dict[Tuple[str, str], float] = {}
+        self.alias_exposure: Dict[str, float] = {}  # alapalias szerint, minden módot összesítve
+        self.reservations: Dict[Tuple[str, str], Reservation] = {}  # {(exchange_name, order_id): reservation}
+        self.applied_orders: Set[Tuple[str, str]] = set()  # orderek, amelyek fill-jei már könyvelve vannak
+        self.realized_pnl = 0.0
+        self._day = self._today()
+
+    @staticmethod
+    def _today() -> int:
+        return int(time.time() // 86400)
+
+    def _roll_day(self):
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self.realized_pnl = 0.0
+
+    @staticmethod
+    def _alias(exchange_name: str) -> str:
+        """Base alias of an 'alias:mode' client; the alias limit covers all of its modes"""
+        return exchange_name.partition(':')[0]
+
+    def _exposure_qty(self, key: Tuple[str, str], buy: float = 0.0, sell: float = 0.0) -> float:
+        """Worst-case position size if every pending order on one side fills"""
+        net = self.net_qty.get(key, 0.0)
+        return max(
+            abs(net + self.pending_buy.get(key, 0.0) + buy),
+            abs(net - self.pending_sell.get(key, 0.0) - sell)
+        )
+
+    def _refresh(self, key: Tuple[str, str]):
+        price = self.last_price.get(key, 0.0)
+        exposure = self._exposure_qty(key) * price
+        previous = self.symbol_exposure.get(key, 0.0)
+        self.symbol_exposure[key] = exposure
+        alias = self._alias(key[0])
+        self.alias_exposure[alias] = self.alias_exposure.get(alias, 0.0) + exposure - previous
+
+    def update_price(self, exchange_name: str, symbol: str, price: float):
+        """Feeds a reference price (fill, ticker) used to value market orders and exposure"""
+        key = (exchange_name, symbol)
+        self.last_price[key] = price
+        self._refresh(key)
+
+    def on_ticker(self, exchange_name: str, symbol: str, ticker: Dict[str, Any]):
+        """Ticker cache listener keeping reference prices current"""
+        if ticker.get('last'):
+            self.update_price(exchange_name, symbol, ticker['last'])
+
+    async def check(self, exchange_name: str, symbol: str, side: str, amount: float,
+                    price: float = None) -> Optional[Reservation]:
+        """check_order() after looking up a reference price for market orders on unpriced symbols"""
+        key = (exchange_name, symbol)
+        if self.enabled and not price and key not in self.last_price and self.price_source is not None:
+            try:
+                reference = await self.price_source(exchange_name, symbol)
+            except Exception as e:
+                logger.warning("Reference price lookup for %s on %s failed: %s", symbol, exchange_name, e)
+                reference = None
+            if reference:
+                self.update_price(exchange_name, symbol, reference)
+        return self.check_order(exchange_name, symbol, side, amount, price)
+
+    def check_order(self, exchange_name: str, symbol: str, side: str, amount: float,
+                    price: float = None) -> Optional[Reservation]:
+        """Checks an order against all limits and reserves its exposure
+
+        Raises RiskLimitExceeded on a breach. The returned reservation must be
+        passed to attach() once the order is placed, or release() if it fails.
+        """
+        if not self.enabled:
+            return None
+
+        self._roll_day()
+        key = (exchange_name, symbol)
+        reference = price or self.last_price.get(key)
+        buy, sell = (amount, 0.0) if side == 'buy' else (0.0, amount)
+        increases = self._exposure_qty(key, buy, sell) > self._exposure_qty(key)
+
+        if increases and self.max_daily_loss is not None and -self.realized_pnl >= self.max_daily_loss:
+            raise RiskLimitExceeded('max_daily_loss', -self.realized_pnl, self.max_daily_loss)
+
+        if reference is None:
+            if not self.allow_unpriced_orders:
+                raise RiskLimitExceeded('reference_price', 0.0, 0.0)
+            logger.warning("No reference price for %s on %s, notional checks skipped", symbol, exchange_name)
+        else:
+            notional = amount * reference
+            if self.max_order_notional is not None and notional > self.max_order_notional:
+                raise RiskLimitExceeded('max_order_notional', notional, self.max_order_notional)
+
+            if increases:
+                symbol_exposure = self._exposure_qty(key, buy, sell) * reference
+                if self.max_symbol_exposure is not None and symbol_exposure > self.max_symbol_exposure:
+                    raise RiskLimitExceeded('max_symbol_exposure', symbol_exposure, self.max_symbol_exposure)
+
+                alias_exposure = (self.alias_exposure.get(self._alias(exchange_name), 0.0)
+                                  - self.symbol_exposure.get(key, 0.0) + symbol_exposure)
+                if self.max_alias_exposure is not None and alias_exposure > self.max_alias_exposure:
+                    raise RiskLimitExceeded('max_alias_exposure', alias_exposure, self.max_alias_exposure)
+
+        if price and key not in self.last_price:
+            self.last_price[key] = price
+        reservation = Reservation(key, side, amount)
+        self._add_pending(reservation, amount)
+        return reservation
+
+    def _add_pending(self, reservation: Reservation, amount: float):
+        pending = self.pending_buy if reservation.side == 'buy' else self.pending_sell
+        pending[reservation.key] = max(pending.get(reservation.key, 0.0) + amount, 0.0)
+        self._refresh(reservation.key)
+
+    def release(self, reservation: Optional[Reservation]):
+        """Returns the unfilled part of a reservation"""
+        if reservation is None:
+            return
+        self._add_pending(reservation, -(reservation.amount - reservation.filled))
+        reservation.amount = reservation.filled
+
+    def attach(self, reservation: Optional[Reservation], exchange_name: str, order: Dict[str, Any]):
+        """Binds a reservation to the placed order and applies its initial fill"""
+        if reservation is None:
+            return
+        order_key = (exchange_name, order['id'])
+        if order_key in self.reservations or order_key in self.applied_orders:
+            # Deduplikált beküldés: az eredeti foglalás követi vagy már lekönyvelte az ordert
+            self.release(reservation)
+            return
+        self.applied_orders.add(order_key)
+        self.reservations[order_key] = reservation
+        self._apply(order_key, order, order.get('status') in ('closed', 'canceled', 'expired', 'rejected'))
+
+    def on_order_update(self, tracked: TrackedOrder, previous_state: str):
+        """Order tracker listener applying fill deltas incrementally"""
+        order_key = (tracked.exchange_name, tracked.order_id)
+        if order_key in self.reservations:
+            self._apply(order_key, tracked.order, tracked.state in TERMINAL_STATES)
+
+    def _apply(self, order_key: Tuple[str, str], order: Dict[str, Any], terminal: bool):
+        reservation = self.reservations[order_key]
+        filled = order.get('filled') or 0.0
+        delta = filled - reservation.filled
+        if delta > 0:
+            fill_price = order.get('average') or order.get('price')
+            reservation.filled = filled
+            self._add_pending(reservation, -delta)
+            if fill_price:
+                self._apply_fill(reservation.key, delta if reservation.side == 'buy' else -delta, fill_price)
+        if terminal:
+            self.release(reservation)
+            del self.reservations[order_key]
+
+    def _apply_fill(self, key: Tuple[str, str], qty: float, price: float):
+        self._roll_day()
+        net = self.net_qty.get(key, 0.0)
+        avg = self.avg_price.get(key, 0.0)
+        if net == 0 or (net > 0) == (qty > 0):
+            avg = (avg * abs(net) + price * abs(qty)) / (abs(net) + abs(qty))
+        else:
+            closed = min(abs(qty), abs(net))
+            self.realized_pnl += (price - avg) * closed * (1 if net > 0 else -1)
+            if abs(qty) > abs(net):
+                avg = price
+        net += qty
+        self.net_qty[key] = net
+        self.avg_price[key] = avg if net else 0.0
+        self.last_price[key] = price
+        self._refresh(key)
+
+    def export_state(self) -> Dict[str, Any]:
+        """Net positions, open reservations and daily loss carried over a restart"""
+        return {
+            'day': self._day,
+            'realized_pnl': self.realized_pnl,
+            'positions': [
+                [alias, symbol, qty, self.avg_price.get((alias, symbol), 0.0), self.last_price.get((alias, symbol))]
+                for (alias, symbol), qty in self.net_qty.items() if qty
+            ],
+            'reservations': [
+                [exchange_name, order_id, r.key[1], r.side, r.amount, r.filled]
+                for (exchange_name, order_id), r in self.reservations.items()
+            ]
+        }
+
+    def restore_state(self, state: Dict[str, Any]):
+        """Rebuilds exposures from a snapshot; call before open orders are tracked again"""
+        if state.get('day') == self._today():
+            self._day = state['day']
+            self.realized_pnl = state.get('realized_pnl', 0.0)
+
+        keys = set()
+        for alias, symbol, qty, avg, price in state.get('positions', []):
+            key = (alias, symbol)
+            self.net_qty[key] = qty
+            self.avg_price[key] = avg
+            if price:
+                self.last_price[key] = price
+            keys.add(key)
+        for exchange_name, order_id, symbol, side, amount, filled in state.get('reservations', []):
+            reservation = Reservation((exchange_name, symbol), side, amount)
+            reservation.filled = filled
+            self.reservations[(exchange_name, order_id)] = reservation
+            self.applied_orders.add((exchange_name, order_id))
+            # A nyitott rész újra függőben lévő kitettség; a közben érkezett fill-eket a tracker könyveli
+            self._add_pending(reservation, amount - filled)
+            keys.add(reservation.key)
+        for key in keys:
+            self._refresh(key)
+
+    def get_status(self) -> Dict[str, Any]:
+        self._roll_day()
+        return {
+            'realized_pnl': self.realized_pnl,
+            'alias_exposure': dict(self.alias_exposure),
+            'symbol_exposure': {f"{alias}:{symbol}": value for (alias, symbol), value in self.symbol_exposure.items()}
+        }
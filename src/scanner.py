@@ -0,0 +1,235 @@
+"""
+Scanner - Cross-alias price spread and funding rate scanner
+Every alias is queried with one fetch_tickers call per market type and one
+fetch_funding_rates call for the whole watchlist; concurrent scans share
+in-flight and recent requests.
+The comparison is a few NumPy reductions over an (alias x pair) matrix.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, FrozenSet, List, Tuple
+import numpy as np
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SPREAD = 'spread'
+FUNDING = 'funding'
+
+class SpreadScanner:
+    def __init__(self, exchange_manager, config: Dict[str, Any] = None):
+        config = config or {}
+        self.exchange_manager = exchange_manager
+        self.symbols: List[str] = config.get('symbols', [])
+        self.interval = config.get('interval', 0)  # 0: nincs periodikus futás
+        self.spread_threshold = config.get('spread_threshold', 0.3)  # %
+        self.funding_threshold = config.get('funding_threshold', 0.05)  # % fundingonként
+        self.listeners: List[Callable] = []
+        # Friss eredmények újrahasznosítása, hogy a /scan és a periodikus futás ne duplázza a kéréseket
+        self._results = TTLCache(maxsize=256, ttl=config.get('max_age', 5.0))
+        self._inflight: Dict[Tuple[str, str, FrozenSet[str]], asyncio.Task] = {}
+        # Ugyanazt a lehetőséget cooldown-on belül nem küldjük újra
+        self._pushed = TTLCache(maxsize=1024, ttl=config.get('alert_cooldown', 3600))
+        self.is_active = False
+        self._wakeup = asyncio.Event()
+        self._tasks = set()
+
+    def add_listener(self, callback: Callable):
+        """Registers callback(opportunities), called with the new above-threshold results of a periodic scan"""
+        self.listeners.append(callback)
+
+    @staticmethod
+    def _pair(market: Dict[str, Any]) -> str:
+        return f"{market['base']}/{market['quote']}"
+
+    async def _coalesced(self, exchange_name: str, kind: str, symbols: FrozenSet[str], factory: Callable):
+        """Returns a fresh cached result, joins an in-flight request, or starts one"""
+        key = (exchange_name, kind, symbols)
+        result = self._results.get(key)
+        if result is not None:
+            return result
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(factory())
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._inflight.pop(key, None)
+        self._results[key] = result
+        return result
+
+    async def _fetch_alias(self, exchange_name: str, pairs: FrozenSet[str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Tickers and funding rates of the watchlist pairs on one alias, keyed by BASE/QUOTE"""
+        exchange = self.exchange_manager.get_exchange(exchange_name)
+        markets = await exchange.load_markets()
+        ticker_symbols, funding_symbols, perpetuals = {}, {}, set()
+        by_type: Dict[str, List[str]] = {}
+        for symbol, market in markets.items():
+            if self._pair(market) not in pairs or market.get('active') is False:
+                continue
+            if market.get('swap'):
+                funding_symbols[symbol] = self._pair(market)
+                perpetuals.add(symbol)
+            ticker_symbols[symbol] = self._pair(market)
+            by_type.setdefault(market.get('type') or 'spot', []).append(symbol)
+        if not funding_symbols or not exchange.has.get('fetchFundingRates'):
+            funding_symbols = {}
+
+        # A Binance, Bybit és OKX elutasítja a vegyes spot/swap fetch_tickers hívást: piactípusonként egy hívás
+        def fetch_tickers(symbols):
+            return lambda: exchange.fetch_tickers(symbols)
+
+        requests = [
+            self._coalesced(exchange_name, f"tickers:{market_type}", pairs, fetch_tickers(symbols))
+            for market_type, symbols in sorted(by_type.items())
+        ]
+        if funding_symbols:
+            requests.append(self._coalesced(
+                exchange_name, 'funding', pairs, lambda: exchange.fetch_funding_rates(list(funding_symbols))
+            ))
+        results = await asyncio.gather(*requests)
+        tickers = {}
+        for result in results[:len(by_type)]:
+            tickers.update(result)
+        rates = results[-1] if funding_symbols else {}
+
+        # Ugyanazon a párnál a spot ár elsőbbséget kap a perpetual árral szemben
+        prices = {}
+        for symbol, ticker in tickers.items():
+            pair = ticker_symbols.get(symbol)
+            if pair and (pair not in prices or symbol not in perpetuals):
+                prices[pair] = ticker
+        funding = {
+            funding_symbols[symbol]: rate['fundingRate'] for symbol, rate in rates.items()
+            if symbol in funding_symbols and rate.get('fundingRate') is not None
+        }
+        return prices, funding
+
+    async def scan(self, symbols: List[str] = None) -> Dict[str, Any]:
+        """Fetches every alias concurrently and ranks spread and funding opportunities"""
+        pairs = frozenset(symbol.split(':')[0].upper() for symbol in (symbols or self.symbols))
+        names = list(self.exchange_manager.exchanges.keys()) + [
+            f"{alias}:{mode}" for alias, mode in self.exchange_manager.mode_clients
+        ]
+        results = await asyncio.gather(*(self._fetch_alias(name, pairs) for name in names), return_exceptions=True)
+
+        errors = {}
+        columns = sorted(pairs)
+        column = {pair: j for j, pair in enumerate(columns)}
+        bids = np.full((len(names), len(columns)), np.nan)
+        asks = np.full_like(bids, np.nan)
+        funding = np.full_like(bids, np.nan)
+        for i, (name, result) in enumerate(zip(names, results)):
+            if isinstance(result, BaseException):
+                logger.warning("Scanner: %s unavailable: %s", name, result)
+                errors[name] = str(result)
+                continue
+            prices, rates = result
+            for pair, ticker in prices.items():
+                last = ticker.get('last')
+                bids[i, column[pair]] = ticker.get('bid') or last or np.nan
+                asks[i, column[pair]] = ticker.get('ask') or last or np.nan
+            for pair, rate in rates.items():
+                funding[i, column[pair]] = rate
+
+        return {
+            'pairs': len(columns),
+            'exchanges': len(names) - len(errors),
+            'spreads': self._rank_spreads(names, columns, bids, asks),
+            'funding': self._rank_funding(names, columns, funding),
+            'errors': errors
+        }
+
+    @staticmethod
+    def _rank_spreads(names: List[str], pairs: List[str], bids: np.ndarray, asks: np.ndarray) -> List[Dict[str, Any]]:
+        """Best cross-alias spread per pair: buy at the lowest ask, sell at the highest bid"""
+        if bids.size == 0:
+            return []
+        cols = np.arange(len(pairs))
+        buy = np.where(np.isnan(asks), np.inf, asks).argmin(axis=0)
+        sell = np.where(np.isnan(bids), -np.inf, bids).argmax(axis=0)
+        ask, bid = asks[buy, cols], bids[sell, cols]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            spread = (bid - ask) / ask * 100
+        valid = np.isfinite(spread) & (buy != sell)
+        order = cols[valid][np.argsort(-spread[valid])]
+        return [
+            {'kind': SPREAD, 'pair': pairs[j], 'buy': names[buy[j]], 'ask': float(ask[j]),
+             'sell': names[sell[j]], 'bid': float(bid[j]), 'value': float(spread[j])}
+            for j in order
+        ]
+
+    @staticmethod
+    def _rank_funding(names: List[str], pairs: List[str], funding: np.ndarray) -> List[Dict[str, Any]]:
+        """Widest funding rate difference per pair: long where funding is lowest, short where highest"""
+        if funding.size == 0:
+            return []
+        cols = np.arange(len(pairs))
+        low = np.where(np.isnan(funding), np.inf, funding).argmin(axis=0)
+        high = np.where(np.isnan(funding), -np.inf, funding).argmax(axis=0)
+        diff = (funding[high, cols] - funding[low, cols]) * 100
+        valid = (np.sum(~np.isnan(funding), axis=0) >= 2) & np.isfinite(diff)
+        order = cols[valid][np.argsort(-diff[valid])]
+        return [
+            {'kind': FUNDING, 'pair': pairs[j], 'long': names[low[j]], 'long_rate': float(funding[low[j], j] * 100),
+             'short': names[high[j]], 'short_rate': float(funding[high[j], j] * 100), 'value': float(diff[j])}
+            for j in order
+        ]
+
+    def _new_opportunities(self, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        opportunities = []
+        candidates = [(o, self.spread_threshold) for o in result['spreads']] + \
+                     [(o, self.funding_threshold) for o in result['funding']]
+        for opportunity, threshold in candidates:
+            if opportunity['value'] < threshold:
+                continue
+            legs = (opportunity['buy'], opportunity['sell']) if opportunity['kind'] == SPREAD else \
+                (opportunity['long'], opportunity['short'])
+            key = (opportunity['kind'], opportunity['pair']) + legs
+            if key not in self._pushed:
+                self._pushed[key] = opportunity['value']
+                opportunities.append(opportunity)
+        return opportunities
+
+    async def start(self):
+        """Scans the watchlist every interval seconds and notifies listeners above the thresholds"""
+        if not self.interval or not self.symbols:
+            return
+        self.is_active = True
+        logger.info("Scanner started: %s pairs every %ss", len(self.symbols), self.interval)
+        try:
+            while self.is_active:
+                self._wakeup.clear()
+                try:
+                    opportunities = self._new_opportunities(await self.scan())
+                    if opportunities:
+                        self._notify(opportunities)
+                except Exception as e:
+                    logger.error("Scanner error: %s", e, exc_info=True)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            logger.info("Scanner stop requested")
+        finally:
+            self.is_active = False
+
+    def _notify(self, opportunities: List[Dict[str, Any]]):
+        for callback in self.listeners:
+            try:
+                result = callback(opportunities)
+                if asyncio.iscoroutine(result):
+                    task = asyncio.create_task(result)
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+            except Exception as e:
+                logger.error("Scanner listener error: %s", e, exc_info=True)
+
+    def stop(self):
+        self.is_active = False
+        self._wakeup.set()
+        for task in self._inflight.values():
+            task.cancel()
+        self._inflight.clear()
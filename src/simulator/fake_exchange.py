@@ -0,0 +1,379 @@
+"""
+Fake Exchange - Offline ccxt-compatible exchange simulator
+Provides latency, rate-limit and error injection, order matching and balances
+"""
+import asyncio
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+from ccxt.base.errors import (
+    BadSymbol,
+    InsufficientFunds,
+    InvalidOrder,
+    NetworkError,
+    OrderNotFound,
+    RateLimitExceeded,
+    RequestTimeout
+)
+
+logger = logging.getLogger(__name__)
+
+class FakeExchange:
+    """In-memory exchange that mimics the async ccxt API used by the bot"""
+
+    id = 'simulator'
+    name = 'Simulator'
+
+    def __init__(self, config: Dict[str, Any] = None):
+        config = config or {}
+        self.apiKey = config.get('apiKey', '')
+        self.secret = config.get('secret', '')
+        self.enableRateLimit = config.get('enableRateLimit', True)
+        self.options = dict(config.get('options', {}))
+
+        # Szimulációs paraméterek az exchange_configs.json "options" blokkjából
+        self.latency = self.options.get('latency_ms', 0) / 1000
+        self.jitter = self.options.get('jitter_ms', 0) / 1000
+        self.rate_limit_per_sec = self.options.get('rate_limit_per_sec', 0)
+        self.error_rate = self.options.get('error_rate', 0.0)
+        self.lost_response_rate = self.options.get('lost_response_rate', 0.0)
+        self.slippage = self.options.get('slippage', 0.0)
+        self.volatility = self.options.get('volatility', 0.001)
+        self.fee_rate = self.options.get('fee_rate', 0.001)
+        # Perpetual (BASE/QUOTE:SETTLE) szimbólumok funding rátája, alapértelmezés 0.01%
+        self.funding_rates: Dict[str, float] = {
+            symbol: float(rate) for symbol, rate in self.options.get('funding_rates', {}).items()
+        }
+        self.random = random.Random(self.options.get('seed'))
+
+        self.rateLimit = 1000 / self.rate_limit_per_sec if self.rate_limit_per_sec else 0
+        self.prices: Dict[str, float] = {
+            symbol: float(price)
+            for symbol, price in self.options.get('prices', {'BTC/USDT': 60000.0}).items()
+        }
+        self.free: Dict[str, float] = {
+            asset: float(amount)
+            for asset, amount in self.options.get('balances', {'USDT': 100000.0}).items()
+        }
+        self.used: Dict[str, float] = {}
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.client_order_ids: Dict[str, str] = {}  # {clientOrderId: order_id}
+        self.markets: Dict[str, Dict[str, Any]] = {}
+        self.has = {
+            'fetchBalance': True,
+            'fetchTicker': True,
+            'fetchTickers': True,
+            'fetchOHLCV': True,
+            'fetchFundingRates': True,
+            'fetchOrder': True,
+            'fetchOrders': True,
+            'fetchOpenOrders': True,
+            'fetchClosedOrders': True,
+            'cancelOrder': True
+        }
+        self.urls = {'api': {'public': 'sim://local', 'private': 'sim://local'}}
+        self.request_count = 0
+        self._request_times = deque()
+        self._order_ids = itertools.count(1)
+
+    def __str__(self):
+        return self.name
+
+    async def _request(self):
+        """Egy API hívás szimulálása: rate limit, késleltetés, hibainjektálás"""
+        self.request_count += 1
+        if self.rate_limit_per_sec:
+            now = time.monotonic()
+            while self._request_times and now - self._request_times[0] >= 1:
+                self._request_times.popleft()
+            if len(self._request_times) >= self.rate_limit_per_sec:
+                raise RateLimitExceeded(f"{self.id} rate limit exceeded ({self.rate_limit_per_sec}/s)")
+            self._request_times.append(now)
+
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            raise NetworkError(f"{self.id} simulated network error")
+
+    def _parse_symbol(self, symbol: str):
+        if symbol not in self.prices:
+            raise BadSymbol(f"{self.id} does not have market symbol {symbol}")
+        base, quote = symbol.split('/')
+        return base, quote.split(':')[0]
+
+    def _move(self, source: Dict[str, float], target: Dict[str, float], asset: str, amount: float):
+        source[asset] = source.get(asset, 0.0) - amount
+        target[asset] = target.get(asset, 0.0) + amount
+
+    def set_price(self, symbol: str, price: float) -> List[Dict[str, Any]]:
+        """Beállítja a piaci árat és lefuttatja a várakozó limit orderek párosítását"""
+        self.prices[symbol] = float(price)
+        filled = []
+        for order in self.orders.values():
+            if order['status'] != 'open' or order['symbol'] != symbol:
+                continue
+            if (order['side'] == 'buy' and price <= order['price']) or \
+                    (order['side'] == 'sell' and price >= order['price']):
+                self._fill(order, order['price'])
+                filled.append(dict(order))
+        return filled
+
+    def _fill(self, order: Dict[str, Any], price: float):
+        base, quote = self._parse_symbol(order['symbol'])
+        amount = order['remaining']
+        cost = amount * price
+        fee = cost * self.fee_rate
+
+        if order['side'] == 'buy':
+            # Limit ordernél a limitáron foglalt összegből szabadítunk fel
+            reserved = order['reserved']
+            self.used[quote] = self.used.get(quote, 0.0) - reserved
+            self.free[quote] = self.free.get(quote, 0.0) + reserved - cost - fee
+            self.free[base] = self.free.get(base, 0.0) + amount
+        else:
+            self.used[base] = self.used.get(base, 0.0) - order['reserved']
+            self.free[quote] = self.free.get(quote, 0.0) + cost - fee
+
+        now = self.milliseconds()
+        order.update({
+            'status': 'closed',
+            'filled': order['amount'],
+            'remaining': 0.0,
+            'average': price,
+            'cost': order['cost'] + cost,
+            'reserved': 0.0,
+            'lastTradeTimestamp': now,
+            'fee': {'currency': quote, 'cost': fee}
+        })
+        order['trades'].append({'price': price, 'amount': amount, 'timestamp': now})
+
+    @staticmethod
+    def milliseconds() -> int:
+        return int(time.time() * 1000)
+
+    async def load_markets(self, reload: bool = False, params: Dict = None) -> Dict[str, Any]:
+        if self.markets and not reload:
+            return self.markets
+        await self._request()
+        markets = {}
+        for symbol in self.prices:
+            base, quote = self._parse_symbol(symbol)
+            swap = ':' in symbol
+            markets[symbol] = {
+                'id': f"{base}{quote}{'PERP' if swap else ''}",
+                'symbol': symbol,
+                'base': base,
+                'quote': quote,
+                'settle': symbol.split(':')[1] if swap else None,
+                'type': 'swap' if swap else 'spot',
+                'spot': not swap,
+                'swap': swap,
+                'active': True,
+                'precision': {'amount': 8, 'price': 8},
+                'limits': {'amount': {'min': 0.0, 'max': None}}
+            }
+        self.set_markets(markets)
+        return self.markets
+
+    def set_markets(self, markets: Dict[str, Any]):
+        self.markets = markets
+
+    async def fetch_balance(self, params: Dict = None) -> Dict[str, Any]:
+        await self._request()
+        assets = set(self.free) | set(self.used)
+        balance: Dict[str, Any] = {'info': {}, 'free': {}, 'used': {}, 'total': {}}
+        for asset in assets:
+            free = self.free.get(asset, 0.0)
+            used = self.used.get(asset, 0.0)
+            balance['free'][asset] = free
+            balance['used'][asset] = used
+            balance['total'][asset] = free + used
+            balance[asset] = {'free': free, 'used': used, 'total': free + used}
+        return balance
+
+    async def fetch_ticker(self, symbol: str, params: Dict = None) -> Dict[str, Any]:
+        await self._request()
+        return self._ticker(symbol)
+
+    async def fetch_tickers(self, symbols: List[str] = None, params: Dict = None) -> Dict[str, Any]:
+        await self._request()
+        return {symbol: self._ticker(symbol) for symbol in (symbols or list(self.prices))}
+
+    def _ticker(self, symbol: str) -> Dict[str, Any]:
+        self._parse_symbol(symbol)
+        last = self.prices[symbol]
+        return {
+            'symbol': symbol,
+            'timestamp': self.milliseconds(),
+            'last': last,
+            'bid': last,
+            'ask': last,
+            'close': last
+        }
+
+    async def fetch_funding_rates(self, symbols: List[str] = None, params: Dict = None) -> Dict[str, Any]:
+        await self._request()
+        perpetuals = [symbol for symbol in (symbols or list(self.prices)) if ':' in symbol]
+        now = self.milliseconds()
+        rates = {}
+        for symbol in perpetuals:
+            self._parse_symbol(symbol)
+            rates[symbol] = {
+                'symbol': symbol,
+                'markPrice': self.prices[symbol],
+                'fundingRate': self.funding_rates.get(symbol, 0.0001),
+                'fundingTimestamp': now - now % 28800000 + 28800000,
+                'timestamp': now
+            }
+        return rates
+
+    @staticmethod
+    def parse_timeframe(timeframe: str) -> int:
+        units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+        return int(timeframe[:-1]) * units[timeframe[-1]]
+
+    async def fetch_ohlcv(self, symbol: str, timeframe: str = '1m', since: int = None, limit: int = None,
+                          params: Dict = None) -> List[List[float]]:
+        """Szintetikus gyertyák: véletlen bolyongás, amely az aktuális árban végződik"""
+        await self._request()
+        self._parse_symbol(symbol)
+        timeframe_ms = self.parse_timeframe(timeframe) * 1000
+        now = self.milliseconds()
+        end = now - now % timeframe_ms
+        start = end - ((limit or 100) - 1) * timeframe_ms
+        if since is not None:
+            start = max(start, since - since % timeframe_ms)
+        candles = []
+        close = self.prices[symbol]
+        for timestamp in range(end, start - 1, -timeframe_ms):
+            open_ = close * (1 + self.random.gauss(0, self.volatility))
+            spread = abs(close - open_) + close * self.volatility * self.random.random()
+            candles.append([timestamp, open_, max(open_, close) + spread / 2, min(open_, close) - spread / 2,
+                            close, self.random.uniform(0, 10)])
+            close = open_
+        candles.reverse()
+        return candles
+
+    async def create_order(self, symbol: str, type: str, side: str, amount: float,
+                           price: float = None, params: Dict = None) -> Dict[str, Any]:
+        await self._request()
+        params = params or {}
+        base, quote = self._parse_symbol(symbol)
+        if amount is None or amount <= 0:
+            raise InvalidOrder(f"{self.id} invalid amount {amount}")
+        if type == 'limit' and not price:
+            raise InvalidOrder(f"{self.id} limit order requires a price")
+
+        client_order_id = params.get('clientOrderId')
+        if client_order_id and self._find_by_client_id(client_order_id):
+            raise InvalidOrder(f"{self.id} duplicate clientOrderId {client_order_id}")
+
+        last = self.prices[symbol]
+        if type == 'market':
+            fill_price = last * (1 + self.slippage if side == 'buy' else 1 - self.slippage)
+        else:
+            fill_price = price
+
+        # Fedezet foglalása
+        if side == 'buy':
+            reserved = amount * fill_price * (1 + self.fee_rate)
+            if self.free.get(quote, 0.0) < reserved:
+                raise InsufficientFunds(f"{self.id} insufficient {quote} balance")
+            self._move(self.free, self.used, quote, reserved)
+        else:
+            reserved = amount
+            if self.free.get(base, 0.0) < reserved:
+                raise InsufficientFunds(f"{self.id} insufficient {base} balance")
+            self._move(self.free, self.used, base, reserved)
+
+        order_id = str(next(self._order_ids))
+        order = {
+            'id': order_id,
+            'clientOrderId': client_order_id,
+            'timestamp': self.milliseconds(),
+            'lastTradeTimestamp': None,
+            'symbol': symbol,
+            'type': type,
+            'side': side,
+            'price': price if type == 'limit' else fill_price,
+            'amount': amount,
+            'filled': 0.0,
+            'remaining': amount,
+            'average': None,
+            'cost': 0.0,
+            'status': 'open',
+            'fee': None,
+            'trades': [],
+            'reserved': reserved,
+            'info': {}
+        }
+        self.orders[order_id] = order
+        if client_order_id:
+            self.client_order_ids[client_order_id] = order_id
+
+        if type == 'market' or (side == 'buy' and price >= last) or (side == 'sell' and price <= last):
+            self._fill(order, fill_price if type == 'market' else last)
+
+        # Elveszett válasz: az order létrejött, de a kliens hibát kap
+        if self.lost_response_rate and self.random.random() < self.lost_response_rate:
+            raise RequestTimeout(f"{self.id} simulated timeout after order placement")
+        return dict(order)
+
+    async def cancel_order(self, id: str, symbol: str = None, params: Dict = None) -> Dict[str, Any]:
+        await self._request()
+        order = self.orders.get(id)
+        if not order:
+            raise OrderNotFound(f"{self.id} order {id} not found")
+        if order['status'] != 'open':
+            raise InvalidOrder(f"{self.id} order {id} is {order['status']}")
+
+        base, quote = self._parse_symbol(order['symbol'])
+        self._move(self.used, self.free, quote if order['side'] == 'buy' else base, order['reserved'])
+        order.update({'status': 'canceled', 'reserved': 0.0})
+        return dict(order)
+
+    async def fetch_order(self, id: str, symbol: str = None, params: Dict = None) -> Dict[str, Any]:
+        await self._request()
+        params = params or {}
+        order = self.orders.get(id) if id else self._find_by_client_id(params.get('clientOrderId'))
+        if not order:
+            raise OrderNotFound(f"{self.id} order {id or params.get('clientOrderId')} not found")
+        return dict(order)
+
+    def _find_by_client_id(self, client_order_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not client_order_id or client_order_id not in self.client_order_ids:
+            return None
+        return self.orders[self.client_order_ids[client_order_id]]
+
+    async def fetch_orders(self, symbol: str = None, since: int = None, limit: int = None,
+                           params: Dict = None) -> List[Dict[str, Any]]:
+        await self._request()
+        return self._filter_orders(symbol, since, limit)
+
+    async def fetch_open_orders(self, symbol: str = None, since: int = None, limit: int = None,
+                                params: Dict = None) -> List[Dict[str, Any]]:
+        await self._request()
+        return self._filter_orders(symbol, since, limit, status='open')
+
+    async def fetch_closed_orders(self, symbol: str = None, since: int = None, limit: int = None,
+                                  params: Dict = None) -> List[Dict[str, Any]]:
+        await self._request()
+        return self._filter_orders(symbol, since, limit, status='closed')
+
+    def _filter_orders(self, symbol: str = None, since: int = None, limit: int = None,
+                       status: str = None) -> List[Dict[str, Any]]:
+        orders = [
+            dict(order) for order in self.orders.values()
+            if (symbol is None or order['symbol'] == symbol)
+            and (since is None or order['timestamp'] >= since)
+            and (status is None or order['status'] == status)
+        ]
+        return orders[-limit:] if limit else orders
+
+    async def close(self):
+        logger.debug(f"{self.id} session closed ({self.request_count} requests)")
@@ -0,0 +1,169 @@
+"""
+Replay Harness - Replays recorded Telegram updates through the bot's command path
+Measures command-to-order latency and throughput without network access
+
+Usage (from the src/ directory):
+    python -m simulator.replay updates.jsonl --concurrency 8 --repeat 10
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+from types import SimpleNamespace
+from typing import Dict, Any, List, Callable, Optional
+from telegram.ext import CommandHandler, MessageHandler
+from utils.config_loader import load_config
+
+logger = logging.getLogger(__name__)
+
+class ReplayMessage:
+    """Minimal stand-in for telegram.Message that records replies instead of sending them"""
+
+    def __init__(self, text: str, chat_id: int, message_id: int = 0):
+        self.text = text
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.replies: List[str] = []
+
+    async def reply_text(self, text: str, **kwargs):
+        self.replies.append(text)
+        return self
+
+    async def reply_document(self, document, filename: str = None, caption: str = None, **kwargs):
+        self.replies.append(caption or filename or '')
+        return self
+
+class ReplayUpdate:
+    """Minimal stand-in for telegram.Update built from a recorded update dict"""
+
+    def __init__(self, data: Dict[str, Any], default_user_id: Optional[int] = None):
+        message = data.get('message') or data.get('edited_message') or {}
+        user_id = message.get('from', {}).get('id', default_user_id)
+        chat_id = message.get('chat', {}).get('id', user_id)
+
+        self.update_id = data.get('update_id', 0)
+        self.effective_user = SimpleNamespace(id=user_id)
+        self.effective_chat = SimpleNamespace(id=chat_id)
+        self.message = ReplayMessage(message.get('text', ''), chat_id, message.get('message_id', 0))
+        self.effective_message = self.message
+        self.callback_query = None
+
+def load_updates(path: str) -> List[Dict[str, Any]]:
+    """Loads recorded updates from a JSON array or a JSON-lines file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read().strip()
+    if content.startswith('['):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+class ReplayHarness:
+    """Dispatches recorded updates to the handlers registered on a TelegramBot"""
+
+    def __init__(self, bot, default_user_id: Optional[int] = None):
+        self.bot = bot
+        self.default_user_id = default_user_id
+        self.commands: Dict[str, Callable] = {}
+        self.fallback: Optional[Callable] = None
+        for handlers in bot.app.handlers.values():
+            for handler in handlers:
+                if isinstance(handler, CommandHandler):
+                    for command in handler.commands:
+                        self.commands[command] = handler.callback
+                elif self.fallback is None and isinstance(handler, MessageHandler):
+                    self.fallback = handler.callback
+
+    def _resolve(self, text: str):
+        if not text.startswith('/'):
+            return self.fallback, []
+        parts = text.split()
+        command = parts[0][1:].split('@')[0].lower()
+        return self.commands.get(command), parts[1:]
+
+    async def dispatch(self, data: Dict[str, Any]) -> ReplayUpdate:
+        update = ReplayUpdate(data, self.default_user_id)
+        callback, args = self._resolve(update.message.text)
+        if callback is None:
+            raise ValueError(f"No handler for update {update.update_id}: {update.message.text}")
+        context = SimpleNamespace(args=args, bot=self.bot.app.bot, user_data={}, chat_data={})
+        await callback(update, context)
+        return update
+
+    async def run(self, updates: List[Dict[str, Any]], concurrency: int = 1) -> Dict[str, Any]:
+        """Replays updates and returns latency/throughput statistics"""
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies: List[float] = []
+        errors = 0
+
+        async def replay_one(data):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    await self.dispatch(data)
+                except Exception as e:
+                    errors += 1
+                    logger.error(f"Replay error for update {data.get('update_id')}: {str(e)}")
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(replay_one(data) for data in updates))
+        elapsed = time.perf_counter() - started
+        return summarize(latencies, elapsed, errors)
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, Any]:
+    """Builds a latency/throughput summary in milliseconds"""
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        'updates': len(ordered),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 4),
+        'throughput_per_s': round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(statistics.fmean(ordered), 3) if ordered else 0.0,
+        'p50_ms': round(percentile(50), 3),
+        'p95_ms': round(percentile(95), 3),
+        'p99_ms': round(percentile(99), 3),
+        'max_ms': round(ordered[-1], 3) if ordered else 0.0
+    }
+
+async def _main(args):
+    from telegram_bot import TelegramBot
+
+    config = load_config()
+    bot = TelegramBot(config)
+    default_user_id = args.user_id or config['telegram']['allowed_users'][0]
+    harness = ReplayHarness(bot, default_user_id)
+
+    recorded = load_updates(args.updates)
+    # Ismétlésenként eltolt update id-k, hogy a felvett újrakézbesítések megmaradjanak
+    offset = max((u.get('update_id', 0) for u in recorded), default=0) + 1
+    updates = [
+        dict(u, update_id=u.get('update_id', 0) + round_no * offset)
+        for round_no in range(args.repeat) for u in recorded
+    ]
+    try:
+        stats = await harness.run(updates, args.concurrency)
+    finally:
+        for exchange in bot.exchange_manager.exchanges.values():
+            await exchange.close()
+    print(json.dumps(stats, indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded Telegram updates offline")
+    parser.add_argument('updates', help="JSON or JSON-lines file with recorded updates")
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--user-id', type=int, default=None,
+                        help="User id for updates without a 'from' field (default: first allowed user)")
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(_main(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
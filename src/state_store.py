@@ -0,0 +1,113 @@
+"""
+State Store - Snapshot handed from one run to the next
+Positions, open orders, armed conditional orders, running execution orders and
+loaded markets are written on shutdown and read on start, so a restart neither
+re-downloads markets nor loses track of orders and their pending exits
+"""
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+class StateStore:
+    def __init__(self, path: str = 'data/state.json', max_market_age: float = 86400):
+        self.path = Path(path)
+        self.max_market_age = max_market_age
+
+    def save(self, exchange_manager, trade_manager, risk_manager=None, conditional_orders=None,
+             execution=None) -> bool:
+        """Writes the snapshot atomically (temp file + rename)"""
+        tracker = trade_manager.order_tracker
+        state = {
+            'version': STATE_VERSION,
+            'saved_at': time.time(),
+            'positions': trade_manager.position_manager.positions,
+            'trailing_stops': trade_manager.position_manager.trailing_stops,
+            'open_orders': [
+                {'exchange': exchange_name, 'order': tracked.order, 'tags': tracked.tags}
+                for exchange_name, orders in tracker.open_orders.items()
+                for tracked in orders.values()
+            ],
+            'markets': {
+                name: exchange.markets
+                for name, exchange in exchange_manager.exchanges.items() if getattr(exchange, 'markets', None)
+            }
+        }
+        if risk_manager is not None:
+            state['risk'] = risk_manager.export_state()
+        if conditional_orders is not None:
+            state['conditional_orders'] = conditional_orders.export_state()
+        if execution is not None:
+            state['execution'] = execution.export_state()
+
+        tmp_path = self.path.with_suffix('.tmp')
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, separators=(',', ':'), default=str)
+            os.replace(tmp_path, self.path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error("Failed to write state snapshot %s: %s", self.path, e)
+            return False
+        logger.info("State snapshot written: %s positions, %s open orders, markets of %s exchanges",
+                    sum(len(p) for p in state['positions'].values()), len(state['open_orders']),
+                    len(state['markets']))
+        return True
+
+    def load(self, exchange_manager, trade_manager, risk_manager=None, conditional_orders=None,
+             execution=None) -> bool:
+        """Restores a snapshot written by save(); a missing or unreadable file is not an error
+
+        Conditional and execution orders re-subscribe tickers and timers, so call it from a running loop.
+        """
+        if not self.path.exists():
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable state snapshot %s: %s", self.path, e)
+            return False
+        if state.get('version') != STATE_VERSION:
+            logger.warning("Ignoring state snapshot with version %s", state.get('version'))
+            return False
+
+        position_manager = trade_manager.position_manager
+        for exchange_name, positions in state.get('positions', {}).items():
+            for order in positions.values():
+                position_manager.add_position(exchange_name, order, notify=False)
+        for exchange_name, stops in state.get('trailing_stops', {}).items():
+            for position_id, trailing_percent in stops.items():
+                position_manager.set_trailing_stop(exchange_name, position_id, trailing_percent)
+
+        # A foglalások az orderek előtt állnak vissza, így a közben érkezett fill-ek a kitettséget frissítik
+        if risk_manager is not None and state.get('risk'):
+            risk_manager.restore_state(state['risk'])
+
+        # Az állás közben teljesült orderek az első lekérdezéskor frissülnek
+        for entry in state.get('open_orders', []):
+            if exchange_manager.get_exchange(entry['exchange']):
+                trade_manager.order_tracker.track(
+                    entry['exchange'], entry['order'], notify=False, **entry.get('tags', {})
+                )
+
+        age = time.time() - state.get('saved_at', 0)
+        if age <= self.max_market_age:
+            for name, markets in state.get('markets', {}).items():
+                exchange = exchange_manager.get_exchange(name)
+                if exchange and not getattr(exchange, 'markets', None):
+                    exchange.set_markets(markets)
+
+        # A nyitott orderek már követettek, így a közben teljesült belépők élesítik a bracket kilépőket
+        if conditional_orders is not None and state.get('conditional_orders'):
+            conditional_orders.restore_state(state['conditional_orders'])
+        if execution is not None and state.get('execution'):
+            execution.restore_state(state['execution'])
+
+        logger.info("State snapshot restored from %s (%.0fs old)", self.path, age)
+        return True
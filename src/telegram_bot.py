@@ -4,20 +4,45 @@ Handles all Telegram interactions and commands
 """
 import logging
 import asyncio
+import functools
+import itertools
+import os
+import re
+import tempfile
 import threading
-from telegram import Update
+from typing import Dict, Any, List, Optional, Tuple
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import (
     Application,
+    CallbackQueryHandler,
     CommandHandler,
     MessageHandler,
     filters,
     CallbackContext
 )
 from utils.config_loader import load_config
-from exchange_manager import ExchangeManager
+from exchange_manager import ExchangeManager, make_client_order_id
 from trade_manager import TradeManager
 from utils.message_handler import MessageHandler as MsgHandler
 from heartbeat_manager import HeartbeatManager
+from utils.logger import correlation_id
+from order_tracker import TrackedOrder, FILLED, PARTIALLY_FILLED
+from risk_manager import RiskManager, RiskLimitExceeded
+from market_data import TickerCache
+from conditional_orders import ConditionalOrderManager, ConditionalOrder, TRIGGERED, REARMED
+from utils.trigger_index import ABOVE, BELOW
+from utils.table_renderer import PageCache, paginate
+from utils.ttl_cache import TTLCache
+from alert_manager import AlertManager, PERCENT
+from ohlcv_store import OHLCVStore
+from portfolio import PortfolioValuator
+from endpoint_prober import EndpointProber
+from scanner import SpreadScanner, SPREAD
+from trade_history import TradeRecorder, HistoryExporter, EXPORT_TABLES, FORMATS, PARQUET, day_bounds
+from state_store import StateStore
+from execution import ExecutionManager, ParentOrder, DONE, CANCELED as ALGO_CANCELED
+from database.db_handler import DatabaseHandler
 
 class TelegramBot:
     def __init__(self, config):
@@ -31,8 +56,68 @@ class TelegramBot:
             self.message_handler = MsgHandler(config['settings']['default_language'])
             self.exchange_manager = ExchangeManager(config)
             self.trade_manager = TradeManager(self.exchange_manager)
+            self.trade_manager.order_tracker.add_listener(self._notify_order_update)
+            self.ticker_cache = TickerCache(
+                self.exchange_manager, config['settings'].get('ticker_poll_interval', 2.0)
+            )
+            self.risk_manager = RiskManager(config.get('risk', {}), price_source=self.ticker_cache.fetch_price)
+            self.trade_manager.order_tracker.add_listener(self.risk_manager.on_order_update)
+            self.ticker_cache.add_listener(self.risk_manager.on_ticker)
+            self.conditional_orders = ConditionalOrderManager(
+                self.trade_manager, self.ticker_cache, self.risk_manager
+            )
+            self.conditional_orders.add_listener(self._notify_condition)
+            self.db_handler = DatabaseHandler(config['settings'].get('database_path', 'positions.db'))
+            self.trade_recorder = TradeRecorder(self.db_handler.db_path)
+            self.trade_manager.add_fill_listener(self.trade_recorder.record)
+            self.trade_manager.position_manager.add_listener(self.trade_recorder.record_position)
+            self.history_exporter = HistoryExporter(self.db_handler.db_path)
+            self.alert_manager = AlertManager(
+                self.db_handler, self.ticker_cache, self.exchange_manager, self.trade_recorder
+            )
+            self.alert_manager.add_listener(self._notify_alert)
+            self.ohlcv_store = OHLCVStore(
+                self.exchange_manager, self.ticker_cache,
+                config['settings'].get('data_dir', 'data'), config['settings'].get('ohlcv_capacity', 1000),
+                config['settings'].get('ohlcv_max_series', 64)
+            )
+            self.execution = ExecutionManager(
+                self.trade_manager, self.risk_manager, config['settings'].get('execution_rate_share', 0.5)
+            )
+            self.execution.add_listener(self._notify_execution)
+            self._algo_progress: Dict[str, int] = {}
+            self.portfolio = PortfolioValuator(
+                self.exchange_manager, self.ticker_cache, self.trade_manager.position_manager,
+                config['settings'].get('quote_currency', 'USDT')
+            )
+            self.endpoint_prober = EndpointProber(
+                self.exchange_manager,
+                interval=config['settings'].get('endpoint_probe_interval', 60.0),
+                timeout=config['settings'].get('endpoint_probe_timeout', 2.0),
+                switch_margin=config['settings'].get('endpoint_switch_margin', 0.2)
+            )
+            self.scanner = SpreadScanner(self.exchange_manager, config.get('scanner', {}))
+            self.scanner.add_listener(self._notify_scanner)
             self.bot_token = config['telegram']['api_key']
             self.allowed_users = config['telegram']['allowed_users']
+
+            data_dir = config['settings'].get('data_dir', 'data')
+            self.state_store = StateStore(config['settings'].get('state_path', os.path.join(data_dir, 'state.json')))
+            self.shutdown_timeout = config['settings'].get('shutdown_timeout', 10.0)
+            self.accepting_commands = True
+            self.page_cache = PageCache(config['settings'].get('page_cache_ttl', 300.0))
+            # Azonos /buy, /sell ismétlése ezen belül megerősítést kér
+            # {(chat, alias, páros, oldal, mennyiség, ár): update_id}
+            self.recent_orders = TTLCache(maxsize=1024, ttl=config['settings'].get('order_confirm_window', 10.0))
+            self.pending_confirmations = TTLCache(maxsize=256, ttl=60.0)
+            self._confirm_tokens = itertools.count(1)
+            self.chat_exchanges: Dict[int, str] = {}  # {chat_id: 'alias' vagy 'alias:mode'}
+            self.default_exchange = self.exchange_manager.canonical_name(
+                config['settings'].get('default_exchange') or '', config['settings'].get('default_mode')
+            )
+            self._inflight = 0
+            self._idle_event = asyncio.Event()
+            self._idle_event.set()
             
             self.logger.debug("Telegram alkalmazás építése...")
             self.app = Application.builder().token(self.bot_token).build()
@@ -42,7 +127,7 @@ class TelegramBot:
             self.logger.info("TelegramBot sikeresen inicializálva")
             
         except Exception as e:
-            self.logger.critical(f"Hiba a TelegramBot inicializálásakor: {str(e)}", exc_info=True)
+            self.logger.critical("Hiba a TelegramBot inicializálásakor: %s", e, exc_info=True)
             raise
 
     def _register_handlers(self):
@@ -58,20 +143,86 @@ class TelegramBot:
             CommandHandler("remove_exchange", self.remove_exchange),
             CommandHandler("list_exchanges", self.list_exchanges),
             CommandHandler("ping", self.ping),
+            CommandHandler("use", self.use_exchange),
+            CommandHandler("risk", self.risk_status),
+            CommandHandler("when", self.when),
+            CommandHandler("bracket", self.bracket),
+            CommandHandler("oco", self.oco),
+            CommandHandler("conditions", self.list_conditions),
+            CommandHandler("cancel_condition", self.cancel_condition),
+            CommandHandler("alert", self.alert),
+            CommandHandler("alerts", self.list_alerts),
+            CommandHandler("unalert", self.unalert),
+            CommandHandler("indicator", self.indicator),
+            CommandHandler("portfolio", self.get_portfolio),
+            CommandHandler("twap", self.twap),
+            CommandHandler("iceberg", self.iceberg),
+            CommandHandler("scaled", self.scaled),
+            CommandHandler("algos", self.list_algos),
+            CommandHandler("cancel_algo", self.cancel_algo),
+            CommandHandler("scan", self.scan),
+            CommandHandler("export", self.export_history),
+            CallbackQueryHandler(self.page_callback, pattern=r'^page:'),
+            CallbackQueryHandler(self.confirm_callback, pattern=r'^confirm:'),
             MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message)
         ]
         
         for handler in handlers:
+            handler.callback = self._wrap_handler(handler.callback)
             self.app.add_handler(handler)
-        self.logger.debug(f"Registered {len(handlers)} handlers")
+        self.logger.debug("Registered %s handlers", len(handlers))
+
+    def _wrap_handler(self, callback):
+        """Tags log records with the update id, refuses commands during shutdown and counts in-flight handlers"""
+        @functools.wraps(callback)
+        async def wrapper(update: Update, context: CallbackContext):
+            token = correlation_id.set(f"u{update.update_id}")
+            try:
+                if not self.accepting_commands:
+                    if update.effective_message:
+                        await update.effective_message.reply_text(
+                            self.message_handler.get_message('shutting_down')
+                        )
+                    return
+                self._inflight += 1
+                self._idle_event.clear()
+                try:
+                    return await callback(update, context)
+                finally:
+                    self._inflight -= 1
+                    if not self._inflight:
+                        self._idle_event.set()
+            finally:
+                correlation_id.reset(token)
+        return wrapper
+
+    def _exchange_arg(self, name: str) -> str:
+        """Canonical 'alias' or 'alias:mode' key of an exchange argument, shared by every command
+
+        Risk, dedup, position and alert state is keyed on it, so 'binance' and
+        'binance:spot' (the alias's base mode) end up on the same key.
+        Raises ValueError for an unknown alias or mode.
+        """
+        exchange_name = self.exchange_manager.canonical_name(name)
+        if exchange_name is None:
+            raise ValueError(self.message_handler.get_message('exchange_not_found', name=name))
+        return exchange_name
+
+    def _resolve_exchange(self, chat_id: int, args: List[str]) -> Tuple[Optional[str], List[str]]:
+        """Explicit exchange argument, otherwise the chat's /use default or the configured default"""
+        if args:
+            explicit = self.exchange_manager.canonical_name(args[0])
+            if explicit:
+                return explicit, args[1:]
+        return self.chat_exchanges.get(chat_id, self.default_exchange), args
 
     async def help(self, update: Update, context: CallbackContext):
         """Display help message with all available commands"""
         if update.effective_user.id not in self.allowed_users:
-            self.logger.warning(f"Unauthorized access attempt from user {update.effective_user.id}")
+            self.logger.warning("Unauthorized access attempt from user %s", update.effective_user.id)
             return
             
-        self.logger.debug(f"Sending help message to user {update.effective_user.id}")
+        self.logger.debug("Sending help message to user %s", update.effective_user.id)
         await update.message.reply_text(
             self.message_handler.get_message('help_text')
         )
@@ -79,122 +230,178 @@ class TelegramBot:
     async def start(self, update: Update, context: CallbackContext):
         """Handle /start command"""
         if update.effective_user.id not in self.allowed_users:
-            self.logger.warning(f"Unauthorized user tried to start bot: {update.effective_user.id}")
+            self.logger.warning("Unauthorized user tried to start bot: %s", update.effective_user.id)
             return
             
-        self.logger.info(f"New user started bot: {update.effective_user.id}")
+        self.logger.info("New user started bot: %s", update.effective_user.id)
         await update.message.reply_text(
             self.message_handler.get_message('welcome')
         )
 
     async def buy(self, update: Update, context: CallbackContext):
         """Handle buy command"""
+        await self._order_command(update, context, 'buy')
+
+    async def sell(self, update: Update, context: CallbackContext):
+        """Handle sell command"""
+        await self._order_command(update, context, 'sell')
+
+    async def _order_command(self, update: Update, context: CallbackContext, side: str):
+        """/buy and /sell: a repeat of the same order within the confirmation window needs a confirm tap"""
         if update.effective_user.id not in self.allowed_users:
             return
-            
-        self.logger.info(f"Buy command received from {update.effective_user.id}")
-        
+
+        self.logger.info("%s command received from %s", side.capitalize(), update.effective_user.id)
+
         try:
-            args = context.args
-            if len(args) < 3:
-                self.logger.warning(f"Insufficient arguments for buy command from {update.effective_user.id}")
+            exchange_name, args = self._resolve_exchange(update.effective_chat.id, context.args)
+            if not exchange_name or len(args) < 2:
+                self.logger.warning("Insufficient arguments for %s command from %s", side, update.effective_user.id)
                 await update.message.reply_text(
-                    self.message_handler.get_message('buy_usage')
+                    self.message_handler.get_message(f'{side}_usage')
                 )
                 return
-            
-            exchange_name = args[0]
-            symbol = args[1]
-            amount = float(args[2])
-            price = float(args[3]) if len(args) > 3 else None
-            
-            self.logger.debug(f"Attempting to buy {amount} of {symbol} on {exchange_name} at {price or 'market'} price")
-            
-            order = await self.trade_manager.open_position(
-                exchange_name, symbol, 'buy', amount, price
-            )
-            
-            self.logger.info(f"Successfully opened position: {order}")
-            await update.message.reply_text(
-                self.message_handler.get_message('position_opened').format(
-                    exchange=exchange_name,
-                    symbol=symbol,
-                    side='buy',
-                    amount=amount,
-                    price=price if price else 'market'
-                )
+
+            symbol = args[0]
+            amount = float(args[1])
+            price = float(args[2]) if len(args) > 2 else None
+        except ValueError as e:
+            await update.message.reply_text(self.message_handler.get_message('error', error=str(e)))
+            return
+
+        # Új update_id-val érkező, de azonos order (pl. kétszer elküldött parancs) csak megerősítéssel megy ki;
+        # az újrakézbesített update-et (azonos update_id) a client order id deduplikálja
+        chat_id = update.effective_chat.id
+        previous = self.recent_orders.get((chat_id, exchange_name, symbol, side, amount, price))
+        if previous is not None and previous != update.update_id:
+            token = format(next(self._confirm_tokens), 'x')
+            self.pending_confirmations[(chat_id, token)] = (
+                update.update_id, exchange_name, symbol, side, amount, price
             )
-        except Exception as e:
-            self.logger.error(f"Error in buy command: {str(e)}", exc_info=True)
+            self.logger.info("Repeated %s %s %s on %s held for confirmation", side, amount, symbol, exchange_name)
             await update.message.reply_text(
-                self.message_handler.get_message('error').format(error=str(e))
+                self.message_handler.get_message(
+                    'order_confirm_duplicate', exchange=exchange_name, symbol=symbol, side=side, amount=amount,
+                    price=price if price else 'market', window=int(self.recent_orders.ttl)
+                ),
+                reply_markup=InlineKeyboardMarkup([[
+                    InlineKeyboardButton(self.message_handler.get_message('order_confirm_yes'),
+                                         callback_data=f"confirm:{token}:yes"),
+                    InlineKeyboardButton(self.message_handler.get_message('order_confirm_no'),
+                                         callback_data=f"confirm:{token}:no")
+                ]])
             )
-
-    async def sell(self, update: Update, context: CallbackContext):
-        """Handle sell command"""
-        if update.effective_user.id not in self.allowed_users:
             return
-            
-        self.logger.info(f"Sell command received from {update.effective_user.id}")
-        
+
+        await self._submit_order(update.message, chat_id, update.update_id, exchange_name, symbol, side, amount, price)
+
+    async def _submit_order(self, message, chat_id: int, update_id: int, exchange_name: str, symbol: str,
+                            side: str, amount: float, price: Optional[float]):
+        """Risk check, order placement and the reply of a /buy or /sell"""
         try:
-            args = context.args
-            if len(args) < 3:
-                self.logger.warning(f"Insufficient arguments for sell command from {update.effective_user.id}")
-                await update.message.reply_text(
-                    self.message_handler.get_message('sell_usage')
+            self.logger.debug("Attempting to %s %s of %s on %s at %s price",
+                              side, amount, symbol, exchange_name, price or 'market')
+
+            reservation = await self.risk_manager.check(exchange_name, symbol, side, amount, price)
+            submit = self.trade_manager.open_position if side == 'buy' else self.trade_manager.close_position
+            try:
+                order = await submit(
+                    exchange_name, symbol, side, amount, price,
+                    client_order_id=make_client_order_id(update_id),
+                    chat_id=chat_id
                 )
-                return
-            
-            exchange_name = args[0]
-            symbol = args[1]
-            amount = float(args[2])
-            price = float(args[3]) if len(args) > 3 else None
-            
-            self.logger.debug(f"Attempting to sell {amount} of {symbol} on {exchange_name} at {price or 'market'} price")
-            
-            order = await self.trade_manager.close_position(
-                exchange_name, symbol, 'sell', amount, price
-            )
-            
-            self.logger.info(f"Successfully closed position: {order}")
-            await update.message.reply_text(
+            except Exception:
+                self.risk_manager.release(reservation)
+                raise
+            self.risk_manager.attach(reservation, exchange_name, order)
+            # Csak a ténylegesen beküldött order számít ismétlésnek; elutasítás vagy hiba után szabad újraküldeni
+            self.recent_orders[(chat_id, exchange_name, symbol, side, amount, price)] = update_id
+
+            self.logger.info("Successfully %s position: %s", 'opened' if side == 'buy' else 'closed', order)
+            await message.reply_text(
                 self.message_handler.get_message('position_opened').format(
                     exchange=exchange_name,
                     symbol=symbol,
-                    side='sell',
+                    side=side,
                     amount=amount,
                     price=price if price else 'market'
                 )
             )
+        except RiskLimitExceeded as e:
+            self.logger.warning("%s command rejected by risk check: %s", side.capitalize(), e)
+            await message.reply_text(
+                self.message_handler.get_message(
+                    'risk_rejected', limit=e.limit, value=round(e.value, 2), maximum=e.maximum
+                )
+            )
         except Exception as e:
-            self.logger.error(f"Error in sell command: {str(e)}", exc_info=True)
-            await update.message.reply_text(
+            self.logger.error("Error in %s command: %s", side, e, exc_info=True)
+            await message.reply_text(
                 self.message_handler.get_message('error').format(error=str(e))
             )
 
+    async def confirm_callback(self, update: Update, context: CallbackContext):
+        """Confirm or drop a repeated /buy or /sell held back by the confirmation window"""
+        query = update.callback_query
+        if update.effective_user.id not in self.allowed_users:
+            await query.answer()
+            return
+
+        try:
+            _, token, answer = query.data.split(':')
+        except ValueError:
+            await query.answer()
+            return
+        # pop: a gomb többszöri megnyomása is legfeljebb egy ordert küld
+        pending = self.pending_confirmations.pop((update.effective_chat.id, token), None)
+        if pending is None:
+            await query.answer(self.message_handler.get_message('order_confirm_expired'), show_alert=True)
+            return
+
+        await query.answer()
+        update_id, exchange_name, symbol, side, amount, price = pending
+        if answer != 'yes':
+            await query.edit_message_text(self.message_handler.get_message('order_confirm_dropped'))
+            return
+        try:
+            await query.edit_message_reply_markup(reply_markup=None)
+        except BadRequest as e:
+            self.logger.debug("Confirmation keyboard removal skipped: %s", e)
+        await self._submit_order(
+            query.message, update.effective_chat.id, update_id, exchange_name, symbol, side, amount, price
+        )
+
     async def get_positions(self, update: Update, context: CallbackContext):
         """Get open positions"""
         if update.effective_user.id not in self.allowed_users:
             return
             
-        self.logger.info(f"Positions request from {update.effective_user.id}")
+        self.logger.info("Positions request from %s", update.effective_user.id)
         
         try:
-            exchange_name = context.args[0] if context.args else None
-            self.logger.debug(f"Getting positions for {exchange_name or 'all exchanges'}")
+            exchange_name = self._exchange_arg(context.args[0]) if context.args else None
+            self.logger.debug("Getting positions for %s", exchange_name or 'all exchanges')
             
-            positions = await self.trade_manager.get_open_positions(exchange_name)
+            positions = self.trade_manager.position_manager.get_summaries(exchange_name)
             
-            self.logger.debug(f"Found {len(positions)} positions")
-            await update.message.reply_text(
-                self.message_handler.get_message('positions').format(
-                    exchange=exchange_name or 'all',
-                    positions="\n".join([str(p) for p in positions]) if positions else "None"
-                )
-            )
+            self.logger.debug("Found %s positions", len(positions))
+            rows = []
+            for position in positions:
+                last = self.ticker_cache.get_price(position['exchange'], position['symbol'])
+                pnl = None
+                if last and position['entry'] and position['amount']:
+                    sign = 1 if position['side'] == 'buy' else -1
+                    pnl = round((last - position['entry']) * position['amount'] * sign, 2)
+                rows.append([position['exchange'], position['symbol'], position['side'], position['amount'],
+                             position['entry'], last, pnl])
+            title = self.message_handler.get_message('positions', exchange=exchange_name or 'all', count=len(rows))
+            if not rows:
+                await update.message.reply_text(title)
+                return
+            headers = self.message_handler.get_message('positions_headers').split(',')
+            await self._reply_pages(update, paginate(title, headers, rows))
         except Exception as e:
-            self.logger.error(f"Error getting positions: {str(e)}", exc_info=True)
+            self.logger.error("Error getting positions: %s", e, exc_info=True)
             await update.message.reply_text(
                 self.message_handler.get_message('error').format(error=str(e))
             )
@@ -204,10 +411,10 @@ class TelegramBot:
         if update.effective_user.id not in self.allowed_users:
             return
             
-        self.logger.info(f"Balance request from {update.effective_user.id}")
+        self.logger.info("Balance request from %s", update.effective_user.id)
         
         try:
-            exchange_name = context.args[0] if context.args else None
+            exchange_name = self._exchange_arg(context.args[0]) if context.args else None
             if not exchange_name:
                 self.logger.warning("No exchange specified for balance request")
                 await update.message.reply_text(
@@ -215,34 +422,236 @@ class TelegramBot:
                 )
                 return
             
-            self.logger.debug(f"Getting balance for {exchange_name}")
+            self.logger.debug("Getting balance for %s", exchange_name)
             balance = await self.exchange_manager.get_balance(exchange_name)
             
-            self.logger.info(f"Balance retrieved for {exchange_name}")
+            self.logger.info("Balance retrieved for %s", exchange_name)
+            free = balance.get('free') or {}
+            used = balance.get('used') or {}
+            rows = [
+                [asset, total, free.get(asset) or 0.0, used.get(asset) or 0.0]
+                for asset, total in sorted((balance.get('total') or {}).items()) if total
+            ]
+            title = self.message_handler.get_message('balance', exchange=exchange_name)
+            if not rows:
+                await update.message.reply_text(f"{title}\n-")
+                return
+            headers = self.message_handler.get_message('balance_headers').split(',')
+            await self._reply_pages(update, paginate(title, headers, rows))
+        except Exception as e:
+            self.logger.error("Error getting balance: %s", e, exc_info=True)
             await update.message.reply_text(
-                self.message_handler.get_message('balance').format(
-                    exchange=exchange_name,
-                    free=balance['free'],
-                    currency=balance['info']['asset']
+                self.message_handler.get_message('error').format(error=str(e))
+            )
+
+    async def get_portfolio(self, update: Update, context: CallbackContext):
+        """Valuation of every alias in the quote currency"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("Portfolio request from %s", update.effective_user.id)
+
+        try:
+            report = await self.portfolio.snapshot()
+            quote = report['quote']
+            aliases = "\n".join(f"{name}: {value:,.2f} {quote}" for name, value in report['aliases'].items())
+            title = self.message_handler.get_message(
+                'portfolio', total=f"{report['total']:,.2f}", quote=quote, aliases=aliases or "-",
+                pnl=f"{report['unrealized_pnl']:+,.2f}"
+            )
+            if report['unpriced']:
+                title += "\n" + self.message_handler.get_message(
+                    'portfolio_unpriced', assets=", ".join(report['unpriced'])
                 )
+            for name, error in report['errors'].items():
+                title += "\n" + self.message_handler.get_message('portfolio_error', exchange=name, error=error)
+            total = report['total'] or 1.0
+            rows = [
+                [item['asset'], item['amount'], round(item['value'], 2), round(item['value'] / total * 100, 1)]
+                for item in report['assets']
+            ]
+            headers = self.message_handler.get_message('portfolio_headers').split(',')
+            await self._reply_pages(update, paginate(title, headers, rows))
+        except Exception as e:
+            self.logger.error("Error building portfolio: %s", e, exc_info=True)
+            await update.message.reply_text(
+                self.message_handler.get_message('error', error=str(e))
+            )
+
+    def _format_opportunity(self, opportunity: Dict[str, Any]) -> str:
+        if opportunity['kind'] == SPREAD:
+            return self.message_handler.get_message(
+                'scan_spread', pair=opportunity['pair'], buy=opportunity['buy'], ask=opportunity['ask'],
+                sell=opportunity['sell'], bid=opportunity['bid'], spread=opportunity['value']
             )
+        return self.message_handler.get_message(
+            'scan_funding', pair=opportunity['pair'], long=opportunity['long'], long_rate=opportunity['long_rate'],
+            short=opportunity['short'], short_rate=opportunity['short_rate'], diff=opportunity['value']
+        )
+
+    async def scan(self, update: Update, context: CallbackContext):
+        """Ranks cross-exchange price spreads and funding differences for the watchlist"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        symbols = context.args or self.scanner.symbols
+        if not symbols:
+            await update.message.reply_text(self.message_handler.get_message('scan_usage'))
+            return
+
+        self.logger.info("Scan request from %s: %s", update.effective_user.id, symbols)
+        try:
+            report = await self.scanner.scan(symbols)
+            lines = [self.message_handler.get_message('scan_header', pairs=report['pairs'],
+                                                      exchanges=report['exchanges'])]
+            lines += [self._format_opportunity(o) for o in report['spreads'][:10]]
+            lines += [self._format_opportunity(o) for o in report['funding'][:10]]
+            if len(lines) == 1:
+                lines.append(self.message_handler.get_message('scan_empty'))
+            for name, error in report['errors'].items():
+                lines.append(self.message_handler.get_message('portfolio_error', exchange=name, error=error))
+            await update.message.reply_text("\n".join(lines))
         except Exception as e:
-            self.logger.error(f"Error getting balance: {str(e)}", exc_info=True)
+            self.logger.error("Error running scan: %s", e, exc_info=True)
             await update.message.reply_text(
-                self.message_handler.get_message('error').format(error=str(e))
+                self.message_handler.get_message('error', error=str(e))
             )
 
+    async def export_history(self, update: Update, context: CallbackContext):
+        """Sends the trade or position history as a compressed CSV or Parquet file"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        args = context.args
+        if not args or args[0].lower() not in EXPORT_TABLES:
+            await update.message.reply_text(self.message_handler.get_message('export_usage'))
+            return
+
+        table, fmt, dates, exchange_name = args[0].lower(), 'csv', [], None
+        for arg in args[1:]:
+            if arg.lower() in FORMATS:
+                fmt = arg.lower()
+            elif re.fullmatch(r'\d{4}-\d{2}-\d{2}', arg):
+                dates.append(arg)
+            else:
+                exchange_name = arg
+        if len(dates) > 2:
+            await update.message.reply_text(self.message_handler.get_message('export_usage'))
+            return
+        if fmt == PARQUET and not self.history_exporter.parquet_available():
+            await update.message.reply_text(self.message_handler.get_message('export_parquet_unavailable'))
+            return
+
+        self.logger.info("Export request from %s: %s", update.effective_user.id, args)
+        try:
+            since, until = day_bounds(*(dates + [None, None])[:2])
+            # Az ideiglenes könyvtár a küldés után törlődik
+            with tempfile.TemporaryDirectory(prefix='telex_export_') as directory:
+                path, count = await self.history_exporter.export(table, directory, fmt, since, until, exchange_name)
+                if not count:
+                    await update.message.reply_text(self.message_handler.get_message('export_empty'))
+                    return
+                if path.stat().st_size > 50 * 1024 * 1024:
+                    await update.message.reply_text(self.message_handler.get_message('export_too_large'))
+                    return
+                with open(path, 'rb') as f:
+                    await update.message.reply_document(
+                        document=f, filename=path.name,
+                        caption=self.message_handler.get_message('export_done', table=table, count=count)
+                    )
+        except ValueError as e:
+            await update.message.reply_text(self.message_handler.get_message('error', error=str(e)))
+        except Exception as e:
+            self.logger.error("Error exporting %s: %s", table, e, exc_info=True)
+            await update.message.reply_text(
+                self.message_handler.get_message('error', error=str(e))
+            )
+
+    def _page_markup(self, token: str, page: int, count: int) -> Optional[InlineKeyboardMarkup]:
+        if count <= 1:
+            return None
+        buttons = []
+        if page > 0:
+            buttons.append(InlineKeyboardButton("◀️", callback_data=f"page:{token}:{page - 1}"))
+        buttons.append(InlineKeyboardButton(f"{page + 1}/{count}", callback_data=f"page:{token}:{page}"))
+        if page < count - 1:
+            buttons.append(InlineKeyboardButton("▶️", callback_data=f"page:{token}:{page + 1}"))
+        return InlineKeyboardMarkup([buttons])
+
+    async def _reply_pages(self, update: Update, pages: List[str]):
+        """Sends the first page; further pages are served from the cache by page_callback"""
+        token = self.page_cache.store(update.effective_chat.id, pages) if len(pages) > 1 else ''
+        await update.message.reply_text(
+            pages[0], parse_mode='HTML', reply_markup=self._page_markup(token, 0, len(pages))
+        )
+
+    async def page_callback(self, update: Update, context: CallbackContext):
+        """Inline keyboard paging: edits the message in place with a cached page"""
+        query = update.callback_query
+        if update.effective_user.id not in self.allowed_users:
+            await query.answer()
+            return
+
+        try:
+            _, token, page = query.data.split(':')
+            page = int(page)
+        except ValueError:
+            await query.answer()
+            return
+        pages = self.page_cache.get(update.effective_chat.id, token)
+        if pages is None:
+            await query.answer(self.message_handler.get_message('page_expired'), show_alert=True)
+            return
+
+        page = max(0, min(page, len(pages) - 1))
+        await query.answer()
+        try:
+            await query.edit_message_text(
+                pages[page], parse_mode='HTML', reply_markup=self._page_markup(token, page, len(pages))
+            )
+        except BadRequest as e:
+            # Ugyanarra az oldalra kattintva a Telegram "message is not modified" hibát ad
+            self.logger.debug("Page edit skipped: %s", e)
+
+    async def use_exchange(self, update: Update, context: CallbackContext):
+        """Set the chat's default exchange and mode for /buy and /sell"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("Use request from %s", update.effective_user.id)
+        chat_id = update.effective_chat.id
+        if not context.args:
+            await update.message.reply_text(
+                self.message_handler.get_message(
+                    'use_current', exchange=self.chat_exchanges.get(chat_id, self.default_exchange) or '-'
+                )
+            )
+            return
+
+        mode = context.args[1] if len(context.args) > 1 else None
+        exchange_name = self.exchange_manager.canonical_name(context.args[0], mode)
+        if not exchange_name:
+            await update.message.reply_text(
+                self.message_handler.get_message('use_usage')
+            )
+            return
+
+        self.chat_exchanges[chat_id] = exchange_name
+        await update.message.reply_text(
+            self.message_handler.get_message('use_set', exchange=exchange_name)
+        )
+
     async def add_exchange(self, update: Update, context: CallbackContext):
         """Add new exchange"""
         if update.effective_user.id not in self.allowed_users:
             return
             
-        self.logger.info(f"Add exchange request from {update.effective_user.id}")
+        self.logger.info("Add exchange request from %s", update.effective_user.id)
         
         try:
             args = context.args
             if len(args) < 4:
-                self.logger.warning(f"Insufficient arguments for add_exchange from {update.effective_user.id}")
+                self.logger.warning("Insufficient arguments for add_exchange from %s", update.effective_user.id)
                 await update.message.reply_text(
                     self.message_handler.get_message('add_exchange_usage')
                 )
@@ -260,29 +669,29 @@ class TelegramBot:
                 "enableRateLimit": True
             }
 
-            self.logger.debug(f"Testing connection to {exchange} as {name}")
+            self.logger.debug("Testing connection to %s as %s", exchange, name)
             if not await self.exchange_manager.test_exchange_connection(config):
-                self.logger.warning(f"Failed to connect to exchange {exchange}")
+                self.logger.warning("Failed to connect to exchange %s", exchange)
                 await update.message.reply_text(
                     self.message_handler.get_message('exchange_connection_failed')
                 )
                 return
 
-            self.logger.info(f"Adding exchange {name} ({exchange})")
+            self.logger.info("Adding exchange %s (%s)", name, exchange)
             success = await self.exchange_manager.add_exchange(name, config)
             
             if success:
-                self.logger.info(f"Successfully added exchange {name}")
+                self.logger.info("Successfully added exchange %s", name)
                 await update.message.reply_text(
                     self.message_handler.get_message('exchange_added').format(name=name)
                 )
             else:
-                self.logger.warning(f"Exchange {name} already exists")
+                self.logger.warning("Exchange %s already exists", name)
                 await update.message.reply_text(
                     self.message_handler.get_message('exchange_exists').format(name=name)
                 )
         except Exception as e:
-            self.logger.error(f"Error adding exchange: {str(e)}", exc_info=True)
+            self.logger.error("Error adding exchange: %s", e, exc_info=True)
             await update.message.reply_text(
                 self.message_handler.get_message('error').format(error=str(e))
             )
@@ -292,33 +701,33 @@ class TelegramBot:
         if update.effective_user.id not in self.allowed_users:
             return
             
-        self.logger.info(f"Remove exchange request from {update.effective_user.id}")
+        self.logger.info("Remove exchange request from %s", update.effective_user.id)
         
         try:
             args = context.args
             if len(args) < 1:
-                self.logger.warning(f"Missing exchange name for removal from {update.effective_user.id}")
+                self.logger.warning("Missing exchange name for removal from %s", update.effective_user.id)
                 await update.message.reply_text(
                     self.message_handler.get_message('remove_exchange_usage')
                 )
                 return
 
             name = args[0]
-            self.logger.info(f"Attempting to remove exchange {name}")
+            self.logger.info("Attempting to remove exchange %s", name)
             
             success = await self.exchange_manager.remove_exchange(name)
             if success:
-                self.logger.info(f"Successfully removed exchange {name}")
+                self.logger.info("Successfully removed exchange %s", name)
                 await update.message.reply_text(
                     self.message_handler.get_message('exchange_removed').format(name=name)
                 )
             else:
-                self.logger.warning(f"Exchange {name} not found")
+                self.logger.warning("Exchange %s not found", name)
                 await update.message.reply_text(
                     self.message_handler.get_message('exchange_not_found').format(name=name)
                 )
         except Exception as e:
-            self.logger.error(f"Error removing exchange: {str(e)}", exc_info=True)
+            self.logger.error("Error removing exchange: %s", e, exc_info=True)
             await update.message.reply_text(
                 self.message_handler.get_message('error').format(error=str(e))
             )
@@ -328,7 +737,7 @@ class TelegramBot:
         if update.effective_user.id not in self.allowed_users:
             return
             
-        self.logger.info(f"List exchanges request from {update.effective_user.id}")
+        self.logger.info("List exchanges request from %s", update.effective_user.id)
         
         try:
             exchanges = self.exchange_manager.get_available_exchanges()
@@ -344,20 +753,502 @@ class TelegramBot:
             for name, details in exchanges.items():
                 message += f"\n- {name}: {details.split(' ')[0]}"
 
-            self.logger.debug(f"Returning {len(exchanges)} exchanges")
+            self.logger.debug("Returning %s exchanges", len(exchanges))
             await update.message.reply_text(message)
         except Exception as e:
-            self.logger.error(f"Error listing exchanges: {str(e)}", exc_info=True)
+            self.logger.error("Error listing exchanges: %s", e, exc_info=True)
             await update.message.reply_text(
                 self.message_handler.get_message('error').format(error=str(e))
             )
 
+    async def risk_status(self, update: Update, context: CallbackContext):
+        """Show daily PnL and current exposure per alias"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("Risk status request from %s", update.effective_user.id)
+        status = self.risk_manager.get_status()
+        exposure = "\n".join(
+            f"- {alias}: {value:.2f}" for alias, value in sorted(status['alias_exposure'].items())
+        ) or "None"
+        await update.message.reply_text(
+            self.message_handler.get_message(
+                'risk_status', realized_pnl=round(status['realized_pnl'], 2), exposure=exposure
+            )
+        )
+
+    async def when(self, update: Update, context: CallbackContext):
+        """Place an order once the price crosses a level"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("When command received from %s", update.effective_user.id)
+
+        try:
+            args = context.args
+            if len(args) < 6 or args[2] not in (ABOVE, BELOW) or args[4] not in ('buy', 'sell'):
+                await update.message.reply_text(
+                    self.message_handler.get_message('when_usage')
+                )
+                return
+
+            exchange_name, symbol, direction = self._exchange_arg(args[0]), args[1], args[2]
+            trigger_price = float(args[3])
+            side = args[4]
+            amount = float(args[5])
+            price = float(args[6]) if len(args) > 6 else None
+
+            condition = await self.conditional_orders.place_when(
+                exchange_name, symbol, direction, trigger_price, side, amount, price,
+                client_order_id=make_client_order_id(update.update_id, 'w'),
+                chat_id=update.effective_chat.id
+            )
+            await update.message.reply_text(
+                self.message_handler.get_message(
+                    'condition_added', id=condition.id, exchange=exchange_name, symbol=symbol,
+                    direction=direction, trigger=trigger_price, side=side, amount=amount
+                )
+            )
+        except RiskLimitExceeded as e:
+            self.logger.warning("When command rejected by risk check: %s", e)
+            await update.message.reply_text(
+                self.message_handler.get_message(
+                    'risk_rejected', limit=e.limit, value=round(e.value, 2), maximum=e.maximum
+                )
+            )
+        except Exception as e:
+            self.logger.error("Error in when command: %s", e, exc_info=True)
+            await update.message.reply_text(
+                self.message_handler.get_message('error', error=str(e))
+            )
+
+    async def bracket(self, update: Update, context: CallbackContext):
+        """Entry order with take-profit and stop-loss exits"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("Bracket command received from %s", update.effective_user.id)
+
+        try:
+            args = context.args
+            if len(args) < 6 or args[2] not in ('buy', 'sell'):
+                await update.message.reply_text(
+                    self.message_handler.get_message('bracket_usage')
+                )
+                return
+
+            exchange_name, symbol, side = self._exchange_arg(args[0]), args[1], args[2]
+            amount = float(args[3])
+            take_profit = float(args[4])
+            stop_loss = float(args[5])
+            price = float(args[6]) if len(args) > 6 else None
+
+            reservation = await self.risk_manager.check(exchange_name, symbol, side, amount, price)
+            try:
+                order = await self.conditional_orders.place_bracket(
+                    exchange_name, symbol, side, amount, take_profit, stop_loss, price,
+                    client_order_id=make_client_order_id(update.update_id),
+                    chat_id=update.effective_chat.id
+                )
+            except Exception:
+                self.risk_manager.release(reservation)
+                raise
+            self.risk_manager.attach(reservation, exchange_name, order)
+
+            await update.message.reply_text(
+                self.message_handler.get_message(
+                    'bracket_placed', exchange=exchange_name, symbol=symbol, side=side, amount=amount,
+                    price=price if price else 'market', take_profit=take_profit, stop_loss=stop_loss
+                )
+            )
+        except RiskLimitExceeded as e:
+            self.logger.warning("Bracket command rejected by risk check: %s", e)
+            await update.message.reply_text(
+                self.message_handler.get_message(
+                    'risk_rejected', limit=e.limit, value=round(e.value, 2), maximum=e.maximum
+                )
+            )
+        except Exception as e:
+            self.logger.error("Error in bracket command: %s", e, exc_info=True)
+            await update.message.reply_text(
+                self.message_handler.get_message('error', error=str(e))
+            )
+
+    async def oco(self, update: Update, context: CallbackContext):
+        """Take-profit/stop-loss pair for an existing position, one cancels the other"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("OCO command received from %s", update.effective_user.id)
+
+        try:
+            args = context.args
+            if len(args) < 6 or args[2] not in ('buy', 'sell'):
+                await update.message.reply_text(
+                    self.message_handler.get_message('oco_usage')
+                )
+                return
+
+            exchange_name, symbol, side = self._exchange_arg(args[0]), args[1], args[2]
+            amount = float(args[3])
+            take_profit = float(args[4])
+            stop_loss = float(args[5])
+
+            conditions = self.conditional_orders.add_oco(
+                exchange_name, symbol, side, amount, take_profit, stop_loss,
+                client_order_id=make_client_order_id(update.update_id),
+                chat_id=update.effective_chat.id
+            )
+            await update.message.reply_text(
+                self.message_handler.get_message(
+                    'oco_added', ids=', '.join(c.id for c in conditions), exchange=exchange_name,
+                    symbol=symbol, take_profit=take_profit, stop_loss=stop_loss
+                )
+            )
+        except Exception as e:
+            self.logger.error("Error in oco command: %s", e, exc_info=True)
+            await update.message.reply_text(
+                self.message_handler.get_message('error', error=str(e))
+            )
+
+    async def list_conditions(self, update: Update, context: CallbackContext):
+        """List pending conditional orders"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("Conditions request from %s", update.effective_user.id)
+        try:
+            exchange_name = self._exchange_arg(context.args[0]) if context.args else None
+        except ValueError as e:
+            await update.message.reply_text(self.message_handler.get_message('error', error=str(e)))
+            return
+        conditions = self.conditional_orders.get_conditions(exchange_name)
+        if not conditions:
+            await update.message.reply_text(
+                self.message_handler.get_message('no_conditions')
+            )
+            return
+
+        lines = [
+            f"{c.id}: {c.exchange_name} {c.symbol} {c.direction} {c.trigger_price} -> "
+            f"{c.side} {c.amount} {c.price or 'market'} ({c.kind}, {c.status})"
+            for c in conditions
+        ]
+        await update.message.reply_text(
+            self.message_handler.get_message('conditions', conditions="\n".join(lines))
+        )
+
+    async def cancel_condition(self, update: Update, context: CallbackContext):
+        """Cancel a conditional order (and its OCO sibling)"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("Cancel condition request from %s", update.effective_user.id)
+
+        try:
+            if not context.args:
+                await update.message.reply_text(
+                    self.message_handler.get_message('cancel_condition_usage')
+                )
+                return
+
+            condition_id = context.args[0]
+            if await self.conditional_orders.cancel(condition_id):
+                await update.message.reply_text(
+                    self.message_handler.get_message('condition_canceled', id=condition_id)
+                )
+            else:
+                await update.message.reply_text(
+                    self.message_handler.get_message('condition_not_found', id=condition_id)
+                )
+        except Exception as e:
+            self.logger.error("Error canceling condition: %s", e, exc_info=True)
+            await update.message.reply_text(
+                self.message_handler.get_message('error', error=str(e))
+            )
+
+    async def alert(self, update: Update, context: CallbackContext):
+        """Create a price level or percentage-move alert"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("Alert command received from %s", update.effective_user.id)
+
+        try:
+            args = context.args
+            if len(args) < 4 or args[2] not in (ABOVE, BELOW, 'move'):
+                await update.message.reply_text(
+                    self.message_handler.get_message('alert_usage')
+                )
+                return
+
+            exchange_name, symbol, direction = self._exchange_arg(args[0]), args[1], args[2]
+            value = float(args[3].rstrip('%'))
+            chat_id = update.effective_chat.id
+            if direction == 'move':
+                alert = await self.alert_manager.add_percent_alert(chat_id, exchange_name, symbol, value)
+                condition = f"±{value}% ({alert['reference_price']})"
+            else:
+                alert = self.alert_manager.add_price_alert(chat_id, exchange_name, symbol, direction, value)
+                condition = f"{direction} {value}"
+
+            await update.message.reply_text(
+                self.message_handler.get_message(
+                    'alert_added', id=alert['id'], exchange=exchange_name, symbol=symbol, condition=condition
+                )
+            )
+        except ValueError as e:
+            await update.message.reply_text(self.message_handler.get_message('error', error=str(e)))
+        except Exception as e:
+            self.logger.error("Error in alert command: %s", e, exc_info=True)
+            await update.message.reply_text(
+                self.message_handler.get_message('error', error=str(e))
+            )
+
+    async def list_alerts(self, update: Update, context: CallbackContext):
+        """List active alerts of the chat"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("Alerts request from %s", update.effective_user.id)
+        alerts = self.alert_manager.get_alerts(update.effective_chat.id)
+        if not alerts:
+            await update.message.reply_text(
+                self.message_handler.get_message('no_alerts')
+            )
+            return
+
+        lines = []
+        for alert in alerts:
+            if alert['kind'] == PERCENT:
+                condition = f"±{alert['percent']}% ({alert['reference_price']})"
+            else:
+                condition = f"{alert['direction']} {alert['price']}"
+            lines.append(f"#{alert['id']}: {alert['exchange']} {alert['symbol']} {condition}")
+        await update.message.reply_text(
+            self.message_handler.get_message('alerts', alerts="\n".join(lines))
+        )
+
+    async def unalert(self, update: Update, context: CallbackContext):
+        """Delete an alert"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("Unalert request from %s", update.effective_user.id)
+
+        try:
+            if not context.args:
+                await update.message.reply_text(
+                    self.message_handler.get_message('unalert_usage')
+                )
+                return
+
+            alert_id = int(context.args[0].lstrip('#'))
+            if self.alert_manager.remove_alert(alert_id, update.effective_chat.id):
+                await update.message.reply_text(
+                    self.message_handler.get_message('alert_removed', id=alert_id)
+                )
+            else:
+                await update.message.reply_text(
+                    self.message_handler.get_message('alert_not_found', id=alert_id)
+                )
+        except Exception as e:
+            self.logger.error("Error removing alert: %s", e, exc_info=True)
+            await update.message.reply_text(
+                self.message_handler.get_message('error', error=str(e))
+            )
+
+    async def indicator(self, update: Update, context: CallbackContext):
+        """Compute an indicator (sma, ema, atr) from the buffered candles"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("Indicator request from %s", update.effective_user.id)
+
+        try:
+            args = context.args
+            if len(args) < 5 or args[3].lower() not in ('sma', 'ema', 'atr'):
+                await update.message.reply_text(
+                    self.message_handler.get_message('indicator_usage')
+                )
+                return
+
+            exchange_name, symbol, timeframe = self._exchange_arg(args[0]), args[1], args[2]
+            name, period = args[3].lower(), int(args[4])
+            value = await self.ohlcv_store.indicator(exchange_name, symbol, timeframe, name, period)
+            if value is None:
+                await update.message.reply_text(
+                    self.message_handler.get_message('indicator_no_data', period=period)
+                )
+                return
+
+            await update.message.reply_text(
+                self.message_handler.get_message(
+                    'indicator', exchange=exchange_name, symbol=symbol, timeframe=timeframe,
+                    indicator=f"{name.upper()}({period})", value=f"{value:.8g}"
+                )
+            )
+        except Exception as e:
+            self.logger.error("Error computing indicator: %s", e, exc_info=True)
+            await update.message.reply_text(
+                self.message_handler.get_message('error', error=str(e))
+            )
+
+    async def twap(self, update: Update, context: CallbackContext):
+        """Work an order in equal time slices"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("TWAP command received from %s", update.effective_user.id)
+
+        try:
+            args = context.args
+            if len(args) < 6 or args[2] not in ('buy', 'sell'):
+                await update.message.reply_text(
+                    self.message_handler.get_message('twap_usage')
+                )
+                return
+
+            exchange_name, symbol, side = self._exchange_arg(args[0]), args[1], args[2]
+            amount, minutes, slices = float(args[3]), float(args[4]), int(args[5])
+            price = float(args[6]) if len(args) > 6 else None
+            parent = self.execution.start_twap(
+                exchange_name, symbol, side, amount, minutes * 60, slices, price,
+                client_order_id=make_client_order_id(update.update_id),
+                chat_id=update.effective_chat.id
+            )
+            await update.message.reply_text(
+                self.message_handler.get_message(
+                    'algo_started', id=parent.id, kind='TWAP', exchange=exchange_name, symbol=symbol,
+                    side=side, amount=amount
+                )
+            )
+        except Exception as e:
+            self.logger.error("Error in twap command: %s", e, exc_info=True)
+            await update.message.reply_text(
+                self.message_handler.get_message('error', error=str(e))
+            )
+
+    async def iceberg(self, update: Update, context: CallbackContext):
+        """Limit order showing only a part of its size at a time"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("Iceberg command received from %s", update.effective_user.id)
+
+        try:
+            args = context.args
+            if len(args) < 6 or args[2] not in ('buy', 'sell'):
+                await update.message.reply_text(
+                    self.message_handler.get_message('iceberg_usage')
+                )
+                return
+
+            exchange_name, symbol, side = self._exchange_arg(args[0]), args[1], args[2]
+            amount, price, visible = float(args[3]), float(args[4]), float(args[5])
+            parent = self.execution.start_iceberg(
+                exchange_name, symbol, side, amount, price, visible,
+                client_order_id=make_client_order_id(update.update_id),
+                chat_id=update.effective_chat.id
+            )
+            await update.message.reply_text(
+                self.message_handler.get_message(
+                    'algo_started', id=parent.id, kind='Iceberg', exchange=exchange_name, symbol=symbol,
+                    side=side, amount=amount
+                )
+            )
+        except Exception as e:
+            self.logger.error("Error in iceberg command: %s", e, exc_info=True)
+            await update.message.reply_text(
+                self.message_handler.get_message('error', error=str(e))
+            )
+
+    async def scaled(self, update: Update, context: CallbackContext):
+        """Ladder of limit orders between two prices"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("Scaled command received from %s", update.effective_user.id)
+
+        try:
+            args = context.args
+            if len(args) < 7 or args[2] not in ('buy', 'sell'):
+                await update.message.reply_text(
+                    self.message_handler.get_message('scaled_usage')
+                )
+                return
+
+            exchange_name, symbol, side = self._exchange_arg(args[0]), args[1], args[2]
+            amount, low, high, count = float(args[3]), float(args[4]), float(args[5]), int(args[6])
+            parent = self.execution.start_scaled(
+                exchange_name, symbol, side, amount, min(low, high), max(low, high), count,
+                client_order_id=make_client_order_id(update.update_id),
+                chat_id=update.effective_chat.id
+            )
+            await update.message.reply_text(
+                self.message_handler.get_message(
+                    'algo_started', id=parent.id, kind='Scaled', exchange=exchange_name, symbol=symbol,
+                    side=side, amount=amount
+                )
+            )
+        except Exception as e:
+            self.logger.error("Error in scaled command: %s", e, exc_info=True)
+            await update.message.reply_text(
+                self.message_handler.get_message('error', error=str(e))
+            )
+
+    async def list_algos(self, update: Update, context: CallbackContext):
+        """List running execution algorithms"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("Algos request from %s", update.effective_user.id)
+        parents = self.execution.get_parents()
+        if not parents:
+            await update.message.reply_text(
+                self.message_handler.get_message('no_algos')
+            )
+            return
+
+        lines = [
+            f"{p.id}: {p.kind} {p.exchange_name} {p.symbol} {p.side} {p.filled:.8g}/{p.amount:.8g}"
+            for p in parents
+        ]
+        await update.message.reply_text(
+            self.message_handler.get_message('algos', algos="\n".join(lines))
+        )
+
+    async def cancel_algo(self, update: Update, context: CallbackContext):
+        """Stop an execution algorithm and cancel its open child orders"""
+        if update.effective_user.id not in self.allowed_users:
+            return
+
+        self.logger.info("Cancel algo request from %s", update.effective_user.id)
+
+        try:
+            if not context.args:
+                await update.message.reply_text(
+                    self.message_handler.get_message('cancel_algo_usage')
+                )
+                return
+
+            parent_id = context.args[0]
+            if not await self.execution.cancel(parent_id):
+                await update.message.reply_text(
+                    self.message_handler.get_message('algo_not_found', id=parent_id)
+                )
+        except Exception as e:
+            self.logger.error("Error canceling algo: %s", e, exc_info=True)
+            await update.message.reply_text(
+                self.message_handler.get_message('error', error=str(e))
+            )
+
     async def handle_message(self, update: Update, context: CallbackContext):
         """Handle non-command messages"""
         if update.effective_user.id not in self.allowed_users:
             return
             
-        self.logger.debug(f"Non-command message from {update.effective_user.id}: {update.message.text}")
+        self.logger.debug("Non-command message from %s: %s", update.effective_user.id, update.message.text)
         await update.message.reply_text(
             self.message_handler.get_message('invalid_command')
         )
@@ -367,19 +1258,106 @@ class TelegramBot:
         if update.effective_user.id not in self.allowed_users:
             return
             
-        self.logger.debug(f"Ping request from {update.effective_user.id}")
-        await update.message.reply_text(
-            self.message_handler.get_message('ping_response')
+        self.logger.debug("Ping request from %s", update.effective_user.id)
+        lines = [self.message_handler.get_message('ping_response')] + self.heartbeat.endpoint_lines()
+        await update.message.reply_text("\n".join(lines))
+
+    async def _notify_order_update(self, tracked: TrackedOrder, previous_state: str):
+        """Notifies the chat that placed an order about its state transitions"""
+        chat_id = tracked.tags.get('chat_id')
+        if chat_id is None:
+            return
+
+        order = tracked.order
+        if tracked.state == FILLED:
+            text = self.message_handler.get_message(
+                'order_filled',
+                exchange=tracked.exchange_name,
+                symbol=order.get('symbol'),
+                side=order.get('side'),
+                amount=order.get('filled') or order.get('amount'),
+                price=order.get('average') or order.get('price')
+            )
+        elif tracked.state == PARTIALLY_FILLED:
+            text = self.message_handler.get_message(
+                'order_partially_filled',
+                exchange=tracked.exchange_name,
+                symbol=order.get('symbol'),
+                side=order.get('side'),
+                filled=order.get('filled'),
+                amount=order.get('amount')
+            )
+        else:
+            text = self.message_handler.get_message(
+                'order_closed',
+                exchange=tracked.exchange_name,
+                symbol=order.get('symbol'),
+                side=order.get('side'),
+                amount=order.get('amount'),
+                state=tracked.state
+            )
+
+        try:
+            await self.app.bot.send_message(chat_id=chat_id, text=text)
+        except Exception as e:
+            self.logger.error("Failed to send order notification to %s: %s", chat_id, e)
+
+    async def _notify_condition(self, condition: ConditionalOrder, event: str, detail: str):
+        """Notifies the chat that created a condition when it fires or fails"""
+        if condition.chat_id is None:
+            return
+
+        key = {TRIGGERED: 'condition_triggered', REARMED: 'condition_rearmed'}.get(event, 'condition_failed')
+        text = self.message_handler.get_message(
+            key, id=condition.id, exchange=condition.exchange_name, symbol=condition.symbol,
+            side=condition.side, amount=condition.amount, detail=detail
         )
+        try:
+            await self.app.bot.send_message(chat_id=condition.chat_id, text=text)
+        except Exception as e:
+            self.logger.error("Failed to send condition notification to %s: %s", condition.chat_id, e)
+
+    async def _notify_execution(self, parent: ParentOrder, event: str):
+        """Reports execution progress in 25% steps and the final outcome"""
+        if parent.chat_id is None:
+            return
+
+        percent = parent.filled / parent.amount * 100 if parent.amount else 0.0
+        if event == 'progress':
+            step = int(percent // 25)
+            if step <= self._algo_progress.get(parent.id, 0):
+                return
+            self._algo_progress[parent.id] = step
+            key = 'algo_progress'
+        else:
+            self._algo_progress.pop(parent.id, None)
+            key = {DONE: 'algo_done', ALGO_CANCELED: 'algo_canceled'}.get(event, 'algo_failed')
 
-    async def _idle(self):
-        """Egyszerű ébren tartó ciklus"""
+        text = self.message_handler.get_message(
+            key, id=parent.id, symbol=parent.symbol, filled=f"{parent.filled:.8g}",
+            amount=f"{parent.amount:.8g}", percent=f"{percent:.0f}", error=parent.error
+        )
         try:
-            while True:
-                await asyncio.sleep(3600)
-        except asyncio.CancelledError:
-            pass
-                
+            await self.app.bot.send_message(chat_id=parent.chat_id, text=text)
+        except Exception as e:
+            self.logger.error("Failed to send execution update to %s: %s", parent.chat_id, e)
+
+    async def _notify_alert(self, alert: Dict[str, Any], price: float):
+        """Sends a triggered alert to the chat that created it"""
+        text = self.message_handler.get_message(
+            'alert_triggered', id=alert['id'], exchange=alert['exchange'], symbol=alert['symbol'], price=price
+        )
+        try:
+            await self.app.bot.send_message(chat_id=alert['chat_id'], text=text)
+        except Exception as e:
+            self.logger.error("Failed to send alert to %s: %s", alert['chat_id'], e)
+
+    async def _notify_scanner(self, opportunities: List[Dict[str, Any]]):
+        """Pushes new above-threshold scanner results to every allowed user"""
+        lines = [self.message_handler.get_message('scan_alert')]
+        lines += [self._format_opportunity(o) for o in opportunities]
+        await self.heartbeat.broadcast("\n".join(lines))
+
     async def run(self):
         """Run the bot"""
         try:
@@ -389,9 +1367,21 @@ class TelegramBot:
             await self.app.initialize()
             await self.app.start()
             
+            # Leállításkor mentett állapot visszatöltése (pozíciók, nyitott és feltételes orderek, piacok)
+            self.state_store.load(
+                self.exchange_manager, self.trade_manager, self.risk_manager,
+                self.conditional_orders, self.execution
+            )
+
+            # Mentett riasztások betöltése, közös ticker előfizetésekkel
+            self.alert_manager.load()
+
             # Heartbeat indítása
             await self.heartbeat.send_startup_message()
             self.heartbeat_task = asyncio.create_task(self.heartbeat.start())
+            self.order_tracker_task = asyncio.create_task(self.trade_manager.order_tracker.start())
+            self.endpoint_prober_task = asyncio.create_task(self.endpoint_prober.start())
+            self.scanner_task = asyncio.create_task(self.scanner.start())
 
             # Polling indítása külön taskként
             self.polling_task = asyncio.create_task(
@@ -407,31 +1397,82 @@ class TelegramBot:
         except asyncio.CancelledError:
             self.logger.info("Bot shutdown initiated")
         except Exception as e:
-            self.logger.critical(f"Unexpected error: {str(e)}", exc_info=True)
+            self.logger.critical("Unexpected error: %s", e, exc_info=True)
         finally:
-            self.logger.info("Shutting down bot...")
-            await self.heartbeat.stop()
-            
-            # Taskok leállítása
-            if hasattr(self, 'polling_task'):
-                self.polling_task.cancel()
-                try:
-                    await self.polling_task
-                except asyncio.CancelledError:
-                    pass
-                    
-            if hasattr(self, 'heartbeat_task'):
-                self.heartbeat_task.cancel()
-                try:
-                    await self.heartbeat_task
-                except asyncio.CancelledError:
-                    pass
-                    
-            # App leállítása
+            await self.shutdown()
+
+    async def _cancel_task(self, name: str):
+        task = getattr(self, name, None)
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def shutdown(self):
+        """Bounded shutdown: stop intake, drain commands, persist state, close sessions"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.shutdown_timeout
+        # A végső lépésekre (értesítés, session zárás) mindig marad idő
+        reserve = min(2.0, self.shutdown_timeout / 4)
+        self.logger.info("Shutting down bot (deadline %.1fs)...", self.shutdown_timeout)
+
+        # 1. Új parancsok elutasítása, polling leállítása
+        self.accepting_commands = False
+        await self._cancel_task('polling_task')
+        try:
             if hasattr(self.app, 'updater') and self.app.updater.running:
                 await self.app.updater.stop()
+        except Exception as e:
+            self.logger.warning("Error stopping updater: %s", e)
+
+        # 2. Futó parancsok (order beküldések) befejezése
+        try:
+            await asyncio.wait_for(self._idle_event.wait(), max(0.0, deadline - reserve - loop.time()))
+        except asyncio.TimeoutError:
+            self.logger.warning("Shutdown deadline reached with %s commands in flight", self._inflight)
+
+        # 3. Háttérfolyamatok leállítása
+        await self.heartbeat.stop(notify=False)
+        await self._cancel_task('heartbeat_task')
+        self.trade_manager.order_tracker.stop()
+        await self._cancel_task('order_tracker_task')
+        self.endpoint_prober.stop()
+        await self._cancel_task('endpoint_prober_task')
+        self.scanner.stop()
+        await self._cancel_task('scanner_task')
+        await self.execution.stop()
+        self.ohlcv_store.stop()
+        await self.ticker_cache.stop()
+
+        # 4. Állapot mentése a következő indításhoz
+        self.state_store.save(
+            self.exchange_manager, self.trade_manager, self.risk_manager,
+            self.conditional_orders, self.execution
+        )
+        await self.trade_recorder.close()
+        self.db_handler.close()
+
+        # 5. Értesítések és exchange sessionök zárása párhuzamosan, a határidőn belül
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    self.heartbeat.send_shutdown_notification(),
+                    self.exchange_manager.close_all(),
+                    return_exceptions=True
+                ),
+                max(0.1, deadline - loop.time())
+            )
+        except asyncio.TimeoutError:
+            self.logger.warning("Shutdown deadline reached before notifications and sessions completed")
+
+        # App leállítása
+        try:
             if hasattr(self.app, 'running') and self.app.running:
                 await self.app.stop()
             if hasattr(self.app, 'shutdown'):
                 await self.app.shutdown()
-            self.logger.info("Bot shutdown completed")
\ No newline at end of file
+        except Exception as e:
+            self.logger.warning("Error stopping application: %s", e)
+        self.logger.info("Bot shutdown completed")
\ No newline at end of file
@@ -0,0 +1,283 @@
+"""
+Trade History - Fill recording and streaming exports
+Fills are stored per order as deltas of the cumulative filled amount, written
+in batches off the event loop; exports stream rows from SQLite in chunks into
+compressed CSV or Parquet files, so memory use does not grow with the size of
+the history
+"""
+import asyncio
+import csv
+import gzip
+import logging
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from database.db_handler import DatabaseHandler
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # a Parquet export opcionális
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+CSV = 'csv'
+PARQUET = 'parquet'
+FORMATS = (CSV, PARQUET)
+
+# Exportálható táblák; mindkettő a timestamp és az (exchange, timestamp) indexen szűrhető
+# (positions: nyitáskori timestamp, lezárt pozícióknál closed_at)
+EXPORT_TABLES = ('trades', 'positions')
+
+def _utc_datetime(timestamp_ms: Optional[float]) -> str:
+    """SQLite CURRENT_TIMESTAMP compatible UTC string"""
+    seconds = timestamp_ms / 1000 if timestamp_ms else time.time()
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+class TradeRecorder:
+    """Writes new fills of tracked orders to the trades table and position changes to the positions table
+
+    record(), record_position() and record_alert_triggered() only queue the change;
+    queued changes are written in batches on a worker thread with its own connection.
+    """
+
+    def __init__(self, db_path: str):
+        self.db = DatabaseHandler(db_path, check_same_thread=False)
+        self._recorded: Dict[Tuple[str, str], Tuple[float, float, float]] = {}  # {(alias, order_id): (amount, cost, fee)}
+        self._queue: List[Tuple[str, Dict[str, Any]]] = []
+        self._position_queue: List[Tuple[str, Dict[str, Any], bool]] = []
+        self._alert_queue: List[int] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def record(self, exchange_name: str, order: Dict[str, Any]):
+        """Queues an order snapshot; safe to call repeatedly with the same snapshot"""
+        self._queue.append((exchange_name, dict(order)))
+        self._schedule_flush()
+
+    def record_position(self, exchange_name: str, order: Dict[str, Any], closed: bool = False):
+        """Queues a position opened, updated or closed by PositionManager"""
+        self._position_queue.append((exchange_name, dict(order), closed))
+        self._schedule_flush()
+
+    def record_alert_triggered(self, alert_id: int):
+        """Queues the deactivation of a fired alert, so the ticker fan-out does not wait for SQLite"""
+        self._alert_queue.append(alert_id)
+        self._schedule_flush()
+
+    def _take(self) -> Tuple[List[Tuple[str, Dict[str, Any]]], List[Tuple[str, Dict[str, Any], bool]], List[int]]:
+        batches = (self._queue, self._position_queue, self._alert_queue)
+        self._queue, self._position_queue, self._alert_queue = [], [], []
+        return batches
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+            except RuntimeError:
+                # Futó loop nélkül (pl. szkriptből) nincs mit blokkolni, azonnal írunk
+                self._write(*self._take())
+
+    async def flush(self):
+        """Writes queued snapshots until the queues are empty; one batch at a time"""
+        while self._queue or self._position_queue or self._alert_queue:
+            await asyncio.to_thread(self._write, *self._take())
+
+    async def close(self):
+        if self._flush_task:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
+        self.db.close()
+
+    def _write(self, fills: List[Tuple[str, Dict[str, Any]]],
+               positions: List[Tuple[str, Dict[str, Any], bool]], alerts: List[int]):
+        if alerts:
+            try:
+                self.db.deactivate_alerts(alerts, triggered=True)
+            except sqlite3.Error as e:
+                logger.error("Failed to deactivate %s triggered alerts: %s", len(alerts), e)
+        if positions:
+            self._write_positions(positions)
+        if fills:
+            self._write_fills(fills)
+
+    def _write_positions(self, positions: List[Tuple[str, Dict[str, Any], bool]]):
+        rows = []
+        for exchange_name, order, closed in positions:
+            filled = order.get('filled') or 0.0
+            if not filled:
+                continue  # teljesülés nélkül lezárt belépő nem pozíció
+            price = order.get('average') or order.get('price')
+            rows.append({
+                'id': f"{exchange_name}:{order['id']}",
+                'exchange': exchange_name,
+                'symbol': order['symbol'],
+                'side': order['side'],
+                'amount': filled,
+                'entry_price': price,
+                'current_price': price,
+                'timestamp': _utc_datetime(order.get('timestamp')),
+                'closed_at': _utc_datetime(None) if closed else None
+            })
+        if rows:
+            try:
+                self.db.upsert_positions(rows)
+            except sqlite3.Error as e:
+                logger.error("Failed to record %s position changes: %s", len(rows), e)
+
+    def _write_fills(self, batch: List[Tuple[str, Dict[str, Any]]]):
+        """Turns snapshots into fill deltas and stores them; the worker thread owns _recorded"""
+        recorded: Dict[Tuple[str, str], Optional[Tuple[float, float, float]]] = {}
+        trades = []
+        for exchange_name, order in batch:
+            key = (exchange_name, order['id'])
+            previous = recorded[key] if key in recorded else self._recorded.get(key)
+            filled = order.get('filled') or 0.0
+            if previous is None:
+                if not filled:
+                    continue
+                # Újraindítás után a már rögzített részt nem írjuk újra
+                previous = tuple(self.db.get_order_fill_totals(exchange_name, order['id']))
+
+            amount = filled - previous[0]
+            fee = ((order.get('fee') or {}).get('cost') or 0.0)
+            if amount > 1e-12:
+                price = order.get('average') or order.get('price')
+                cost = order.get('cost') or (filled * price if price else 0.0)
+                delta_cost = cost - previous[1]
+                if delta_cost > 0:
+                    price = delta_cost / amount
+                trades.append({
+                    'exchange': exchange_name,
+                    'symbol': order['symbol'],
+                    'order_id': order['id'],
+                    'client_order_id': order.get('clientOrderId'),
+                    'side': order['side'],
+                    'amount': amount,
+                    'price': price,
+                    'cost': delta_cost if delta_cost > 0 else None,
+                    'fee': fee - previous[2],
+                    'fee_currency': (order.get('fee') or {}).get('currency'),
+                    'timestamp': _utc_datetime(order.get('lastTradeTimestamp') or order.get('timestamp'))
+                })
+                previous = (filled, max(cost, previous[1]), fee)
+            terminal = order.get('status') in ('closed', 'canceled', 'expired', 'rejected')
+            recorded[key] = None if terminal else previous
+
+        if trades:
+            try:
+                self.db.add_trades(trades)
+            except sqlite3.Error as e:
+                # A következő snapshot ugyanettől az állapottól számol, így a kiesett delta is bekerül
+                logger.error("Failed to record %s fills: %s", len(trades), e)
+                return
+        for key, previous in recorded.items():
+            if previous is None:
+                self._recorded.pop(key, None)
+            else:
+                self._recorded[key] = previous
+
+class HistoryExporter:
+    """Streams a table into a compressed file on a worker thread with its own read-only connection"""
+
+    def __init__(self, db_path: str, chunk_size: int = 5000):
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def parquet_available() -> bool:
+        return pa is not None
+
+    @staticmethod
+    def _where(since: Optional[str], until: Optional[str], exchange: Optional[str]) -> Tuple[str, List[Any]]:
+        """WHERE clause using only index-friendly comparisons"""
+        clauses, params = [], []
+        if exchange:
+            if ':' in exchange:
+                clauses.append('exchange = ?')
+                params.append(exchange)
+            else:
+                # Az alias és minden 'alias:mode' kliense: ';' a ':' utáni karakter, így ez egy index tartomány
+                clauses.append('(exchange = ? OR (exchange >= ? AND exchange < ?))')
+                params += [exchange, f"{exchange}:", f"{exchange};"]
+        if since:
+            clauses.append('timestamp >= ?')
+            params.append(since)
+        if until:
+            clauses.append('timestamp < ?')
+            params.append(until)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def _rows(self, table: str, since: Optional[str], until: Optional[str],
+              exchange: Optional[str]) -> Tuple[List[Tuple[str, str]], Iterator[List[tuple]]]:
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        conn = sqlite3.connect(f"{Path(self.db_path).resolve().as_uri()}?mode=ro", uri=True)
+        columns = [(row[1], (row[2] or '').upper()) for row in conn.execute(f'PRAGMA table_info({table})')]
+        where, params = self._where(since, until, exchange)
+        cursor = conn.execute(f'SELECT * FROM {table}{where} ORDER BY timestamp', params)
+
+        def chunks():
+            try:
+                while True:
+                    rows = cursor.fetchmany(self.chunk_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                conn.close()
+        return columns, chunks()
+
+    @staticmethod
+    def _write_csv(path: Path, columns: List[Tuple[str, str]], chunks: Iterator[List[tuple]]) -> int:
+        count = 0
+        with gzip.open(path, 'wt', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow([name for name, _ in columns])
+            for rows in chunks:
+                writer.writerows(rows)
+                count += len(rows)
+        return count
+
+    @staticmethod
+    def _write_parquet(path: Path, columns: List[Tuple[str, str]], chunks: Iterator[List[tuple]]) -> int:
+        types = {'INTEGER': pa.int64(), 'REAL': pa.float64()}
+        schema = pa.schema([(name, types.get(declared, pa.string())) for name, declared in columns])
+        count = 0
+        # Darabonként egy row group, a memóriában egyszerre csak egy darab van
+        with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+            for rows in chunks:
+                arrays = [
+                    pa.array([row[i] for row in rows], type=field.type) for i, field in enumerate(schema)
+                ]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                count += len(rows)
+        return count
+
+    def export_sync(self, table: str, directory: str, fmt: str = CSV, since: Optional[str] = None,
+                    until: Optional[str] = None, exchange: Optional[str] = None) -> Tuple[Path, int]:
+        if fmt == PARQUET and pa is None:
+            raise RuntimeError("pyarrow is required for Parquet exports")
+        suffix = '.parquet' if fmt == PARQUET else '.csv.gz'
+        path = Path(directory) / f"{table}_{time.strftime('%Y%m%d_%H%M%S')}{suffix}"
+        columns, chunks = self._rows(table, since, until, exchange)
+        writer = self._write_parquet if fmt == PARQUET else self._write_csv
+        count = writer(path, columns, chunks)
+        logger.info("Exported %s %s rows to %s", count, table, path)
+        return path, count
+
+    async def export(self, table: str, directory: str, fmt: str = CSV, since: Optional[str] = None,
+                     until: Optional[str] = None, exchange: Optional[str] = None) -> Tuple[Path, int]:
+        """Writes the export without blocking the event loop; returns the file path and row count"""
+        return await asyncio.to_thread(self.export_sync, table, directory, fmt, since, until, exchange)
+
+def day_bounds(since: Optional[str], until: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Inclusive YYYY-MM-DD dates to half-open SQLite timestamp bounds; raises ValueError on bad dates"""
+    start = datetime.strptime(since, '%Y-%m-%d').strftime('%Y-%m-%d %H:%M:%S') if since else None
+    end = None
+    if until:
+        end = (datetime.strptime(until, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+    return start, end
@@ -3,8 +3,9 @@ Trade Manager - Handles trading operations
 Executes orders and manages positions
 """
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Optional
 from position_manager import PositionManager
+from order_tracker import OrderTracker, TrackedOrder, CANCELED, REJECTED
 from utils.message_handler import MessageHandler
 
 class TradeManager:
@@ -12,30 +13,81 @@ class TradeManager:
         self.exchange_manager = exchange_manager
         self.position_manager = PositionManager()
         self.message_handler = MessageHandler()
+        self.order_tracker = OrderTracker(
+            exchange_manager,
+            poll_interval=exchange_manager.config.get('settings', {}).get('order_poll_interval', 2.0)
+        )
+        self.order_tracker.add_listener(self._on_order_update)
+        self.fill_listeners: List[Callable] = []
+
+    def add_fill_listener(self, callback: Callable):
+        """Registers callback(exchange_name, order) for every placed order and tracked update
+
+        The order carries cumulative fills; consumers keep track of what they already saw.
+        """
+        self.fill_listeners.append(callback)
+
+    def _notify_fill(self, exchange_name: str, order: Dict[str, Any]):
+        for callback in self.fill_listeners:
+            try:
+                callback(exchange_name, order)
+            except Exception as e:
+                logging.error("Fill listener error: %s", e, exc_info=True)
 
-    async def open_position(self, exchange_name: str, symbol: str, side: str, amount: float, price: float = None, params: Dict = None):
+    async def open_position(self, exchange_name: str, symbol: str, side: str, amount: float, price: float = None,
+                            params: Dict = None, client_order_id: str = None, chat_id: int = None):
         order = await self.exchange_manager.create_order(
             exchange_name=exchange_name,
             symbol=symbol,
             side=side,
             amount=amount,
             price=price,
-            params=params
+            params=params,
+            client_order_id=client_order_id
         )
         self.position_manager.add_position(exchange_name, order)
+        self.order_tracker.track(exchange_name, order, chat_id=chat_id, opens_position=True)
         return order
 
-    async def close_position(self, exchange_name: str, symbol: str, side: str, amount: float, price: float = None):
+    async def close_position(self, exchange_name: str, symbol: str, side: str, amount: float, price: float = None,
+                             client_order_id: str = None, chat_id: int = None):
         order = await self.exchange_manager.create_order(
             exchange_name=exchange_name,
             symbol=symbol,
             side=side,
             amount=amount,
-            price=price
+            price=price,
+            client_order_id=client_order_id
         )
         self.position_manager.remove_position(exchange_name, order['id'])
+        self.order_tracker.track(exchange_name, order, chat_id=chat_id)
         return order
 
+    async def place_order(self, exchange_name: str, symbol: str, side: str, amount: float, price: float = None,
+                          params: Dict = None, client_order_id: str = None, chat_id: int = None):
+        """Places and tracks an order without touching stored positions"""
+        order = await self.exchange_manager.create_order(
+            exchange_name=exchange_name,
+            symbol=symbol,
+            side=side,
+            amount=amount,
+            price=price,
+            params=params,
+            client_order_id=client_order_id
+        )
+        self.order_tracker.track(exchange_name, order, chat_id=chat_id)
+        return order
+
+    def _on_order_update(self, tracked: TrackedOrder, previous_state: str):
+        """Keeps stored positions in sync with order fills"""
+        self._notify_fill(tracked.exchange_name, tracked.order)
+        if not tracked.tags.get('opens_position'):
+            return
+        if tracked.state in (CANCELED, REJECTED) and not tracked.order.get('filled'):
+            self.position_manager.remove_position(tracked.exchange_name, tracked.order_id)
+        else:
+            self.position_manager.update_position(tracked.exchange_name, tracked.order)
+
     async def get_open_positions(self, exchange_name: str = None) -> List[Dict[str, Any]]:
         return self.position_manager.get_positions(exchange_name)
 
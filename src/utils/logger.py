@@ -1,43 +1,153 @@
 """
 Logolás kezelése - konzol és fájlba írással
+A rekordok egy QueueHandler-en keresztül háttérszálon kerülnek kiírásra,
+így a naplózás nem blokkolja az eseményhurkot
 """
+import contextvars
+import copy
+import itertools
+import json
 import logging
 import logging.handlers
 import os
+import queue
+import time
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+
+# Parancsonkénti korrelációs azonosító, a TelegramBot handler wrapper állítja be
+correlation_id: contextvars.ContextVar = contextvars.ContextVar('correlation_id', default='-')
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# A ticker- és orderfolyam moduljai, ahol a DEBUG rekordok mintavételezhetők
+HOT_PATH_LOGGERS = (
+    'market_data', 'order_tracker', 'ohlcv_store', 'alert_manager',
+    'conditional_orders', 'execution', 'risk_manager'
+)
+
+_sampled_loggers: List[Tuple[logging.Logger, logging.Filter]] = []
+
+class CorrelationIdFilter(logging.Filter):
+    """Stamps the current correlation id on the record in the caller's context"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+class DebugSamplingFilter(logging.Filter):
+    """Keeps every n-th DEBUG record; other levels always pass"""
+
+    def __init__(self, sample_rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / sample_rate)) if sample_rate > 0 else 0
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG:
+            return True
+        return bool(self.every) and next(self._counter) % self.every == 0
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects (JSON lines)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'logger': record.name,
+            'correlation_id': getattr(record, 'correlation_id', '-'),
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves record formatting to the listener thread
+
+    The standard prepare() runs the full formatter in the caller, which is the
+    cost we want off the event loop. Only the message itself is rendered here,
+    so the listener never reads argument objects (order and ticker dicts) that
+    the event loop may still be changing; filtered records never reach prepare().
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
 def setup_logging(config: Dict[str, Any]):
     """Logolás inicializálása a konfigurációnak megfelelően"""
+    global _listener
+    stop_logging()
+    for sampled_logger, sampling_filter in _sampled_loggers:
+        sampled_logger.removeFilter(sampling_filter)
+    _sampled_loggers.clear()
+
     log_config = config.get('logging', {})
     log_level = getattr(logging, log_config.get('level', 'INFO'))
-    
+
     # Fő logger létrehozása
     logger = logging.getLogger()
     logger.setLevel(log_level)
-    
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
     # Formátum létrehozása
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    
+    if log_config.get('json_format', False):
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - [%(correlation_id)s] %(message)s'
+        )
+
+    handlers = []
+
     # Konzol logolás
     if log_config.get('console_log', True):
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
-    
+        handlers.append(console_handler)
+
     # Fájl logolás
     if log_config.get('file_log', False):
         log_path = log_config.get('file_path', 'logs/bot.log')
-        Path(os.path.dirname(log_path)).mkdir(parents=True, exist_ok=True)
-        
+        Path(os.path.dirname(log_path) or '.').mkdir(parents=True, exist_ok=True)
+
         file_handler = logging.handlers.RotatingFileHandler(
             filename=log_path,
             maxBytes=log_config.get('max_bytes', 1048576),  # 1MB
-            backupCount=log_config.get('backup_count', 5)
+            backupCount=log_config.get('backup_count', 5),
+            encoding='utf-8'
         )
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-    
-    return logger
\ No newline at end of file
+        handlers.append(file_handler)
+
+    # Az eseményhurok csak sorba tesz, a kiírás a listener szálán történik
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationIdFilter())
+    logger.addHandler(queue_handler)
+
+    # Mintavételezés csak a forró útvonalak loggerein, a többi DEBUG rekord mind megmarad
+    sample_rate = log_config.get('debug_sample_rate', 1.0)
+    if sample_rate < 1.0:
+        sampling_filter = DebugSamplingFilter(sample_rate)
+        for name in log_config.get('debug_sample_loggers', HOT_PATH_LOGGERS):
+            sampled_logger = logging.getLogger(name)
+            sampled_logger.addFilter(sampling_filter)
+            _sampled_loggers.append((sampled_logger, sampling_filter))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    return logger
+
+def stop_logging():
+    """Flushes queued records and stops the background listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
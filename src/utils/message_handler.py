@@ -12,11 +12,11 @@ class MessageHandler:
     def __init__(self, language: str = 'hu'):
         self.language = language
         self.messages = self._load_messages()
-        logging.info(f"Loaded messages: {list(self.messages.keys())}")
+        logging.info("Loaded messages: %s", list(self.messages.keys()))
         if not self.messages:
             logging.critical("Nincsenek üzenetek betöltve!")
         else:
-            logging.info(f"Üzenetek betöltve ({len(self.messages)} db) nyelv: {language}")
+            logging.info("Üzenetek betöltve (%s db) nyelv: %s", len(self.messages), language)
 
     def _load_messages(self) -> Dict[str, str]:
         """Üzenetek betöltése a konfigurációs fájlból"""
@@ -29,7 +29,7 @@ class MessageHandler:
             )
             """
             config_path = os.path.join(get_config_path(), 'messages.json')
-            logging.debug(f"Üzenetek betöltése innen: {config_path}")
+            logging.debug("Üzenetek betöltése innen: %s", config_path)
             
             with open(config_path, 'r', encoding='utf-8') as f:
                 messages = json.load(f)
@@ -39,7 +39,7 @@ class MessageHandler:
                 required_keys = ['startup_notification', 'heartbeat', 'welcome']
                 for key in required_keys:
                     if key not in lang_messages:
-                        logging.error(f"Hiányzó kötelező üzenet: {key}")
+                        logging.error("Hiányzó kötelező üzenet: %s", key)
                 
                 return lang_messages
                 
@@ -50,7 +50,7 @@ class MessageHandler:
             logging.error("Érvénytelen JSON formátum!")
             return {}
         except Exception as e:
-            logging.error(f"Váratlan hiba az üzenetek betöltésekor: {str(e)}")
+            logging.error("Váratlan hiba az üzenetek betöltésekor: %s", e)
             return {}
 
     def get_message(self, key: str, **kwargs) -> str:
@@ -63,8 +63,8 @@ class MessageHandler:
         try:
             return message.format(**kwargs)
         except KeyError as e:
-            logging.error(f"Hiányzó paraméter az üzenetben ({key}): {str(e)}")
+            logging.error("Hiányzó paraméter az üzenetben (%s): %s", key, e)
             return f"{message} [Hiányzó: {str(e)}]"
         except Exception as e:
-            logging.error(f"Hiba az üzenet formázásakor ({key}): {str(e)}")
+            logging.error("Hiba az üzenet formázásakor (%s): %s", key, e)
             return message
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Table Renderer - Compact monospace tables split into Telegram-sized pages
+Pages are formatted once and kept in a short-lived per-chat cache, so paging
+through a large book neither refetches nor reformats anything
+"""
+import html
+import itertools
+from typing import Any, List, Optional, Sequence, Tuple
+from utils.ttl_cache import TTLCache
+
+# A Telegram üzenet korlátja 4096 karakter; a maradék a címnek és a lapozó sornak jut
+MESSAGE_LIMIT = 4096
+PAGE_BUDGET = 3500
+PAGE_ROWS = 25
+
+def format_number(value: Any, digits: int = 8) -> str:
+    if value is None or value == '':
+        return '-'
+    if isinstance(value, (int, float)):
+        return f"{value:,.{digits}g}" if abs(value) >= 1 else f"{value:.{digits}g}"
+    return str(value)
+
+def render_rows(headers: Sequence[str], rows: Sequence[Sequence[Any]]) -> Tuple[str, List[str]]:
+    """Aligns cells into fixed-width lines; numeric columns are right-aligned"""
+    cells = [[format_number(value) for value in row] for row in rows]
+    numeric = [
+        all(isinstance(row[i], (int, float)) or row[i] is None for row in rows) if rows else False
+        for i in range(len(headers))
+    ]
+    widths = [max([len(header)] + [len(row[i]) for row in cells]) for i, header in enumerate(headers)]
+
+    def line(values):
+        return " ".join(
+            value.rjust(widths[i]) if numeric[i] else value.ljust(widths[i]) for i, value in enumerate(values)
+        ).rstrip()
+
+    return line(headers), [line(row) for row in cells]
+
+def paginate(title: str, headers: Sequence[str], rows: Sequence[Sequence[Any]],
+             budget: int = PAGE_BUDGET, max_rows: int = PAGE_ROWS) -> List[str]:
+    """HTML pages (parse_mode='HTML') with the title and column header repeated on each page"""
+    header, lines = render_rows(headers, rows)
+    title = html.escape(title)
+    fixed = len(title) + len(header) + len('\n<pre>\n</pre>') + 1
+    pages, current, size = [], [], fixed
+    for text in lines:
+        text = html.escape(text)
+        if current and (size + len(text) + 1 > budget or len(current) >= max_rows):
+            pages.append(current)
+            current, size = [], fixed
+        current.append(text)
+        size += len(text) + 1
+    if current or not pages:
+        pages.append(current)
+    return [f"{title}\n<pre>{html.escape(header)}\n" + "\n".join(page) + "</pre>" for page in pages]
+
+class PageCache:
+    """Rendered pages per chat, addressed by a short token that fits into callback data"""
+
+    def __init__(self, ttl: float = 300.0, maxsize: int = 256):
+        self._pages = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._tokens = itertools.count(1)
+
+    def store(self, chat_id: int, pages: List[str]) -> str:
+        token = format(next(self._tokens), 'x')
+        self._pages[(chat_id, token)] = pages
+        return token
+
+    def get(self, chat_id: int, token: str) -> Optional[List[str]]:
+        return self._pages.get((chat_id, token))
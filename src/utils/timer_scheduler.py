@@ -0,0 +1,92 @@
+"""
+Timer Scheduler - A single task serving a heap of deadlines
+Many pending timers cost one heap entry each instead of one sleeping task each
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class TimerHandle:
+    __slots__ = ('when', 'callback', 'args', 'cancelled')
+
+    def __init__(self, when: float, callback: Callable, args: Tuple[Any, ...]):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class TimerScheduler:
+    """Runs callbacks at loop-time deadlines; coroutine callbacks are spawned as tasks
+
+    The runner task is started lazily by the first call_at() inside a running loop.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, TimerHandle]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._tasks = set()
+
+    def __len__(self) -> int:
+        return sum(1 for _, _, handle in self._heap if not handle.cancelled)
+
+    def call_at(self, when: float, callback: Callable, *args) -> TimerHandle:
+        handle = TimerHandle(when, callback, args)
+        heapq.heappush(self._heap, (when, next(self._seq), handle))
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        elif self._heap[0][2] is handle:
+            # Új legkorábbi határidő: a futó várakozást újra kell számolni
+            self._wakeup.set()
+        return handle
+
+    def call_later(self, delay: float, callback: Callable, *args) -> TimerHandle:
+        return self.call_at(asyncio.get_running_loop().time() + max(0.0, delay), callback, *args)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - loop.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, handle = heapq.heappop(self._heap)
+            if handle.cancelled:
+                continue
+            try:
+                result = handle.callback(*handle.args)
+                if asyncio.iscoroutine(result):
+                    task = asyncio.create_task(result)
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+            except Exception as e:
+                logger.error("Timer callback error: %s", e, exc_info=True)
+
+    async def stop(self):
+        """Drops pending timers and waits for running callbacks to finish"""
+        self._heap.clear()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,75 @@
+"""
+Trigger Index - Sorted price levels for crossing detection
+Each price update only touches the levels it crossed (bisect) instead of scanning all
+"""
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Hashable, List, Tuple
+
+ABOVE = 'above'
+BELOW = 'below'
+
+class TriggerIndex:
+    """Price triggers of one market, kept in two sorted level lists
+
+    ABOVE triggers fire once the price is >= their level, BELOW triggers once
+    it is <= their level. A fired trigger is removed from the index.
+    """
+
+    def __init__(self):
+        # (level, seq, trigger_id) rendezett listák; a seq stabil sorrendet ad azonos szinteken
+        self._above: List[Tuple[float, int, Hashable]] = []
+        self._below: List[Tuple[float, int, Hashable]] = []
+        self._entries: Dict[Hashable, Tuple[str, Tuple[float, int, Hashable], Any]] = {}
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, trigger_id: Hashable) -> bool:
+        return trigger_id in self._entries
+
+    def add(self, trigger_id: Hashable, direction: str, level: float, payload: Any = None):
+        if direction not in (ABOVE, BELOW):
+            raise ValueError(f"Invalid trigger direction: {direction}")
+        if trigger_id in self._entries:
+            self.remove(trigger_id)
+        self._seq += 1
+        key = (float(level), self._seq, trigger_id)
+        insort(self._above if direction == ABOVE else self._below, key)
+        self._entries[trigger_id] = (direction, key, payload)
+
+    def remove(self, trigger_id: Hashable) -> Any:
+        """Removes a trigger and returns its payload (None if unknown)"""
+        entry = self._entries.pop(trigger_id, None)
+        if entry is None:
+            return None
+        direction, key, payload = entry
+        levels = self._above if direction == ABOVE else self._below
+        i = bisect_left(levels, key)
+        if i < len(levels) and levels[i] == key:
+            del levels[i]
+        return payload
+
+    def cross(self, price: float) -> List[Any]:
+        """Pops and returns the payloads of every trigger crossed by price"""
+        fired = []
+        i = bisect_right(self._above, (price, float('inf')))
+        if i:
+            fired.extend(self._above[:i])
+            del self._above[:i]
+        j = bisect_left(self._below, (price, -1))
+        if j < len(self._below):
+            fired.extend(self._below[j:])
+            del self._below[j:]
+        return [self._entries.pop(trigger_id)[2] for _, _, trigger_id in fired]
+
+    def nearest(self) -> Tuple[float, float]:
+        """Lowest ABOVE and highest BELOW level; the price can move freely between them"""
+        return (
+            self._above[0][0] if self._above else float('inf'),
+            self._below[-1][0] if self._below else float('-inf')
+        )
+
+    def items(self) -> List[Tuple[Hashable, str, float, Any]]:
+        return [(trigger_id, direction, key[0], payload)
+                for trigger_id, (direction, key, payload) in self._entries.items()]
@@ -0,0 +1,58 @@
+"""
+TTL Cache - Bounded in-memory cache with per-entry expiry
+Used for short-lived deduplication state on the order path
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+class TTLCache:
+    """Bounded mapping whose entries expire ttl seconds after they were last set"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600.0, timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # {key: (expires_at, value)}
+
+    def _expire(self):
+        # Minden bejegyzés ugyanazt a ttl-t kapja, így a lejárat sorrendje a beszúrás sorrendje
+        now = self._timer()
+        while self._data:
+            expires_at, _ = next(iter(self._data.values()))
+            if expires_at > now:
+                break
+            self._data.popitem(last=False)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None or item[0] <= self._timer():
+            return default
+        return item[1]
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self._data.pop(key, None)
+        self._data[key] = (self._timer() + self.ttl, value)
+        self._expire()
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __getitem__(self, key: Hashable) -> Any:
+        item = self._data.get(key)
+        if item is None or item[0] <= self._timer():
+            raise KeyError(key)
+        return item[1]
+
+    def __contains__(self, key: Hashable) -> bool:
+        item = self._data.get(key)
+        return item is not None and item[0] > self._timer()
+
+    def __len__(self) -> int:
+        self._expire()
+        return len(self._data)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        if item is None or item[0] <= self._timer():
+            return default
+        return item[1]
@@ -0,0 +1,26 @@
+"""
+Test fixtures - Offline setups built on the simulator exchange
+"""
+import os
+import sys
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+import pytest
+from exchange_manager import ExchangeManager
+
+@pytest.fixture
+def make_exchange_manager(monkeypatch):
+    """Factory for an ExchangeManager with simulator aliases only, ignoring config/exchange_configs.json"""
+    monkeypatch.setattr(ExchangeManager, 'load_exchanges', lambda self: None)
+
+    def factory(settings=None, **aliases):
+        manager = ExchangeManager({'settings': {'default_language': 'en', **(settings or {})}})
+        for name, options in aliases.items():
+            manager._initialize_exchange(name, {
+                'exchange': 'simulator', 'apiKey': '', 'secret': '', 'options': options
+            })
+        return manager
+    return factory
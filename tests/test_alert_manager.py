@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from alert_manager import AlertManager
+from database.db_handler import DatabaseHandler
+from market_data import TickerCache
+from trade_history import TradeRecorder
+
+def build(make_exchange_manager, tmp_path):
+    exchange_manager = make_exchange_manager(sim={'prices': {'BTC/USDT': 100.0}})
+    ticker_cache = TickerCache(exchange_manager)
+    db = DatabaseHandler(str(tmp_path / 'alerts.db'))
+    return exchange_manager, ticker_cache, AlertManager(db, ticker_cache, exchange_manager)
+
+def test_alerts_on_unknown_alias_are_rejected(make_exchange_manager, tmp_path):
+    _, _, alerts = build(make_exchange_manager, tmp_path)
+    with pytest.raises(ValueError):
+        alerts.add_price_alert(1, 'nosuch', 'BTC/USDT', 'above', 110.0)
+    with pytest.raises(ValueError):
+        asyncio.run(alerts.add_percent_alert(1, 'nosuch', 'BTC/USDT', 5.0))
+    assert not alerts.alerts and not alerts.indices
+
+def test_percent_alert_reference_falls_back_from_last(make_exchange_manager, tmp_path):
+    exchange_manager, ticker_cache, alerts = build(make_exchange_manager, tmp_path)
+    exchange = exchange_manager.get_exchange('sim')
+    tickers = iter([
+        {'symbol': 'BTC/USDT', 'last': None, 'close': None, 'bid': 99.0, 'ask': 101.0},
+        {'symbol': 'ETH/USDT', 'last': None, 'close': None, 'bid': None, 'ask': None},
+    ])
+
+    async def fetch_ticker(symbol, params=None):
+        return next(tickers)
+    exchange.fetch_ticker = fetch_ticker
+
+    async def scenario():
+        alert = await alerts.add_percent_alert(1, 'sim', 'BTC/USDT', 5.0)
+        assert alert['reference_price'] == 100.0
+        with pytest.raises(ValueError, match='No price available'):
+            await alerts.add_percent_alert(1, 'sim', 'ETH/USDT', 5.0)
+        await ticker_cache.stop()
+
+    asyncio.run(scenario())
+
+def test_triggered_alert_is_deactivated_by_the_recorder(make_exchange_manager, tmp_path):
+    exchange_manager, ticker_cache, _ = build(make_exchange_manager, tmp_path)
+    db = DatabaseHandler(str(tmp_path / 'bot.db'))
+    recorder = TradeRecorder(db.db_path)
+    alerts = AlertManager(db, ticker_cache, exchange_manager, recorder)
+    fired = []
+    alerts.add_listener(lambda alert, price: fired.append((alert['id'], price)))
+
+    async def scenario():
+        alert = alerts.add_price_alert(1, 'sim', 'BTC/USDT', 'above', 110.0)
+        alerts.on_ticker('sim', 'BTC/USDT', {'last': 111.0})
+        assert fired == [(alert['id'], 111.0)]
+        assert recorder._alert_queue == [alert['id']], "the ticker fan-out must not write SQLite"
+        await recorder.close()
+        await ticker_cache.stop()
+        assert not db.get_alerts()
+
+    asyncio.run(scenario())
@@ -0,0 +1,103 @@
+import asyncio
+import ccxt.async_support as ccxt
+import pytest
+from conditional_orders import ConditionalOrderManager, CANCELED, PENDING, REARMED, TRIGGERED
+from market_data import TickerCache
+from risk_manager import RiskManager
+from trade_manager import TradeManager
+
+def build(make_exchange_manager):
+    exchange_manager = make_exchange_manager(
+        sim={'prices': {'BTC/USDT': 100.0}, 'balances': {'BTC': 10.0, 'USDT': 100000.0}}
+    )
+    trade_manager = TradeManager(exchange_manager)
+    ticker_cache = TickerCache(exchange_manager)
+    manager = ConditionalOrderManager(trade_manager, ticker_cache)
+    events = []
+    manager.add_listener(lambda condition, event, detail: events.append((condition.kind, event)))
+    return exchange_manager, trade_manager, ticker_cache, manager, events
+
+def test_oco_leg_failing_transiently_is_rearmed_with_its_sibling(make_exchange_manager):
+    exchange_manager, trade_manager, ticker_cache, manager, events = build(make_exchange_manager)
+    place_order = trade_manager.place_order
+    attempts = []
+
+    async def flaky_place_order(*args, **kwargs):
+        attempts.append(kwargs.get('client_order_id'))
+        if len(attempts) == 1:
+            raise ccxt.RequestTimeout('simulated timeout')
+        return await place_order(*args, **kwargs)
+    trade_manager.place_order = flaky_place_order
+
+    async def scenario():
+        take_profit, stop_loss = manager.add_oco('sim', 'BTC/USDT', 'sell', 1.0, 120.0, 90.0, client_order_id='x')
+        manager.on_ticker('sim', 'BTC/USDT', {'last': 121.0})
+        await asyncio.gather(*manager._tasks)
+        assert events == [('take_profit', REARMED)]
+        assert take_profit.status == PENDING and stop_loss.status == PENDING
+        assert len(manager.indices[('sim', 'BTC/USDT')]) == 2
+
+        manager.on_ticker('sim', 'BTC/USDT', {'last': 121.0})
+        await asyncio.gather(*manager._tasks)
+        assert events[-1] == ('take_profit', TRIGGERED)
+        assert attempts == ['xtp', 'xtp']
+        assert stop_loss.status == CANCELED and not manager.conditions
+        assert ('sim', 'BTC/USDT') not in manager.indices
+        await ticker_cache.stop()
+
+    asyncio.run(scenario())
+
+def test_native_condition_kept_when_exchange_cancel_fails(make_exchange_manager):
+    exchange_manager, trade_manager, ticker_cache, manager, events = build(make_exchange_manager)
+    exchange = exchange_manager.get_exchange('sim')
+    exchange.has['createTriggerOrder'] = True
+
+    async def scenario():
+        condition = await manager.place_when('sim', 'BTC/USDT', 'above', 110.0, 'buy', 1.0, price=90.0)
+        cancel_order = exchange.cancel_order
+
+        async def failing_cancel(*args, **kwargs):
+            raise ccxt.RequestTimeout('simulated timeout')
+        exchange.cancel_order = failing_cancel
+        with pytest.raises(ccxt.RequestTimeout):
+            await manager.cancel(condition.id)
+        assert manager.conditions[condition.id] is condition
+        assert ('sim', condition.order_id) in manager.native_orders
+
+        exchange.cancel_order = cancel_order
+        assert await manager.cancel(condition.id)
+        assert not manager.conditions and not manager.native_orders
+
+    asyncio.run(scenario())
+
+def test_condition_canceled_while_placing_cancels_the_placed_order(make_exchange_manager):
+    exchange_manager, trade_manager, ticker_cache, manager, events = build(make_exchange_manager)
+    risk = RiskManager({'max_symbol_exposure': 1000})
+    manager.risk_manager = risk
+    trade_manager.order_tracker.add_listener(risk.on_order_update)
+    place_order = trade_manager.place_order
+    placing, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_place_order(*args, **kwargs):
+        placing.set()
+        await release.wait()
+        return await place_order(*args, **kwargs)
+    trade_manager.place_order = slow_place_order
+
+    async def scenario():
+        condition = manager.add_condition('sim', 'BTC/USDT', 'above', 110.0, 'buy', 1.0, price=50.0)
+        manager.on_ticker('sim', 'BTC/USDT', {'last': 111.0})
+        await placing.wait()
+        assert await manager.cancel(condition.id)
+        release.set()
+        await asyncio.gather(*manager._tasks)
+
+        order = exchange_manager.get_exchange('sim').orders[condition.order_id]
+        assert order['status'] == 'canceled'
+        assert condition.status == CANCELED and not manager.conditions
+        assert trade_manager.order_tracker.get('sim', order['id']).is_terminal
+        assert risk.pending_buy.get(('sim', 'BTC/USDT'), 0.0) == 0.0
+        assert not [event for kind, event in events if event == TRIGGERED]
+        await ticker_cache.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,66 @@
+import asyncio
+import json
+import time
+import aiohttp
+from endpoint_prober import EndpointProber, HostStats
+
+FAST, SLOW = 'https://fast.example', 'https://slow.example'
+
+class StubExchangeManager:
+    def __init__(self):
+        self.exchanges = {'x': object()}
+        self.exchange_configs = {'x': {'probe': {'hosts': [SLOW, FAST], 'path': '/time', 'time_key': 'serverTime'}}}
+        self.api_hosts = {}
+        self.time_differences = {}
+
+    def set_api_host(self, alias, host):
+        self.api_hosts[alias] = host
+
+    def set_time_difference(self, alias, time_difference):
+        self.time_differences[alias] = time_difference
+
+def with_rtts(prober, **rtts):
+    """Fills the probe window of each host with the given round-trip times (None = failed probe)"""
+    hosts = prober.stats.setdefault('x', {})
+    for host, samples in rtts.items():
+        stats = hosts.setdefault(host, HostStats(host, prober.window))
+        for rtt in samples:
+            stats.record(rtt)
+
+def test_switches_only_when_a_host_is_faster_by_the_margin():
+    exchange_manager = StubExchangeManager()
+    prober = EndpointProber(exchange_manager, window=3, switch_margin=0.2)
+    with_rtts(prober, **{SLOW: [0.10, 0.10, 0.10], FAST: [0.50, 0.50, 0.50]})
+    prober._select('x')
+    assert exchange_manager.api_hosts['x'] == SLOW
+
+    # 10%-kal gyorsabb: a hiszterézis miatt marad a jelenlegi host
+    with_rtts(prober, **{FAST: [0.09, 0.09, 0.09]})
+    prober._select('x')
+    assert exchange_manager.api_hosts['x'] == SLOW
+
+    with_rtts(prober, **{FAST: [0.05, 0.05, 0.05]})
+    prober._select('x')
+    assert exchange_manager.api_hosts['x'] == FAST
+
+    # A hibázó aktív hostról a margótól függetlenül váltunk
+    with_rtts(prober, **{FAST: [None, None, 0.05]})
+    prober._select('x')
+    assert exchange_manager.api_hosts['x'] == SLOW
+
+def test_probe_measures_clock_offset_and_skips_failing_hosts():
+    exchange_manager = StubExchangeManager()
+
+    async def fetch(url):
+        if url.startswith(SLOW):
+            raise aiohttp.ClientConnectionError('refused')
+        body = json.dumps({'serverTime': time.time() * 1000 + 5000})
+        return 200, {}, body.encode()
+
+    prober = EndpointProber(exchange_manager, fetch=fetch)
+    asyncio.run(prober.probe_once())
+    assert exchange_manager.api_hosts['x'] == FAST
+    assert abs(exchange_manager.time_differences['x'] + 5000) < 100
+    status = prober.get_status()['x']
+    assert status['hosts'][SLOW] == {'rtt_ms': None, 'error_rate': 1.0}
+    assert abs(status['offset_ms'] - 5000) < 100
@@ -0,0 +1,54 @@
+import asyncio
+import ccxt.async_support as ccxt
+import pytest
+from exchange_manager import UnconfirmedOrderError, _UNCONFIRMED, make_client_order_id
+
+def test_failed_lookup_after_lost_response_keeps_submission_unconfirmed(make_exchange_manager):
+    exchange_manager = make_exchange_manager(
+        {'order_retry_backoff': 0}, sim={'prices': {'BTC/USDT': 100.0}, 'lost_response_rate': 1.0}
+    )
+    exchange = exchange_manager.get_exchange('sim')
+    fetch_orders = exchange.fetch_orders
+
+    async def failing_fetch_orders(*args, **kwargs):
+        raise ccxt.ExchangeError('endpoint disabled')
+    exchange.fetch_orders = failing_fetch_orders
+    client_order_id = make_client_order_id(7)
+
+    async def submit():
+        return await exchange_manager.create_order('sim', 'BTC/USDT', 'buy', 1.0, client_order_id=client_order_id)
+
+    with pytest.raises(UnconfirmedOrderError):
+        asyncio.run(submit())
+    assert exchange_manager.submissions.get(('sim', client_order_id)) is _UNCONFIRMED
+
+    # A következő próbálkozás először keres, így nem küldi be újra a már létrejött ordert
+    exchange.fetch_orders = fetch_orders
+    exchange.lost_response_rate = 0.0
+    order = asyncio.run(submit())
+    assert order['clientOrderId'] == client_order_id
+    assert len(exchange.orders) == 1
+
+def test_in_flight_submission_survives_dedup_cache_eviction(make_exchange_manager):
+    exchange_manager = make_exchange_manager(
+        {'order_dedup_size': 1}, sim={'prices': {'BTC/USDT': 100.0}, 'latency_ms': 20}
+    )
+    exchange = exchange_manager.get_exchange('sim')
+
+    async def submit(update_id):
+        return await exchange_manager.create_order(
+            'sim', 'BTC/USDT', 'buy', 1.0, client_order_id=make_client_order_id(update_id)
+        )
+
+    async def scenario():
+        first = asyncio.create_task(submit(1))
+        await asyncio.sleep(0)
+        other = asyncio.create_task(submit(2))
+        await asyncio.sleep(0)
+        duplicate = asyncio.create_task(submit(1))
+        return await asyncio.gather(first, other, duplicate)
+
+    first, other, duplicate = asyncio.run(scenario())
+    assert duplicate['id'] == first['id'] != other['id']
+    assert len(exchange.orders) == 2
+    assert not exchange_manager.inflight_submissions
@@ -0,0 +1,21 @@
+import asyncio
+from execution import ExecutionManager, CANCELED
+from trade_manager import TradeManager
+
+def test_child_placed_after_cancel_is_canceled(make_exchange_manager):
+    exchange_manager = make_exchange_manager(sim={'prices': {'BTC/USDT': 100.0}, 'latency_ms': 50})
+    exchange = exchange_manager.get_exchange('sim')
+    execution = ExecutionManager(TradeManager(exchange_manager))
+
+    async def scenario():
+        parent = execution.start_iceberg('sim', 'BTC/USDT', 'buy', 2.0, 90.0, 0.5)
+        await asyncio.sleep(0.02)  # a gyerek order beküldése folyamatban
+        assert await execution.cancel(parent.id)
+        await asyncio.sleep(0.2)
+        await execution.stop()
+        return parent
+
+    parent = asyncio.run(scenario())
+    assert parent.status == CANCELED
+    assert not parent.open_children
+    assert [order['status'] for order in exchange.orders.values()] == ['canceled']
@@ -0,0 +1,30 @@
+import logging
+import queue
+from utils.logger import DeferredQueueHandler, setup_logging, stop_logging
+
+def test_prepare_renders_message_before_arguments_change():
+    log_queue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    order = {'id': '1', 'status': 'open'}
+    record = logging.LogRecord('order_tracker', logging.INFO, __file__, 1, "Order %s", (order,), None)
+    handler.emit(record)
+    order['status'] = 'closed'
+
+    queued = log_queue.get_nowait()
+    assert queued.getMessage() == "Order {'id': '1', 'status': 'open'}"
+    assert queued.args is None
+
+def test_debug_sampling_applies_only_to_hot_path_loggers():
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    setup_logging({'logging': {'level': 'DEBUG', 'console_log': False, 'debug_sample_rate': 0.0}})
+    try:
+        assert not logging.getLogger('market_data').filter(
+            logging.LogRecord('market_data', logging.DEBUG, __file__, 1, "tick", None, None))
+        assert logging.getLogger('telegram_bot').filter(
+            logging.LogRecord('telegram_bot', logging.DEBUG, __file__, 1, "command", None, None))
+    finally:
+        setup_logging({'logging': {'level': 'DEBUG', 'console_log': False}})
+        stop_logging()
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
@@ -0,0 +1,60 @@
+import asyncio
+import numpy as np
+from market_data import TickerCache
+from ohlcv_store import OHLCVStore, TIMESTAMP
+
+MINUTE = 60000
+
+def capped(exchange, max_limit=100):
+    """fetch_ohlcv that, like real exchanges, returns at most max_limit candles per call, oldest first from since"""
+    fetch_ohlcv = exchange.fetch_ohlcv
+
+    async def fetch(symbol, timeframe='1m', since=None, limit=None, params=None):
+        candles = await fetch_ohlcv(symbol, timeframe, since, limit, params)
+        return candles[:min(limit or max_limit, max_limit)]
+    exchange.fetch_ohlcv = fetch
+
+def assert_contiguous_until(buffer, current):
+    timestamps = buffer.array()[:, TIMESTAMP]
+    assert timestamps[-1] == current
+    assert np.all(np.diff(timestamps) == MINUTE)
+
+def test_stale_snapshot_is_paged_up_to_the_current_bar(make_exchange_manager, tmp_path):
+    exchange_manager = make_exchange_manager(sim={'prices': {'BTC/USDT': 100.0}})
+    exchange = exchange_manager.get_exchange('sim')
+    capped(exchange)
+    now = exchange.milliseconds()
+    exchange.milliseconds = lambda: now
+
+    async def load(store):
+        buffer = await store.get_buffer('sim', 'BTC/USDT', '1m')
+        store.stop()
+        return buffer
+
+    ticker_cache = TickerCache(exchange_manager)
+    buffer = asyncio.run(load(OHLCVStore(exchange_manager, ticker_cache, str(tmp_path), capacity=500)))
+    assert len(buffer) == 500
+    assert_contiguous_until(buffer, now - now % MINUTE)
+
+    # Újraindítás 300 perccel később: a hiány több lapban érkezik
+    later = now + 300 * MINUTE
+    exchange.milliseconds = lambda: later
+    buffer = asyncio.run(load(OHLCVStore(exchange_manager, ticker_cache, str(tmp_path), capacity=500)))
+    assert len(buffer) == 500
+    assert_contiguous_until(buffer, later - later % MINUTE)
+
+def test_least_recently_used_series_is_evicted_and_unsubscribed(make_exchange_manager, tmp_path):
+    exchange_manager = make_exchange_manager(sim={'prices': {'BTC/USDT': 100.0, 'ETH/USDT': 10.0}})
+    ticker_cache = TickerCache(exchange_manager)
+    store = OHLCVStore(exchange_manager, ticker_cache, str(tmp_path), capacity=50, max_series=1)
+
+    async def scenario():
+        await store.get_buffer('sim', 'BTC/USDT', '1m')
+        await store.get_buffer('sim', 'ETH/USDT', '1m')
+        assert list(store.buffers) == [('sim', 'ETH/USDT', '1m')]
+        assert ('sim', 'BTC/USDT') not in ticker_cache.subscribers
+        assert ('sim', 'ETH/USDT') in ticker_cache.subscribers
+        store.stop()
+        await ticker_cache.stop()
+
+    asyncio.run(scenario())
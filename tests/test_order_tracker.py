@@ -0,0 +1,31 @@
+import asyncio
+from order_tracker import FILLED, NEW
+from trade_manager import TradeManager
+
+def test_immediate_fill_is_reported_to_listeners(make_exchange_manager):
+    exchange_manager = make_exchange_manager(sim={'prices': {'BTC/USDT': 100.0}})
+    trade_manager = TradeManager(exchange_manager)
+    transitions = []
+    trade_manager.order_tracker.add_listener(lambda tracked, previous: transitions.append((previous, tracked.state)))
+    fills = []
+    trade_manager.add_fill_listener(lambda exchange_name, order: fills.append(order['filled']))
+
+    async def scenario():
+        market = await trade_manager.open_position('sim', 'BTC/USDT', 'buy', 1.0, chat_id=1)
+        resting = await trade_manager.open_position('sim', 'BTC/USDT', 'buy', 1.0, 50.0, chat_id=1)
+        return market, resting
+
+    market, resting = asyncio.run(scenario())
+    assert transitions == [(NEW, FILLED)]
+    assert fills == [1.0]
+    assert trade_manager.position_manager.positions['sim'][market['id']]['status'] == 'closed'
+    assert trade_manager.order_tracker.get('sim', resting['id']).state == NEW
+
+def test_restored_order_is_tracked_without_notification(make_exchange_manager):
+    trade_manager = TradeManager(make_exchange_manager(sim={}))
+    transitions = []
+    trade_manager.order_tracker.add_listener(lambda tracked, previous: transitions.append(tracked.state))
+    order = {'id': '7', 'symbol': 'BTC/USDT', 'status': 'open', 'amount': 2.0, 'filled': 1.0}
+    trade_manager.order_tracker.track('sim', order, notify=False)
+    assert not transitions
+    assert '7' in trade_manager.order_tracker.open_orders['sim']
@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from portfolio import PortfolioValuator
+from position_manager import PositionManager
+
+class StubExchange:
+    has = {'fetchTickers': True}
+
+    def __init__(self, totals, prices):
+        self.totals = totals
+        self.prices = prices
+
+    async def fetch_balance(self):
+        return {'total': self.totals}
+
+    async def fetch_tickers(self):
+        return {symbol: {'symbol': symbol, 'last': last} for symbol, last in self.prices.items()}
+
+class StubExchangeManager:
+    def __init__(self, **exchanges):
+        self.exchanges = exchanges
+        self.mode_clients = {}
+
+    def get_exchange(self, name):
+        return self.exchanges.get(name)
+
+class StubTickerCache:
+    tickers = {}
+
+def test_assets_are_valued_through_direct_inverse_and_cross_pairs():
+    exchange_manager = StubExchangeManager(
+        a=StubExchange(
+            {'USDT': 1000.0, 'BTC': 1.0, 'ETH': 10.0, 'TRY': 300.0, 'DOGE': 5.0},
+            {'BTC/USDT': 100.0, 'ETH/BTC': 0.05, 'USDT/TRY': 30.0}
+        ),
+        b=StubExchange({'ETH': 2.0}, {'ETH/USDT': 6.0})
+    )
+    positions = PositionManager()
+    positions.add_position('a', {'id': '1', 'symbol': 'ETH/BTC', 'side': 'buy', 'filled': 10.0, 'average': 0.04})
+    valuator = PortfolioValuator(exchange_manager, StubTickerCache(), positions)
+
+    snapshot = asyncio.run(valuator.snapshot())
+    # ETH az "a" aliason ETH/BTC * BTC/USDT = 5, a "b" aliason közvetlenül 6
+    assert snapshot['aliases'] == {'a': pytest.approx(1160.0), 'b': pytest.approx(12.0)}
+    assert snapshot['total'] == pytest.approx(1172.0)
+    assets = {asset['asset']: asset for asset in snapshot['assets']}
+    assert assets['ETH']['amount'] == 12.0 and assets['ETH']['value'] == pytest.approx(62.0)
+    assert assets['TRY']['value'] == pytest.approx(10.0)
+    assert snapshot['assets'][0]['asset'] == 'USDT'
+    assert snapshot['unpriced'] == ['DOGE']
+    # (0.05 - 0.04) BTC * 10 ETH, BTC-ben, USDT-re váltva
+    assert snapshot['unrealized_pnl'] == pytest.approx(10.0)
+
+def test_unavailable_alias_is_reported_and_left_out():
+    class FailingExchange(StubExchange):
+        async def fetch_balance(self):
+            raise ConnectionError('down')
+
+    exchange_manager = StubExchangeManager(
+        a=StubExchange({'USDT': 5.0}, {}), b=FailingExchange({}, {})
+    )
+    snapshot = asyncio.run(PortfolioValuator(exchange_manager, StubTickerCache(), PositionManager()).snapshot())
+    assert snapshot['aliases'] == {'a': 5.0}
+    assert snapshot['errors'] == {'b': 'down'}
@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from exchange_manager import make_client_order_id
+from market_data import TickerCache
+from risk_manager import RiskManager, RiskLimitExceeded
+from state_store import StateStore
+from trade_manager import TradeManager
+
+LIMITS = {'max_order_notional': 1000, 'max_symbol_exposure': 5000, 'max_alias_exposure': 5000}
+
+def test_redelivered_update_does_not_apply_fill_twice(make_exchange_manager):
+    exchange_manager = make_exchange_manager(sim={'prices': {'BTC/USDT': 100.0}})
+    trade_manager = TradeManager(exchange_manager)
+    risk = RiskManager(LIMITS)
+    trade_manager.order_tracker.add_listener(risk.on_order_update)
+    risk.update_price('sim', 'BTC/USDT', 100.0)
+
+    async def buy(update_id):
+        reservation = risk.check_order('sim', 'BTC/USDT', 'buy', 1.0)
+        order = await trade_manager.open_position(
+            'sim', 'BTC/USDT', 'buy', 1.0, client_order_id=make_client_order_id(update_id)
+        )
+        risk.attach(reservation, 'sim', order)
+        return order
+
+    async def scenario():
+        first = await buy(42)
+        second = await buy(42)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first['id'] == second['id']
+    assert exchange_manager.get_exchange('sim').request_count == 1
+    key = ('sim', 'BTC/USDT')
+    assert risk.net_qty[key] == 1.0
+    assert risk.symbol_exposure[key] == 100.0
+    assert risk.pending_buy.get(key, 0.0) == 0.0
+
+def test_market_order_without_cached_price_is_checked_against_fetched_ticker(make_exchange_manager):
+    exchange_manager = make_exchange_manager(sim={'prices': {'BTC/USDT': 100.0}})
+    ticker_cache = TickerCache(exchange_manager)
+    risk = RiskManager(LIMITS, price_source=ticker_cache.fetch_price)
+
+    with pytest.raises(RiskLimitExceeded) as excinfo:
+        asyncio.run(risk.check('sim', 'BTC/USDT', 'buy', 1000.0))
+    assert excinfo.value.limit == 'max_order_notional'
+    assert excinfo.value.value == 100000.0
+    assert ticker_cache.get_price('sim', 'BTC/USDT') == 100.0
+
+def test_market_order_without_any_price_is_rejected():
+    risk = RiskManager(LIMITS)
+    with pytest.raises(RiskLimitExceeded) as excinfo:
+        risk.check_order('sim', 'BTC/USDT', 'buy', 1000.0)
+    assert excinfo.value.limit == 'reference_price'
+
+def test_exposure_survives_state_round_trip(make_exchange_manager, tmp_path):
+    exchange_manager = make_exchange_manager(sim={'prices': {'BTC/USDT': 100.0}})
+    store = StateStore(str(tmp_path / 'state.json'))
+    limits = {'max_symbol_exposure': 500, 'max_alias_exposure': 500}
+
+    async def scenario():
+        trade_manager = TradeManager(exchange_manager)
+        risk = RiskManager(limits)
+        trade_manager.order_tracker.add_listener(risk.on_order_update)
+        risk.update_price('sim', 'BTC/USDT', 100.0)
+        for side, amount, price in (('buy', 3.0, None), ('buy', 1.0, 90.0)):
+            reservation = risk.check_order('sim', 'BTC/USDT', side, amount, price)
+            order = await trade_manager.open_position('sim', 'BTC/USDT', side, amount, price)
+            risk.attach(reservation, 'sim', order)
+        assert store.save(exchange_manager, trade_manager, risk)
+
+        # Újraindítás: a kitöltött 3 BTC és a nyitott 1 BTC limit order továbbra is kitettség
+        trade_manager = TradeManager(exchange_manager)
+        risk = RiskManager(limits)
+        trade_manager.order_tracker.add_listener(risk.on_order_update)
+        assert store.load(exchange_manager, trade_manager, risk)
+        key = ('sim', 'BTC/USDT')
+        assert risk.net_qty[key] == 3.0
+        assert risk.pending_buy[key] == 1.0
+        with pytest.raises(RiskLimitExceeded) as excinfo:
+            risk.check_order('sim', 'BTC/USDT', 'buy', 1.5)
+        assert excinfo.value.limit == 'max_symbol_exposure'
+
+        # A restart után teljesülő order a visszaállított foglaláson könyvelődik
+        exchange = exchange_manager.get_exchange('sim')
+        for order in exchange.set_price('BTC/USDT', 89.0):
+            trade_manager.order_tracker.on_order_update('sim', order)
+        assert risk.net_qty[key] == 4.0
+        assert risk.pending_buy.get(key, 0.0) == 0.0
+
+    asyncio.run(scenario())
+
+def test_alias_limit_covers_every_mode_of_the_alias():
+    risk = RiskManager({'max_alias_exposure': 1000})
+    risk.update_price('sim', 'BTC/USDT', 100.0)
+    risk.update_price('sim:futures', 'BTC/USDT:USDT', 100.0)
+    risk.check_order('sim', 'BTC/USDT', 'buy', 6.0)
+    assert risk.alias_exposure == {'sim': 600.0}
+
+    with pytest.raises(RiskLimitExceeded) as excinfo:
+        risk.check_order('sim:futures', 'BTC/USDT:USDT', 'buy', 5.0)
+    assert excinfo.value.limit == 'max_alias_exposure'
+    assert excinfo.value.value == 1100.0
@@ -0,0 +1,71 @@
+import asyncio
+from conditional_orders import ConditionalOrderManager, PENDING
+from execution import ExecutionManager, RUNNING
+from market_data import TickerCache
+from state_store import StateStore
+from trade_manager import TradeManager
+from utils.trigger_index import ABOVE
+
+def test_round_trip_keeps_live_bracket_conditions_and_execution(make_exchange_manager, tmp_path):
+    exchange_manager = make_exchange_manager(sim={'prices': {'BTC/USDT': 100.0}})
+    exchange = exchange_manager.get_exchange('sim')
+    store = StateStore(str(tmp_path / 'state.json'))
+
+    def build():
+        trade_manager = TradeManager(exchange_manager)
+        ticker_cache = TickerCache(exchange_manager)
+        return (trade_manager, ticker_cache, ConditionalOrderManager(trade_manager, ticker_cache),
+                ExecutionManager(trade_manager))
+
+    async def scenario():
+        trade_manager, ticker_cache, conditional_orders, execution = build()
+        entry = await conditional_orders.place_bracket('sim', 'BTC/USDT', 'buy', 1.0, 120.0, 90.0, price=95.0)
+        condition = conditional_orders.add_condition('sim', 'BTC/USDT', ABOVE, 150.0, 'buy', 0.5)
+        parent = execution.start_iceberg('sim', 'BTC/USDT', 'buy', 2.0, 80.0, 0.5)
+        await asyncio.sleep(0.05)
+        assert parent.open_children
+        assert store.save(exchange_manager, trade_manager, None, conditional_orders, execution)
+        await execution.stop()
+        await ticker_cache.stop()
+
+        # Újraindítás: új managerek ugyanazzal a (szimulált) tőzsdével
+        trade_manager, ticker_cache, conditional_orders, execution = build()
+        assert store.load(exchange_manager, trade_manager, None, conditional_orders, execution)
+        assert ('sim', entry['id']) in conditional_orders.pending_brackets
+        restored = conditional_orders.conditions[condition.id]
+        assert restored.status == PENDING and restored.trigger_price == 150.0
+        assert len(conditional_orders.indices[('sim', 'BTC/USDT')]) == 1
+        restored_parent = execution.parents[parent.id]
+        assert restored_parent.status == RUNNING and restored_parent.open_children == parent.open_children
+        for order_id in parent.open_children:
+            assert execution.child_parents[('sim', order_id)] is restored_parent
+
+        # A belépő az újraindítás után teljesül: a kilépő OCO pár élesedik, új azonosítókkal
+        for order in exchange.set_price('BTC/USDT', 94.0):
+            trade_manager.order_tracker.on_order_update('sim', order)
+        exits = [c for c in conditional_orders.conditions.values() if c.group]
+        assert sorted(c.kind for c in exits) == ['stop_loss', 'take_profit']
+        assert all(c.amount == 1.0 and c.id != condition.id for c in exits)
+        assert not conditional_orders.pending_brackets
+        await execution.stop()
+        await ticker_cache.stop()
+
+    asyncio.run(scenario())
+
+def test_restored_positions_do_not_notify_position_listeners(make_exchange_manager, tmp_path):
+    exchange_manager = make_exchange_manager(sim={'prices': {'BTC/USDT': 100.0}})
+    store = StateStore(str(tmp_path / 'state.json'))
+
+    async def scenario():
+        trade_manager = TradeManager(exchange_manager)
+        order = await trade_manager.open_position('sim', 'BTC/USDT', 'buy', 1.0)
+        assert store.save(exchange_manager, trade_manager)
+
+        trade_manager = TradeManager(exchange_manager)
+        notified = []
+        trade_manager.position_manager.add_listener(lambda *args: notified.append(args))
+        assert store.load(exchange_manager, trade_manager)
+        assert order['id'] in trade_manager.position_manager.positions['sim']
+        assert not notified
+
+    asyncio.run(scenario())
@@ -0,0 +1,36 @@
+from utils.table_renderer import PageCache, paginate, render_rows
+
+def body_rows(page: str) -> int:
+    """Rows below the repeated header of one page"""
+    return page.count("\n") - 1
+
+def test_numeric_columns_are_right_aligned():
+    header, lines = render_rows(['asset', 'amount'], [['BTC', 1.5], ['USDT', 1000]])
+    assert header == "asset amount"
+    assert lines == ["BTC      1.5", "USDT   1,000"]
+
+def test_pages_split_on_row_count_and_budget_and_repeat_the_header():
+    rows = [[f"S{i}", i] for i in range(60)]
+    pages = paginate("Title <all>", ['symbol', 'qty'], rows, max_rows=25)
+    assert len(pages) == 3
+    for page in pages:
+        assert page.startswith("Title &lt;all&gt;\n<pre>symbol qty\n") and page.endswith("</pre>")
+    assert [body_rows(page) for page in pages] == [25, 25, 10]
+
+    pages = paginate("t", ['symbol', 'qty'], rows, budget=100, max_rows=100)
+    assert len(pages) > 1 and all(len(page) <= 100 for page in pages)
+    assert sum(body_rows(page) for page in pages) == 60
+
+def test_empty_table_is_one_page():
+    assert paginate("t", ['a'], []) == ["t\n<pre>a\n</pre>"]
+
+def test_page_cache_is_per_chat_and_expires():
+    cache = PageCache(ttl=0.0)
+    token = cache.store(1, ['p1'])
+    assert cache.get(1, token) is None
+
+    cache = PageCache()
+    token = cache.store(1, ['p1', 'p2'])
+    assert cache.get(1, token) == ['p1', 'p2']
+    assert cache.get(2, token) is None
+    assert cache.store(1, ['p3']) != token
@@ -0,0 +1,40 @@
+import asyncio
+from utils.timer_scheduler import TimerScheduler
+
+def test_timers_fire_in_deadline_order_and_cancelled_ones_are_skipped():
+    fired = []
+
+    async def scenario():
+        scheduler = TimerScheduler()
+        scheduler.call_later(0.03, fired.append, 'late')
+        await asyncio.sleep(0)  # a futó task már a 'late' határidőre vár
+        cancelled = scheduler.call_later(0.02, fired.append, 'cancelled')
+        scheduler.call_later(0.01, fired.append, 'early')
+        # A korábbi határidők felébresztik a várakozást, így időben lefutnak
+        scheduler.call_later(0.0, fired.append, 'now')
+        cancelled.cancel()
+        assert len(scheduler) == 3
+        await asyncio.sleep(0.06)
+        assert len(scheduler) == 0
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert fired == ['now', 'early', 'late']
+
+def test_coroutine_callbacks_run_as_tasks_and_stop_drops_pending_timers():
+    fired = []
+
+    async def callback(name):
+        await asyncio.sleep(0)
+        fired.append(name)
+
+    async def scenario():
+        scheduler = TimerScheduler()
+        scheduler.call_later(0.0, callback, 'first')
+        scheduler.call_later(60.0, callback, 'never')
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        assert len(scheduler) == 0
+
+    asyncio.run(scenario())
+    assert fired == ['first']
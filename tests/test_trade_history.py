@@ -0,0 +1,49 @@
+import asyncio
+import csv
+import gzip
+import sqlite3
+import pytest
+from trade_history import TradeRecorder, HistoryExporter
+from trade_manager import TradeManager
+
+def order(filled, status='open', cost=None):
+    return {'id': '7', 'symbol': 'BTC/USDT', 'side': 'buy', 'amount': 2.0, 'filled': filled, 'price': 100.0,
+            'average': 100.0, 'cost': cost if cost is not None else filled * 100.0, 'status': status,
+            'fee': {'cost': filled * 0.1, 'currency': 'USDT'}, 'timestamp': 1700000000000}
+
+def test_fills_are_written_as_deltas_in_batches_off_the_loop(tmp_path):
+    db_path = str(tmp_path / 'trades.db')
+    recorder = TradeRecorder(db_path)
+
+    async def scenario():
+        # Ugyanaz a snapshot kétszer (poll + stream), majd a teljesülés
+        for snapshot in (order(0.5), order(0.5), order(2.0, 'closed')):
+            recorder.record('sim', snapshot)
+        assert recorder._queue, "record() must not write on the event loop"
+        await recorder.close()
+
+    asyncio.run(scenario())
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute('SELECT amount, cost, fee FROM trades ORDER BY id').fetchall()
+    assert [r[:2] for r in rows] == [(0.5, 50.0), (1.5, 150.0)]
+    assert [r[2] for r in rows] == pytest.approx([0.05, 0.15])
+
+def test_position_history_is_exported(make_exchange_manager, tmp_path):
+    db_path = str(tmp_path / 'trades.db')
+    exchange_manager = make_exchange_manager(sim={'prices': {'BTC/USDT': 100.0}})
+    trade_manager = TradeManager(exchange_manager)
+    recorder = TradeRecorder(db_path)
+    trade_manager.position_manager.add_listener(recorder.record_position)
+
+    async def scenario():
+        opened = await trade_manager.open_position('sim', 'BTC/USDT', 'buy', 1.0)
+        await trade_manager.open_position('sim', 'BTC/USDT', 'buy', 2.0)
+        trade_manager.position_manager.remove_position('sim', opened['id'])
+        await recorder.close()
+        return await HistoryExporter(db_path).export('positions', str(tmp_path))
+
+    path, count = asyncio.run(scenario())
+    assert count == 2
+    with gzip.open(path, 'rt') as f:
+        rows = list(csv.DictReader(f))
+    assert sorted((row['amount'], bool(row['closed_at'])) for row in rows) == [('1.0', True), ('2.0', False)]
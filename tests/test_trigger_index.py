@@ -0,0 +1,50 @@
+import pytest
+from utils.trigger_index import TriggerIndex, ABOVE, BELOW
+
+def build():
+    index = TriggerIndex()
+    index.add('tp1', ABOVE, 110.0, 'tp1')
+    index.add('tp2', ABOVE, 120.0, 'tp2')
+    index.add('sl1', BELOW, 90.0, 'sl1')
+    index.add('sl2', BELOW, 80.0, 'sl2')
+    return index
+
+def test_cross_pops_only_the_levels_the_price_reached():
+    index = build()
+    assert index.cross(100.0) == []
+    assert index.cross(115.0) == ['tp1']
+    assert index.cross(85.0) == ['sl1']
+    assert len(index) == 2 and 'tp1' not in index
+
+    # A szint pontos elérése is kivált
+    assert index.cross(120.0) == ['tp2']
+    assert index.cross(80.0) == ['sl2']
+    assert not index
+
+def test_a_gap_fires_every_level_it_jumped_over():
+    index = build()
+    assert index.cross(125.0) == ['tp1', 'tp2']
+    assert index.cross(75.0) == ['sl2', 'sl1']
+
+def test_nearest_brackets_the_quiet_range():
+    index = build()
+    assert index.nearest() == (110.0, 90.0)
+    index.remove('tp1')
+    index.remove('sl1')
+    assert index.nearest() == (120.0, 80.0)
+    assert TriggerIndex().nearest() == (float('inf'), float('-inf'))
+
+def test_equal_levels_fire_in_insertion_order_and_readd_moves_a_trigger():
+    index = TriggerIndex()
+    index.add('a', ABOVE, 100.0, 'a')
+    index.add('b', ABOVE, 100.0, 'b')
+    index.add('c', ABOVE, 105.0, 'c')
+    index.add('c', BELOW, 95.0, 'c')
+    assert len(index) == 3
+    assert index.cross(100.0) == ['a', 'b']
+    assert index.nearest() == (float('inf'), 95.0)
+    assert index.remove('missing') is None
+
+def test_invalid_direction_is_rejected():
+    with pytest.raises(ValueError):
+        TriggerIndex().add('x', 'sideways', 1.0)
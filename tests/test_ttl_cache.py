@@ -0,0 +1,38 @@
+from utils.ttl_cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_entries_expire_ttl_seconds_after_they_were_last_set():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=5.0, timer=clock)
+    cache['a'] = 1
+    clock.now = 3.0
+    cache['b'] = 2
+    clock.now = 4.0
+    cache['a'] = 1  # újraírás megújítja a lejáratot
+    clock.now = 7.0
+    assert cache.get('a') == 1 and cache.get('b') == 2
+
+    clock.now = 8.0
+    assert 'b' not in cache and cache.get('b', 'gone') == 'gone'
+    assert cache['a'] == 1
+    assert len(cache) == 1
+
+    clock.now = 9.0
+    assert cache.pop('a') is None
+    assert len(cache) == 0
+
+def test_oldest_entries_are_evicted_beyond_maxsize():
+    cache = TTLCache(maxsize=2, ttl=60.0, timer=FakeClock())
+    cache['a'] = 1
+    cache['b'] = 2
+    cache['a'] = 3  # a legutóbb írt kerül a sor végére
+    cache['c'] = 4
+    assert 'b' not in cache
+    assert cache.get('a') == 3 and cache.get('c') == 4
+    assert cache.pop('c') == 4 and 'c' not in cache